@@ -12,6 +12,10 @@ SOLR_URL="http://localhost:8983/solr"
 echo "Setting up sqlite"
 unzip -p dumps/nuremberg_prod_dump_latest.sqlite3.zip > web/nuremberg_dev.db
 
+echo "Applying migrations and matching documents with their full texts"
+$DOCKER_COMPOSE_EXEC web python manage.py migrate
+$DOCKER_COMPOSE_EXEC web python manage.py index_evidence_codes
+
 echo "Wait for Solr to be ready..."
 while ! $DOCKER_COMPOSE_EXEC solr solr status >/dev/null 2>&1; do
     sleep 1
@@ -1,6 +1,24 @@
 import pytest
+from model_bakery import generators
+
+from nuremberg.core.reference_data import reference_data
+
+
+# reference foreign keys are baked as any other foreign key
+generators.add(
+    'nuremberg.core.reference_data.ReferenceForeignKey',
+    'model_bakery.random_gen.gen_related',
+)
 
 
 @pytest.fixture()
 def django_db_setup(settings):
     return
+
+
+@pytest.fixture(autouse=True)
+def clear_reference_data():
+    # tests create and remove reference data rows, never reuse loaded ones
+    reference_data.clear()
+    yield
+    reference_data.clear()
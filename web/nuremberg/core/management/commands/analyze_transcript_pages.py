@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from lxml import etree
+
+from nuremberg.transcripts.models import TranscriptPage
+from nuremberg.transcripts.xml import analyze_page, hash_xml
+
+
+class Command(BaseCommand):
+    help = (
+        'Store the XML analysis and hash of transcript pages that do not '
+        'have them yet (pages saved since they were introduced already have '
+        'them).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Amount of pages to update per batch (default is 500)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Analyze every page again',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pages = TranscriptPage.objects.order_by('id')
+        if not options['force']:
+            pages = pages.filter(
+                Q(xml_analysis__isnull=True) | Q(xml_hash__isnull=True)
+            )
+        page_ids = list(pages.values_list('id', flat=True))
+
+        failed = 0
+        for i in range(0, len(page_ids), batch_size):
+            batch = list(
+                TranscriptPage.objects.filter(
+                    id__in=page_ids[i : i + batch_size]
+                ).only('id', 'xml')
+            )
+            for page in batch:
+                page.xml_hash = hash_xml(page.xml)
+                try:
+                    page.xml_analysis = analyze_page(page.xml)
+                except etree.XMLSyntaxError as e:
+                    # as `TranscriptPage.save()` does, keep no analysis
+                    page.xml_analysis = None
+                    failed += 1
+                    self.stderr.write(
+                        f'Can not analyze transcript page {page.id}: {e}'
+                    )
+            # bulk_update leaves `updated_at` alone, pages did not change
+            TranscriptPage.objects.bulk_update(
+                batch, ['xml_analysis', 'xml_hash']
+            )
+
+        self.stdout.write(
+            f'Analyzed {len(page_ids) - failed} transcript page(s), '
+            f'{failed} failed.'
+        )
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from nuremberg.documents.models import Document
+
+
+class Command(BaseCommand):
+    help = (
+        'Time looking up the thumb and full scale URLs of every page of a '
+        'document, as the document viewer does, to benchmark changes to the '
+        'document image lookups.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('document', type=int, help='document to look up')
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Amount of times to look up the URLs (default is 5)',
+        )
+
+    def handle(self, *args, **options):
+        timings = []
+        for _ in range(options['repeat']):
+            # load the images every time, so no lookup is cached between runs
+            document = Document.objects.prefetch_related('images').get(
+                id=options['document']
+            )
+            start = time.perf_counter()
+            urls = [
+                (image.thumb_url(), image.full_url())
+                for image in document.images_screen()
+            ]
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        self.stdout.write(
+            f'Looked up the URLs of {len(urls)} page(s) in {best:.4f}s, '
+            f'best of {len(timings)} run(s).'
+        )
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from nuremberg.transcripts.models import Transcript
+from nuremberg.transcripts.xml import TranscriptPageJoiner, XmlPage
+
+
+class Command(BaseCommand):
+    help = (
+        'Time joining a range of transcript pages, to benchmark changes to '
+        'the TranscriptPageJoiner.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('transcript', type=int, help='transcript to join')
+        parser.add_argument('from_seq', type=int, help='seq range start')
+        parser.add_argument('to_seq', type=int, help='seq range end')
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Amount of times to join the pages (default is 5)',
+        )
+
+    def handle(self, *args, **options):
+        transcript = Transcript.objects.get(id=options['transcript'])
+        # load the pages once, so only joining (including parsing) is timed
+        pages = [
+            XmlPage(seq_number, xml)
+            for seq_number, xml in transcript.pages.filter(
+                seq_number__gte=options['from_seq'],
+                seq_number__lte=options['to_seq'],
+            )
+            .order_by('seq_number')
+            .values_list('seq_number', 'xml')
+        ]
+        size = sum(len(page.xml) for page in pages)
+
+        timings = []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            joiner = TranscriptPageJoiner(pages)
+            joiner.build_html()
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        self.stdout.write(
+            f'Joined {len(pages)} page(s) ({size} characters of XML) in '
+            f'{best:.4f}s, best of {len(timings)} run(s) '
+            f'({len(pages) / best:.1f} pages/s).'
+        )
@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from nuremberg.documents.models import (
+    DocumentPersonalAuthor,
+    DocumentPersonalAuthorMetadata,
+    PersonalAuthorProperty,
+    PersonalAuthorPropertyRank,
+    group_author_properties,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the stored metadata of personal authors whose properties (or '
+        'the property ranks) changed since the metadata was last built. Run '
+        'it after loading new author properties into the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Amount of authors to build per batch (default is 500)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild the metadata of every author',
+        )
+
+    def load_timestamps(self):
+        """Return the latest load timestamp of every author's properties."""
+        timestamps = dict.fromkeys(
+            DocumentPersonalAuthor.objects.values_list('id', flat=True)
+        )
+        properties = (
+            PersonalAuthorProperty.objects.values('personal_author_id')
+            .annotate(latest=Max('load_timestamp'))
+            .values_list('personal_author_id', 'latest')
+        )
+        for author_id, latest in properties:
+            if author_id in timestamps:
+                timestamps[author_id] = latest
+        return timestamps
+
+    @transaction.atomic
+    def build(self, author_ids, timestamps, ranks, ranks_timestamp):
+        authors = DocumentPersonalAuthor.objects.filter(id__in=author_ids)
+        DocumentPersonalAuthorMetadata.objects.filter(
+            author_id__in=author_ids
+        ).delete()
+        DocumentPersonalAuthorMetadata.objects.bulk_create(
+            DocumentPersonalAuthorMetadata(
+                author_id=author.id,
+                metadata=author.build_metadata(ranks, properties),
+                load_timestamp=timestamps[author.id],
+                ranks_load_timestamp=ranks_timestamp,
+            )
+            for author, properties in group_author_properties(authors)
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        timestamps = self.load_timestamps()
+        # ranks affect every author, if they changed everything is rebuilt
+        ranks_timestamp = PersonalAuthorPropertyRank.objects.aggregate(
+            latest=Max('load_timestamp')
+        )['latest']
+        stored = {
+            author_id: (load_timestamp, ranks_load_timestamp)
+            for author_id, load_timestamp, ranks_load_timestamp in (
+                DocumentPersonalAuthorMetadata.objects.values_list(
+                    'author_id', 'load_timestamp', 'ranks_load_timestamp'
+                )
+            )
+        }
+
+        # remove the metadata of authors that no longer exist
+        removed = [
+            author_id for author_id in stored if author_id not in timestamps
+        ]
+        DocumentPersonalAuthorMetadata.objects.filter(
+            author_id__in=removed
+        ).delete()
+
+        stale = sorted(
+            author_id
+            for author_id, load_timestamp in timestamps.items()
+            if options['force']
+            or stored.get(author_id) != (load_timestamp, ranks_timestamp)
+        )
+        ranks = PersonalAuthorPropertyRank.objects.as_dict()
+        for i in range(0, len(stale), batch_size):
+            self.build(
+                stale[i : i + batch_size], timestamps, ranks, ranks_timestamp
+            )
+
+        self.stdout.write(
+            f'Built metadata for {len(stale)} author(s), removed '
+            f'{len(removed)} stale metadata record(s).'
+        )
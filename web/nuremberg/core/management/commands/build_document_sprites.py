@@ -0,0 +1,85 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from nuremberg.core.storages import DocumentStorage
+from nuremberg.documents.models import DocumentImage
+from nuremberg.documents.sprites import build_sprites, map_path
+
+
+class Command(BaseCommand):
+    help = 'Build the thumbnail sprite sheets for documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ids',
+            nargs='+',
+            type=int,
+            default=None,
+            help='Document ids to build sprites for (default is all)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Amount of worker processes (default is the amount of CPUs)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild the sprites even if they already exist',
+        )
+
+    def thumbs(self, ids=None):
+        """Return a dict of document id -> [(page number, image name)]."""
+        images = DocumentImage.objects.filter(
+            scale=DocumentImage.THUMB, image__isnull=False
+        ).exclude(image='')
+        if ids:
+            images = images.filter(document_id__in=ids)
+
+        result = defaultdict(list)
+        for document_id, page_number, name in images.values_list(
+            'document_id', 'page_number', 'image'
+        ).iterator():
+            result[document_id].append((page_number, name))
+        return result
+
+    def handle(self, *args, **options):
+        documents = self.thumbs(options['ids'])
+        if not options['force']:
+            storage = DocumentStorage()
+            documents = {
+                document_id: images
+                for document_id, images in documents.items()
+                if not storage.exists(map_path(document_id))
+            }
+        if not documents:
+            self.stdout.write('No documents to be processed.')
+            return
+
+        # worker processes only use the storage, never the database
+        built = failed = pages = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(build_sprites, document_id, images): document_id
+                for document_id, images in sorted(documents.items())
+            }
+            for future in as_completed(futures):
+                try:
+                    pages += future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(
+                        'Can not build sprites for document '
+                        f'{futures[future]}: {e}'
+                    )
+                else:
+                    built += 1
+
+        self.stdout.write(
+            f'Built sprites with {pages} page(s) for {built} document(s), '
+            f'{failed} failed.'
+        )
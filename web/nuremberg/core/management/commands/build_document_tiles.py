@@ -0,0 +1,101 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from nuremberg.documents.models import DocumentImage
+from nuremberg.documents.tiles import build_pyramid, info_path
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the deep zoom tile pyramids for document images, using the '
+        'largest available image of every page'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ids',
+            nargs='+',
+            type=int,
+            default=None,
+            help='Document ids to build tiles for (default is all documents)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Amount of worker processes (default is the amount of CPUs)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild the tiles even if they already exist',
+        )
+
+    def source_images(self, ids=None):
+        """Return `(document id, page number, image name)` for every page."""
+        images = DocumentImage.objects.filter(
+            scale__in=(
+                DocumentImage.FULL,
+                DocumentImage.DOUBLE,
+                DocumentImage.SCREEN,
+            ),
+            image__isnull=False,
+        ).exclude(image='')
+        if ids:
+            images = images.filter(document_id__in=ids)
+
+        # prefer full scale images, then double and finally screen scale
+        preference = {
+            DocumentImage.FULL: 0,
+            DocumentImage.DOUBLE: 1,
+            DocumentImage.SCREEN: 2,
+        }
+        result = {}
+        for document_id, page_number, scale, name in images.values_list(
+            'document_id', 'page_number', 'scale', 'image'
+        ).iterator():
+            key = (document_id, page_number)
+            if key not in result or preference[scale] < result[key][0]:
+                result[key] = (preference[scale], name)
+        return [
+            (document_id, page_number, name)
+            for (document_id, page_number), (_, name) in sorted(result.items())
+        ]
+
+    def handle(self, *args, **options):
+        pages = self.source_images(options['ids'])
+        if not options['force']:
+            storage = DocumentImage._meta.get_field('image').storage
+            pages = [
+                page
+                for page in pages
+                if not storage.exists(info_path(*page[:2]))
+            ]
+        if not pages:
+            self.stdout.write('No document images to be processed.')
+            return
+
+        # worker processes only use the storage, never the database
+        built = failed = tiles = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(build_pyramid, *page): page for page in pages
+            }
+            for future in as_completed(futures):
+                document_id, page_number, name = futures[future]
+                try:
+                    tiles += future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(
+                        f'Can not build tiles for document {document_id} '
+                        f'page {page_number} ({name}): {e}'
+                    )
+                else:
+                    built += 1
+
+        self.stdout.write(
+            f'Built {tiles} tile(s) for {built} page(s), {failed} failed.'
+        )
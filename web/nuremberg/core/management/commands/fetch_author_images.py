@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from nuremberg.documents.author_images import build_thumbnail, get_http_client
+from nuremberg.documents.models import (
+    DocumentPersonalAuthor,
+    DocumentPersonalAuthorImage,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Download the images of personal authors and store a local thumbnail '
+        'for each of them. Only new or changed images are downloaded.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ids',
+            nargs='+',
+            type=int,
+            default=None,
+            help='IDs of the authors to fetch images for (default is all)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Amount of concurrent downloads (default is 4)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Download images even if a thumbnail already exists',
+        )
+
+    def pending(self, author_ids, force, batch_size=500):
+        """Yield `(author id, image URL)` for images with no thumbnail."""
+        authors = DocumentPersonalAuthor.objects.order_by('id')
+        if author_ids:
+            authors = authors.filter(id__in=author_ids)
+        author_ids = list(authors.values_list('id', flat=True))
+        existing = dict(
+            DocumentPersonalAuthorImage.objects.values_list(
+                'author_id', 'source_url'
+            )
+        )
+        for i in range(0, len(author_ids), batch_size):
+            metadata = DocumentPersonalAuthor.objects.filter(
+                id__in=author_ids[i : i + batch_size]
+            ).metadata_by_id()
+            for author_id, author_metadata in metadata.items():
+                image = author_metadata['image']
+                if image is None:
+                    continue
+                url = image.get('original_url', image['url'])
+                if force or existing.get(author_id) != url:
+                    yield author_id, url
+
+    def fetch(self, client, author_id, url):
+        try:
+            return build_thumbnail(author_id, url, client=client)
+        except Exception as e:
+            self.stderr.write(
+                f'Could not fetch image for author {author_id} ({url}): {e}'
+            )
+            return None
+
+    def handle(self, *args, **options):
+        pending = list(self.pending(options['ids'], options['force']))
+        client = get_http_client()
+        fetched = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = executor.map(
+                lambda item: self.fetch(client, *item), pending
+            )
+            for (author_id, url), result in zip(pending, results):
+                if result is None:
+                    continue
+                name, width, height = result
+                DocumentPersonalAuthorImage.objects.update_or_create(
+                    author_id=author_id,
+                    defaults={
+                        'source_url': url,
+                        'image': name,
+                        'width': width,
+                        'height': height,
+                    },
+                )
+                fetched += 1
+
+        self.stdout.write(
+            f'Stored {fetched} author image thumbnail(s), '
+            f'{len(pending) - fetched} failed.'
+        )
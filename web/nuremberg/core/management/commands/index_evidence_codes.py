@@ -0,0 +1,122 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from nuremberg.documents.models import (
+    Document,
+    DocumentEvidenceCode,
+    DocumentEvidenceCodeKey,
+    DocumentText,
+    DocumentTextEvidenceCodeKey,
+    DocumentTextLink,
+    evidence_code_key,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the normalized evidence code keys and the ranked links used '
+        'to match documents with their full texts. Run it after loading new '
+        'documents, evidence codes, exhibit codes or full texts into the '
+        'database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Amount of rows to insert per query (default is 1000)',
+        )
+
+    def rebuild(self, model, rows, batch_size):
+        model.objects.all().delete()
+        created = model.objects.bulk_create(
+            (model(**row) for row in rows), batch_size=batch_size
+        )
+        self.stdout.write(f'Created {len(created)} {model.__name__}(s).')
+
+    def evidence_code_keys(self):
+        evidence_codes = DocumentEvidenceCode.objects.values_list(
+            'id', 'document_id', 'prefix__code', 'number'
+        )
+        for code_id, document_id, series, number in evidence_codes.iterator():
+            yield {
+                'evidence_code_id': code_id,
+                'document_id': document_id,
+                'key': evidence_code_key(series, number),
+            }
+
+    def text_keys(self):
+        texts = DocumentText.objects.values_list(
+            'id', 'evidence_code_series', 'evidence_code_num'
+        )
+        for text_id, series, number in texts.iterator():
+            yield {
+                'text_id': text_id,
+                'key': evidence_code_key(series, number),
+            }
+
+    def text_links(self):
+        """Rank the matching documents for every text in a single pass.
+
+        This is equivalent to calling `DocumentText.documents()` for every
+        text, but scores are calculated with one query for all documents.
+
+        """
+        text_keys = DocumentTextEvidenceCodeKey.objects.values('key')
+        document_keys = DocumentEvidenceCodeKey.objects.filter(
+            key__in=text_keys
+        )
+        documents_by_key = defaultdict(set)
+        for document_id, key in document_keys.values_list(
+            'document_id', 'key'
+        ).iterator():
+            documents_by_key[key].add(document_id)
+
+        # The scores query may return more than one row per document (one per
+        # distinct case score), keep the best one as `documents()` would.
+        scores = {}
+        ranked = DocumentText.rank_documents(
+            Document.objects.filter(id__in=document_keys.values('document_id'))
+        ).values_list(
+            'id', 'exhibit_codes_count', 'cases_score', 'source_score'
+        )
+        for document_id, *score in ranked.iterator():
+            scores[document_id] = max(score, scores.get(document_id, score))
+
+        for text_id, key in (
+            DocumentTextEvidenceCodeKey.objects.order_by('text_id')
+            .values_list('text_id', 'key')
+            .iterator()
+        ):
+            documents = sorted(
+                # skip keys pointing to documents that no longer exist
+                documents_by_key.get(key, set()).intersection(scores),
+                key=lambda document_id: (
+                    [-i for i in scores[document_id]],
+                    document_id,
+                ),
+            )
+            for rank, document_id in enumerate(documents):
+                yield {
+                    'text_id': text_id,
+                    'document_id': document_id,
+                    'rank': rank,
+                }
+
+    def rebuild_keys(self, batch_size):
+        self.rebuild(
+            DocumentEvidenceCodeKey, self.evidence_code_keys(), batch_size
+        )
+        self.rebuild(DocumentTextEvidenceCodeKey, self.text_keys(), batch_size)
+
+    def rebuild_links(self, batch_size):
+        self.rebuild(DocumentTextLink, self.text_links(), batch_size)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.rebuild_keys(batch_size)
+        self.rebuild_links(batch_size)
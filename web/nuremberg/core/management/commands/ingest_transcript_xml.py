@@ -1,9 +1,16 @@
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 from os import path, listdir
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
 from nuremberg.documents.models import DocumentCase
 from nuremberg.transcripts.models import Transcript, TranscriptPage
+from nuremberg.transcripts.xml import analyze_page, hash_xml
 
 
 class Command(BaseCommand):
@@ -13,6 +20,19 @@ class Command(BaseCommand):
         r'^NRMB-(?P<case_label>[A-Z]+)(?P<case_number>\d{2})?-(?P<volume>\d{2})_(?P<vol_seq>\d{5})_[01]\.xml$'
     )
 
+    # the fields written to existing pages in bulk mode
+    bulk_update_fields = [
+        'xml',
+        'xml_analysis',
+        '_url',
+        'seq_number',
+        'date',
+        'page_label',
+        'page_number',
+        'xml_hash',
+        'updated_at',
+    ]
+
     def add_arguments(self, parser):
         parser.add_argument(
             'paths', nargs='+', type=str, help='XML files to ingest'
@@ -26,9 +46,43 @@ class Command(BaseCommand):
         parser.add_argument(
             '-s', default=None, type=int, help='Skip N files before ingesting.'
         )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            default=False,
+            help='Ingest files even if their content did not change.',
+        )
+        parser.add_argument(
+            '--changed-ids',
+            default=None,
+            type=str,
+            help='Write the ids of the created or changed pages to this file, '
+            'one per line.',
+        )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            default=False,
+            help=(
+                'Parse files in worker processes and store the pages of '
+                'each volume in bulk.'
+            ),
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Amount of worker processes in bulk mode (default is the '
+            'amount of CPUs)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Amount of pages per query in bulk mode (default is 500)',
+        )
 
-    def handle(self, *args, **options):
-        count = 0
+    def collect_paths(self, options):
         if options['d']:
             paths = []
             for dirname in options['paths']:
@@ -40,27 +94,40 @@ class Command(BaseCommand):
         if options['s']:
             print('Skipping', options['s'], 'files.')
             paths = paths[options['s'] :]
-        print('Ingesting', len(paths), 'files.')
-        for file_path in paths:
-            if not path.exists(file_path):
-                print("No such file:", file_path)
-                continue
+        return paths
 
-            filename = path.basename(file_path)
-            m = self.filename_re.match(filename)
-            if not m:
-                print("Don't know how to process this:", filename)
-                continue
+    def parse_path(self, file_path):
+        """Return the `(case id, volume number, volume seq number)` of a page
+        file, or None if it can't be ingested."""
+        if not path.exists(file_path):
+            print("No such file:", file_path)
+            return None
 
-            # sketchily get case ID
-            if m.group('case_label') == 'NMT':
-                case_id = int(m.group('case_number')) + 1
-            elif m.group('case_label') == 'IMT':
-                case_id = 1
-            else:
-                print("I don't know a case called", m.group('case_label'))
-                continue
+        filename = path.basename(file_path)
+        m = self.filename_re.match(filename)
+        if not m:
+            print("Don't know how to process this:", filename)
+            return None
+
+        # sketchily get case ID
+        if m.group('case_label') == 'NMT':
+            case_id = int(m.group('case_number')) + 1
+        elif m.group('case_label') == 'IMT':
+            case_id = 1
+        else:
+            print("I don't know a case called", m.group('case_label'))
+            return None
+
+        return case_id, int(m.group('volume')), int(m.group('vol_seq'))
 
+    def image_url(self, file_path):
+        return "//s3.amazonaws.com/nuremberg-transcripts/{}".format(
+            path.basename(file_path).replace('.xml', '.jpg')
+        )
+
+    def get_transcript(self, case_id):
+        transcript = self.transcripts.get(case_id)
+        if transcript is None:
             case = DocumentCase.objects.get(pk=case_id)
             try:
                 transcript = case.transcript
@@ -70,9 +137,13 @@ class Command(BaseCommand):
                     title="Transcript for {}".format(case.short_name()),
                 )
                 print("Created transcript", transcript.title)
+            self.transcripts[case_id] = transcript
+        return transcript
 
-            volume_number = int(m.group('volume'))
-
+    def get_volume(self, transcript, volume_number):
+        key = (transcript.id, volume_number)
+        volume = self.volumes.get(key)
+        if volume is None:
             volume = transcript.volumes.filter(
                 volume_number=volume_number
             ).first()
@@ -83,13 +154,32 @@ class Command(BaseCommand):
                     transcript.title,
                     volume.volume_number,
                 )
+            self.volumes[key] = volume
+        return volume
 
-            volume_seq_number = int(m.group('vol_seq'))
-            page = volume.pages.filter(
-                volume_seq_number=volume_seq_number
-            ).first()
-            with open(file_path, 'r') as file:
-                xml = file.read()
+    def read(self, file_path):
+        with open(file_path, 'r') as file:
+            return file.read()
+
+    def ingest(self, paths, force):
+        count = 0
+        for file_path in paths:
+            parsed = self.parse_path(file_path)
+            if not parsed:
+                continue
+            case_id, volume_number, volume_seq_number = parsed
+
+            transcript = self.get_transcript(case_id)
+            volume = self.get_volume(transcript, volume_number)
+            page = (
+                volume.pages.filter(volume_seq_number=volume_seq_number)
+                .defer('xml', 'xml_analysis')
+                .first()
+            )
+            xml = self.read(file_path)
+            if page and not force and page.xml_hash == hash_xml(xml):
+                self.unchanged += 1
+                continue
             if not page:
                 page = TranscriptPage(
                     transcript=transcript,
@@ -97,15 +187,142 @@ class Command(BaseCommand):
                     volume_seq_number=volume_seq_number,
                 )
             page.xml = xml
-            page._url = "//s3.amazonaws.com/nuremberg-transcripts/{}".format(
-                filename.replace('.xml', '.jpg')
-            )
+            page._url = self.image_url(file_path)
             try:
                 page.populate_from_xml()
             except Exception as e:
                 print('error populating page', file_path)
                 raise e
             page.save()
+            self.changed_ids.append(page.id)
             count += 1
             if count % 100 == 0:
                 print('Created', count, 'pages.')
+
+    @transaction.atomic
+    def store(self, created, updated, batch_size):
+        # bulk_update doesn't set auto_now fields
+        now = timezone.now()
+        for page in updated:
+            page.updated_at = now
+        TranscriptPage.objects.bulk_create(created, batch_size=batch_size)
+        TranscriptPage.objects.bulk_update(
+            updated, self.bulk_update_fields, batch_size=batch_size
+        )
+
+    def ingest_bulk(self, paths, force, workers, batch_size):
+        # the last file of a page wins, as it does when ingesting one by one
+        volumes = {}
+        for file_path in paths:
+            parsed = self.parse_path(file_path)
+            if parsed:
+                case_id, volume_number, volume_seq_number = parsed
+                volumes.setdefault((case_id, volume_number), {})[
+                    volume_seq_number
+                ] = file_path
+        total = sum(len(files) for files in volumes.values())
+
+        count = created_count = 0
+        started = time.monotonic()
+        # worker processes only analyze XML, never use the database. Volumes
+        # are stored one at a time, so only one is kept in memory.
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for (case_id, volume_number), files in sorted(volumes.items()):
+                transcript = self.get_transcript(case_id)
+                volume = self.get_volume(transcript, volume_number)
+                existing = {
+                    page.volume_seq_number: page
+                    for page in volume.pages.defer('xml', 'xml_analysis')
+                }
+                # unchanged files are skipped before parsing them
+                changed = []
+                for volume_seq_number, file_path in files.items():
+                    xml = self.read(file_path)
+                    page = existing.get(volume_seq_number)
+                    if page and not force and page.xml_hash == hash_xml(xml):
+                        self.unchanged += 1
+                    else:
+                        changed.append((volume_seq_number, file_path, xml))
+                results = pool.map(
+                    analyze_page,
+                    [xml for _, _, xml in changed],
+                    chunksize=max(1, len(changed) // (workers * 4)),
+                )
+
+                created, updated = [], []
+                for volume_seq_number, file_path, xml in changed:
+                    try:
+                        analysis = next(results)
+                        page = existing.get(volume_seq_number)
+                        if page:
+                            updated.append(page)
+                        else:
+                            page = TranscriptPage(
+                                transcript=transcript,
+                                volume=volume,
+                                volume_seq_number=volume_seq_number,
+                            )
+                            created.append(page)
+                        page.set_xml(xml, analysis)
+                        page._url = self.image_url(file_path)
+                        page.populate_from_xml()
+                    except Exception as e:
+                        print('error populating page', file_path)
+                        raise e
+
+                self.store(created, updated, batch_size)
+                stored = created + updated
+                page_ids = [page.pk for page in stored]
+                if None in page_ids:
+                    # not every database returns the ids of created rows
+                    page_ids = list(
+                        volume.pages.filter(
+                            volume_seq_number__in=[
+                                page.volume_seq_number for page in stored
+                            ]
+                        ).values_list('id', flat=True)
+                    )
+                self.changed_ids += page_ids
+                count += len(files)
+                created_count += len(created)
+                elapsed = time.monotonic() - started
+                print(
+                    f'Checked {count}/{total} pages, stored {len(stored)} '
+                    f'({count / elapsed:.1f} pages/s), '
+                    f'{transcript.title} volume {volume_number}.'
+                )
+
+        elapsed = time.monotonic() - started
+        updated_count = len(self.changed_ids) - created_count
+        print(
+            f'Ingested {count} pages ({created_count} created, '
+            f'{updated_count} updated) in {elapsed:.1f}s.'
+        )
+
+    def handle(self, *args, **options):
+        paths = self.collect_paths(options)
+        print('Ingesting', len(paths), 'files.')
+        # cases, transcripts and volumes are looked up once per run
+        self.transcripts = {}
+        self.volumes = {}
+        self.changed_ids = []
+        self.unchanged = 0
+        if options['bulk']:
+            self.ingest_bulk(
+                paths,
+                options['force'],
+                options['workers'],
+                options['batch_size'],
+            )
+        else:
+            self.ingest(paths, options['force'])
+        print(
+            f'Changed {len(self.changed_ids)} pages, skipped {self.unchanged} '
+            'unchanged pages.'
+        )
+
+        if options['changed_ids']:
+            with open(options['changed_ids'], 'w') as file:
+                file.writelines(
+                    f'{page_id}\n' for page_id in sorted(self.changed_ids)
+                )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from nuremberg.documents.models import Document
+from nuremberg.documents.views import invalidate_sidebar
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove the cached document viewer sidebars. Run it after changing '
+        'data related to documents (codes, cases, etc.) directly in the '
+        'database, since those changes do not update the documents. This only '
+        'reaches the running app if it uses a shared cache backend, restart '
+        'the app otherwise.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ids',
+            nargs='+',
+            type=int,
+            default=None,
+            help='IDs of the documents to invalidate (default is all)',
+        )
+
+    def handle(self, *args, **options):
+        qs = Document.objects.only('id', 'updated_at')
+        if options['ids']:
+            qs = qs.filter(id__in=options['ids'])
+
+        count = 0
+        for document in qs.iterator():
+            invalidate_sidebar(document)
+            count += 1
+        self.stdout.write(f'Invalidated {count} document sidebar(s).')
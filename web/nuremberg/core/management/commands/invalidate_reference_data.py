@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from nuremberg.core.reference_data import reference_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Make every process reload the cached reference data (languages, '
+        'sources, cases, evidence prefixes, image types and author property '
+        'ranks). Run it after changing any of those tables in the database.'
+    )
+
+    def handle(self, *args, **options):
+        reference_data.invalidate()
+        self.stdout.write(
+            'Invalidated reference data for: '
+            + ', '.join(
+                sorted(model.__name__ for model in reference_data.models)
+            )
+        )
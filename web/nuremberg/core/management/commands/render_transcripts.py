@@ -0,0 +1,117 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from nuremberg.transcripts.models import (
+    RenderedTranscriptPage,
+    Transcript,
+    TranscriptPage,
+)
+from nuremberg.transcripts.xml import join_transcript
+
+
+class Command(BaseCommand):
+    help = (
+        'Join every page of the transcripts and store the rendered HTML of '
+        'each page, so the transcript viewer does not need to join them. '
+        'Only transcripts with new or changed pages are rendered.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ids',
+            nargs='+',
+            type=int,
+            default=None,
+            help='Transcript ids to render (default is all transcripts)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Amount of worker processes (default is the amount of CPUs)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Render transcripts even if they are up to date',
+        )
+
+    def pending(self, transcript_ids, force):
+        transcripts = Transcript.objects.order_by('id')
+        if transcript_ids:
+            transcripts = transcripts.filter(id__in=transcript_ids)
+        if not force:
+            outdated = TranscriptPage.objects.filter(
+                Q(rendered__isnull=True)
+                | ~Q(rendered__page_updated_at=F('updated_at'))
+            )
+            transcripts = transcripts.filter(
+                id__in=outdated.values('transcript_id')
+            )
+        return list(transcripts.values_list('id', flat=True))
+
+    def load(self, transcript_id):
+        """Return the `(id, seq number, updated at, xml)` of every page."""
+        return list(
+            TranscriptPage.objects.filter(transcript_id=transcript_id)
+            .order_by('seq_number')
+            .values_list('id', 'seq_number', 'updated_at', 'xml')
+        )
+
+    @transaction.atomic
+    def store(self, pages, html):
+        RenderedTranscriptPage.objects.filter(
+            page_id__in=[page_id for page_id, *_ in pages]
+        ).delete()
+        RenderedTranscriptPage.objects.bulk_create(
+            (
+                RenderedTranscriptPage(
+                    page_id=page_id,
+                    html=html[seq_number],
+                    page_updated_at=updated_at,
+                )
+                for page_id, seq_number, updated_at, _ in pages
+            ),
+            batch_size=500,
+        )
+
+    def handle(self, *args, **options):
+        pending = self.pending(options['ids'], options['force'])
+        rendered = failed = pages_count = 0
+
+        # worker processes only join XML, never use the database. Only a few
+        # transcripts are loaded at a time, since they can be rather big.
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            running = {}
+            while pending or running:
+                while pending and len(running) < options['workers']:
+                    transcript_id = pending.pop(0)
+                    pages = self.load(transcript_id)
+                    future = pool.submit(
+                        join_transcript,
+                        [(seq, xml) for _, seq, _, xml in pages],
+                    )
+                    running[future] = (transcript_id, pages)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    transcript_id, pages = running.pop(future)
+                    try:
+                        self.store(pages, future.result())
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(
+                            f'Can not render transcript {transcript_id}: {e}'
+                        )
+                    else:
+                        rendered += 1
+                        pages_count += len(pages)
+
+        self.stdout.write(
+            f'Rendered {pages_count} page(s) of {rendered} transcript(s), '
+            f'{failed} failed.'
+        )
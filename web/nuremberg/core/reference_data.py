@@ -0,0 +1,151 @@
+"""Process wide cache for small, effectively static reference tables.
+
+Tables such as languages, sources or cases have a handful of rows that
+almost never change, but are looked up over and over (one query per document,
+evidence code, author, etc.). Models registered with `reference_data` are
+loaded once per process, the first time they are needed:
+
+    @reference_data.register
+    class DocumentLanguage(models.Model): ...
+
+    reference_data.get(DocumentLanguage, 1)  # no query after the first one
+
+Foreign keys defined as `ReferenceForeignKey` resolve related objects from
+this cache, falling back to the database for rows loaded after the cache.
+
+Every process checks a version stamp in the Django cache (at most once every
+`CHECK_INTERVAL` seconds), and drops its data when the stamp changes. Use the
+`invalidate_reference_data` management command after changing any of these
+tables (this requires a cache backend shared by all processes, otherwise
+restart the app instead).
+
+"""
+import copy
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor,
+)
+
+
+VERSION_CACHE_KEY = 'reference-data-version'
+# Seconds between checks of the version stamp
+CHECK_INTERVAL = 60
+
+
+class ReferenceData:
+    def __init__(self, cache_key=VERSION_CACHE_KEY, interval=CHECK_INTERVAL):
+        self.cache_key = cache_key
+        self.interval = interval
+        self.models = set()
+        self.lock = threading.RLock()
+        self.clear()
+
+    def register(self, model):
+        """Register `model` as reference data. Usable as a class decorator."""
+        self.models.add(model)
+        return model
+
+    def clear(self):
+        """Drop the data loaded by this process."""
+        with self.lock:
+            self.rows = {}
+            self.derived_values = {}
+            self.version = None
+            self.checked_at = None
+
+    def invalidate(self):
+        """Make every process drop its data, by changing the version stamp."""
+        cache.set(self.cache_key, uuid.uuid4().hex, None)
+        self.clear()
+
+    def check_version(self):
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < (
+            self.interval
+        ):
+            return
+        version = cache.get(self.cache_key)
+        with self.lock:
+            if version != self.version:
+                self.rows = {}
+                self.derived_values = {}
+                self.version = version
+            self.checked_at = now
+
+    def table(self, model):
+        """Return a dict mapping primary keys to rows for `model`."""
+        if model not in self.models:
+            raise ValueError(f'{model.__name__} is not reference data')
+        self.check_version()
+        rows = self.rows.get(model)
+        if rows is None:
+            with self.lock:
+                rows = self.rows.get(model)
+                if rows is None:
+                    rows = self.rows[model] = {
+                        row.pk: row for row in model._default_manager.all()
+                    }
+        return rows
+
+    def all(self, model):
+        """Return every row for `model`.
+
+        Rows are shared, do not modify them.
+
+        """
+        return list(self.table(model).values())
+
+    def get(self, model, pk):
+        """Return a copy of the `model` row with primary key `pk`, or None."""
+        row = self.table(model).get(pk)
+        # copies can be safely modified (or cache related objects)
+        return copy.copy(row) if row is not None else None
+
+    def derived(self, model, name, func):
+        """Return `func(rows)` for the rows of `model`, cached as `name`."""
+        rows = self.table(model)
+        key = (model, name)
+        try:
+            return self.derived_values[key]
+        except KeyError:
+            pass
+        value = func(list(rows.values()))
+        with self.lock:
+            # only keep the value if the rows were not dropped meanwhile
+            if self.rows.get(model) is rows:
+                self.derived_values[key] = value
+        return value
+
+
+reference_data = ReferenceData()
+
+
+class ReferenceForwardDescriptor(ForwardManyToOneDescriptor):
+    def get_object(self, instance):
+        result = reference_data.get(
+            self.field.related_model, getattr(instance, self.field.attname)
+        )
+        if result is None:
+            result = super().get_object(instance)
+        return result
+
+
+class ReferenceForeignKey(models.ForeignKey):
+    """A ForeignKey to a model registered with `reference_data`.
+
+    Related objects are resolved from memory instead of querying the database,
+    so there is no need to `select_related` these fields.
+
+    """
+
+    forward_related_accessor_class = ReferenceForwardDescriptor
+
+    def deconstruct(self):
+        # this is a regular foreign key as far as the database is concerned
+        name, path, args, kwargs = super().deconstruct()
+        return name, 'django.db.models.ForeignKey', args, kwargs
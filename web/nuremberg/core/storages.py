@@ -39,8 +39,11 @@ So the new class `SettingsStorage` is effectively an instance of
 `FileSystemStorage` instance.
 
 """
+import os
+import tempfile
 
 from django.conf import settings
+from django.core.files.base import ContentFile
 from django.utils.module_loading import import_string
 
 
@@ -55,3 +58,38 @@ class DocumentStorage(SettingsStorage):
 class TranscriptStorage(SettingsStorage):
     bucket_name = settings.TRANSCRIPTS_BUCKET
     # default_acl = 'public-read'
+
+
+def overwrite(storage, name, data):
+    """Save `data` (bytes) as `name` in `storage`, replacing existing files.
+
+    S3 storages overwrite files by default, but other storages pick a new
+    name instead, so remove the existing file first in those.
+
+    """
+    if not getattr(storage, 'file_overwrite', False) and storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def save_while_streaming(chunks, path):
+    """Yield every chunk from `chunks` while also saving them to `path`.
+
+    The file is written under a temporary name and only moved to `path` once
+    every chunk was produced, so a half-generated file (for example, when the
+    client disconnects) is never served from a cache.
+
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    f = tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(path), suffix='.tmp', delete=False
+    )
+    try:
+        with f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(f.name, path)
+    finally:
+        if os.path.exists(f.name):
+            os.remove(f.name)
@@ -0,0 +1,86 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from nuremberg.transcripts.models import TranscriptPage
+from nuremberg.transcripts.tests.helpers import make_transcript
+from nuremberg.transcripts.xml import analyze_page, hash_xml
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(**kwargs):
+    stdout = StringIO()
+    stderr = StringIO()
+    result = call_command(
+        'analyze_transcript_pages', stderr=stderr, stdout=stdout, **kwargs
+    )
+    return result, stdout, stderr
+
+
+def test_analyze_transcript_pages():
+    transcript = make_transcript(pages=3)
+    pages = TranscriptPage.objects.filter(transcript=transcript)
+    pages.update(xml_analysis=None)
+    updated_at = sorted(pages.values_list('updated_at', flat=True))
+
+    result, stdout, stderr = do_command_call(batch_size=2)
+
+    assert result is None
+    assert stderr.getvalue() == ''
+    assert stdout.getvalue() == 'Analyzed 3 transcript page(s), 0 failed.\n'
+    for page in pages:
+        assert page.xml_analysis == analyze_page(page.xml)
+    assert sorted(pages.values_list('updated_at', flat=True)) == updated_at
+
+    result, stdout, stderr = do_command_call()
+
+    assert stdout.getvalue() == 'Analyzed 0 transcript page(s), 0 failed.\n'
+
+
+def test_analyze_transcript_pages_force():
+    transcript = make_transcript(pages=3)
+    pages = TranscriptPage.objects.filter(transcript=transcript)
+    pages.update(xml_analysis={'text': 'outdated'})
+    total = TranscriptPage.objects.count()
+
+    result, stdout, stderr = do_command_call(force=True)
+
+    assert stdout.getvalue() == (
+        f'Analyzed {total} transcript page(s), 0 failed.\n'
+    )
+    assert pages.first().xml_analysis['text'] != 'outdated'
+
+
+def test_analyze_transcript_pages_hash():
+    transcript = make_transcript(pages=3)
+    pages = TranscriptPage.objects.filter(transcript=transcript)
+    pages.filter(seq_number=2).update(xml_hash=None)
+
+    result, stdout, stderr = do_command_call()
+
+    assert stdout.getvalue() == 'Analyzed 1 transcript page(s), 0 failed.\n'
+    for page in pages:
+        assert page.xml_hash == hash_xml(page.xml)
+
+
+def test_analyze_transcript_pages_malformed():
+    transcript = make_transcript(pages=3)
+    pages = TranscriptPage.objects.filter(transcript=transcript)
+    pages.update(xml_analysis=None)
+    broken = pages.get(seq_number=2)
+    pages.filter(id=broken.id).update(xml='<xml><p>Not closed</xml>')
+
+    result, stdout, stderr = do_command_call(batch_size=2)
+
+    assert stdout.getvalue() == 'Analyzed 2 transcript page(s), 1 failed.\n'
+    assert stderr.getvalue().startswith(
+        f'Can not analyze transcript page {broken.id}: '
+    )
+    for page in pages.exclude(id=broken.id):
+        assert page.xml_analysis == analyze_page(page.xml)
+    broken = pages.get(id=broken.id)
+    assert broken.xml_analysis is None
+    assert broken.xml_hash == hash_xml(broken.xml)
@@ -0,0 +1,31 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+
+from nuremberg.documents.tests.helpers import make_document_images
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(*args, **kwargs):
+    stdout = StringIO()
+    stderr = StringIO()
+    result = call_command(
+        'benchmark_image_urls', *args, stderr=stderr, stdout=stdout, **kwargs
+    )
+    return result, stdout, stderr
+
+
+def test_benchmark_image_urls():
+    document = baker.make('Document', image_count=3)
+    make_document_images(document, pages=3)
+
+    result, stdout, stderr = do_command_call(document.id, '--repeat', 2)
+
+    assert result is None
+    assert stderr.getvalue() == ''
+    assert stdout.getvalue().startswith('Looked up the URLs of 3 page(s) in ')
+    assert 'best of 2 run(s)' in stdout.getvalue()
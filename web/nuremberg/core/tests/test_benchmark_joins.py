@@ -0,0 +1,31 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from nuremberg.transcripts.tests.helpers import make_transcript
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(*args, **kwargs):
+    stdout = StringIO()
+    stderr = StringIO()
+    result = call_command(
+        'benchmark_joins', *args, stderr=stderr, stdout=stdout, **kwargs
+    )
+    return result, stdout, stderr
+
+
+def test_benchmark_joins():
+    transcript = make_transcript(pages=12)
+
+    result, stdout, stderr = do_command_call(
+        transcript.id, 2, 11, '--repeat', 2
+    )
+
+    assert result is None
+    assert stderr.getvalue() == ''
+    assert stdout.getvalue().startswith('Joined 10 page(s) (')
+    assert 'best of 2 run(s)' in stdout.getvalue()
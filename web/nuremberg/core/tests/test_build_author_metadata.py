@@ -0,0 +1,136 @@
+import datetime
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+
+from nuremberg.documents.models import (
+    DocumentPersonalAuthor,
+    DocumentPersonalAuthorMetadata,
+    PersonalAuthorProperty,
+)
+from nuremberg.documents.tests.helpers import make_author
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(**kwargs):
+    stdout = StringIO()
+    stderr = StringIO()
+    result = call_command(
+        'build_author_metadata', stderr=stderr, stdout=stdout, **kwargs
+    )
+    return result, stdout, stderr
+
+
+@pytest.fixture
+def author():
+    result = make_author(first_name='John', last_name='Doe')
+    rank = baker.make('PersonalAuthorPropertyRank', name='a property', rank=10)
+    baker.make(
+        'PersonalAuthorProperty',
+        personal_author=result,
+        name=rank.name,
+        value='some value',
+        qualifier='',
+        qualifier_value='',
+        load_timestamp=datetime.datetime(
+            2022, 1, 1, tzinfo=datetime.timezone.utc
+        ),
+    )
+    return result
+
+
+def test_build_author_metadata(author):
+    authors_count = DocumentPersonalAuthor.objects.count()
+
+    result, stdout, stderr = do_command_call(batch_size=7)
+
+    assert result is None
+    assert stderr.getvalue() == ''
+    assert stdout.getvalue() == (
+        f'Built metadata for {authors_count} author(s), removed 0 stale '
+        'metadata record(s).\n'
+    )
+    assert DocumentPersonalAuthorMetadata.objects.count() == authors_count
+    stored = DocumentPersonalAuthorMetadata.objects.get(author=author)
+    assert stored.metadata == author.build_metadata()
+    assert stored.metadata['properties'][0]['name'] == 'a property'
+
+
+def test_build_author_metadata_only_changed(author):
+    do_command_call()
+
+    result, stdout, stderr = do_command_call()
+
+    assert stdout.getvalue() == (
+        'Built metadata for 0 author(s), removed 0 stale metadata '
+        'record(s).\n'
+    )
+
+    PersonalAuthorProperty.objects.filter(personal_author=author).update(
+        value='new value',
+        load_timestamp=datetime.datetime(
+            2022, 2, 1, tzinfo=datetime.timezone.utc
+        ),
+    )
+
+    result, stdout, stderr = do_command_call()
+
+    assert stdout.getvalue() == (
+        'Built metadata for 1 author(s), removed 0 stale metadata '
+        'record(s).\n'
+    )
+    stored = DocumentPersonalAuthorMetadata.objects.get(author=author)
+    assert stored.metadata['properties'][0]['prop_values'] == [
+        {'value': 'new value', 'qualifiers': []}
+    ]
+
+
+def test_build_author_metadata_force(author):
+    do_command_call()
+    authors_count = DocumentPersonalAuthor.objects.count()
+
+    result, stdout, stderr = do_command_call(force=True)
+
+    assert stdout.getvalue().startswith(
+        f'Built metadata for {authors_count} author(s)'
+    )
+
+
+def test_build_author_metadata_removes_missing_authors(author):
+    do_command_call()
+    DocumentPersonalAuthorMetadata.objects.create(
+        author_id=author.id + 1000, metadata={}
+    )
+
+    result, stdout, stderr = do_command_call()
+
+    assert stdout.getvalue() == (
+        'Built metadata for 0 author(s), removed 1 stale metadata '
+        'record(s).\n'
+    )
+    assert not DocumentPersonalAuthorMetadata.objects.filter(
+        author_id=author.id + 1000
+    ).exists()
+
+
+def test_build_author_metadata_ranks_changed(author):
+    do_command_call()
+    authors_count = DocumentPersonalAuthor.objects.count()
+
+    baker.make(
+        'PersonalAuthorPropertyRank',
+        name='new property',
+        rank=1,
+        load_timestamp=datetime.datetime(
+            2100, 1, 1, tzinfo=datetime.timezone.utc
+        ),
+    )
+    result, stdout, stderr = do_command_call()
+
+    assert stdout.getvalue().startswith(
+        f'Built metadata for {authors_count} author(s)'
+    )
@@ -0,0 +1,82 @@
+import json
+import os
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+from PIL import Image
+
+from nuremberg.core.storages import DocumentStorage
+from nuremberg.documents.models import DocumentImage
+from nuremberg.documents.sprites import map_path
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(**kwargs):
+    stdout = StringIO()
+    stderr = StringIO()
+    result = call_command(
+        'build_document_sprites', stderr=stderr, stdout=stdout, **kwargs
+    )
+    return result, stdout, stderr
+
+
+@pytest.fixture
+def documents(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    image_type = baker.make('DocumentImageType')
+    result = baker.make('Document', image_count=3, _quantity=2)
+    for document in result:
+        for page_number in range(1, 4):
+            for scale in (DocumentImage.THUMB, DocumentImage.SCREEN):
+                name = f'{document.id}_{page_number}_{scale}.jpg'
+                Image.new('RGB', (10, 20)).save(os.path.join(tmp_path, name))
+                baker.make(
+                    'DocumentImage',
+                    document=document,
+                    page_number=page_number,
+                    scale=scale,
+                    image=name,
+                    image_type=image_type,
+                )
+    return result
+
+
+def test_build_document_sprites(documents):
+    ids = [document.id for document in documents]
+
+    result, stdout, stderr = do_command_call(ids=ids, workers=2)
+
+    assert result is None
+    assert stdout.getvalue() == (
+        'Built sprites with 6 page(s) for 2 document(s), 0 failed.\n'
+    )
+    assert stderr.getvalue() == ''
+    storage = DocumentStorage()
+    for document_id in ids:
+        with storage.open(map_path(document_id)) as f:
+            assert list(json.load(f)['pages']) == ['1', '2', '3']
+
+
+def test_build_document_sprites_skips_existing(documents):
+    do_command_call(ids=[documents[0].id], workers=1)
+
+    ids = [document.id for document in documents]
+    result, stdout, stderr = do_command_call(ids=ids, workers=1)
+
+    assert stdout.getvalue() == (
+        'Built sprites with 3 page(s) for 1 document(s), 0 failed.\n'
+    )
+
+    result, stdout, stderr = do_command_call(ids=ids, workers=1)
+
+    assert stdout.getvalue() == 'No documents to be processed.\n'
+
+    result, stdout, stderr = do_command_call(ids=ids, workers=1, force=True)
+
+    assert stdout.getvalue() == (
+        'Built sprites with 6 page(s) for 2 document(s), 0 failed.\n'
+    )
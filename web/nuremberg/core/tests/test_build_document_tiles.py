@@ -0,0 +1,101 @@
+import json
+import os
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+from PIL import Image
+
+from nuremberg.core.storages import DocumentStorage
+from nuremberg.documents.models import DocumentImage
+from nuremberg.documents.tiles import info_path, tile_path
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(**kwargs):
+    stdout = StringIO()
+    stderr = StringIO()
+    result = call_command(
+        'build_document_tiles', stderr=stderr, stdout=stdout, **kwargs
+    )
+    return result, stdout, stderr
+
+
+@pytest.fixture
+def document(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    document = baker.make('Document', image_count=2)
+    image_type = baker.make('DocumentImageType')
+    for page_number, scale, size in [
+        (1, DocumentImage.SCREEN, (100, 100)),
+        (1, DocumentImage.FULL, (300, 300)),
+        (2, DocumentImage.THUMB, (10, 10)),
+        (2, DocumentImage.SCREEN, (200, 100)),
+    ]:
+        name = f'{document.id}_{page_number}_{scale}.jpg'
+        Image.new('RGB', size).save(os.path.join(tmp_path, name))
+        baker.make(
+            'DocumentImage',
+            document=document,
+            page_number=page_number,
+            scale=scale,
+            image=name,
+            image_type=image_type,
+        )
+    return document
+
+
+def test_build_document_tiles(document):
+    result, stdout, stderr = do_command_call(ids=[document.id], workers=2)
+
+    assert result is None
+    # 300x300: 2x2 tiles at level 9, 1 tile for each of the 9 levels below
+    # 200x100: 1 tile for each of the 9 levels
+    assert stdout.getvalue() == 'Built 22 tile(s) for 2 page(s), 0 failed.\n'
+    assert stderr.getvalue() == ''
+    storage = DocumentStorage()
+    assert storage.exists(info_path(document.id, 1))
+    assert storage.exists(info_path(document.id, 2))
+    # the largest image is used for each page
+    for page_number, level, column, row, size in [
+        (1, 9, 1, 1, (300 - 256, 300 - 256)),
+        (2, 8, 0, 0, (200, 100)),
+    ]:
+        with storage.open(info_path(document.id, page_number)) as f:
+            version = json.load(f)['version']
+        path = tile_path(document.id, page_number, version, level, column, row)
+        with Image.open(storage.open(path)) as tile:
+            assert tile.size == size
+
+
+def test_build_document_tiles_skips_existing(document):
+    do_command_call(ids=[document.id], workers=1)
+
+    result, stdout, stderr = do_command_call(ids=[document.id], workers=1)
+
+    assert stdout.getvalue() == 'No document images to be processed.\n'
+
+    result, stdout, stderr = do_command_call(
+        ids=[document.id], workers=1, force=True
+    )
+
+    assert stdout.getvalue() == 'Built 22 tile(s) for 2 page(s), 0 failed.\n'
+
+
+def test_build_document_tiles_missing_file(document, settings):
+    os.remove(
+        os.path.join(
+            settings.MEDIA_ROOT,
+            document.images.get(page_number=2, scale='s').image.name,
+        )
+    )
+
+    result, stdout, stderr = do_command_call(ids=[document.id], workers=1)
+
+    assert stdout.getvalue() == 'Built 13 tile(s) for 1 page(s), 1 failed.\n'
+    assert stderr.getvalue().startswith(
+        f'Can not build tiles for document {document.id} page 2'
+    )
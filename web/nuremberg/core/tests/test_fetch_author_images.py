@@ -0,0 +1,128 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+
+from nuremberg.core.storages import DocumentStorage
+from nuremberg.documents.models import (
+    DocumentPersonalAuthor,
+    DocumentPersonalAuthorImage,
+)
+from nuremberg.documents.tests.helpers import (
+    make_author,
+    make_image_content,
+    serve_files,
+)
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(**kwargs):
+    stdout = StringIO()
+    stderr = StringIO()
+    result = call_command(
+        'fetch_author_images', stderr=stderr, stdout=stdout, **kwargs
+    )
+    return result, stdout, stderr
+
+
+@pytest.fixture
+def storage(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return DocumentStorage()
+
+
+def make_author_with_image(url):
+    author = make_author()
+    baker.make(
+        'PersonalAuthorProperty',
+        personal_author=author,
+        name='image',
+        value=url,
+        qualifier='',
+        qualifier_value='',
+    )
+    return author
+
+
+@pytest.fixture
+def image_rank():
+    return baker.make('PersonalAuthorPropertyRank', name='image', rank=30)
+
+
+def test_fetch_author_images(storage, image_rank):
+    files = {'/image.png': make_image_content()}
+    with serve_files(files) as (url, requested):
+        author = make_author_with_image(f'{url}/image.png')
+
+        result, stdout, stderr = do_command_call(ids=[author.id], workers=2)
+
+        assert result is None
+        assert stderr.getvalue() == ''
+        assert stdout.getvalue() == (
+            'Stored 1 author image thumbnail(s), 0 failed.\n'
+        )
+        assert requested == ['/image.png']
+
+        thumbnail = DocumentPersonalAuthorImage.objects.get(author=author)
+        assert thumbnail.source_url == f'{url}/image.png'
+        assert storage.exists(thumbnail.image.name)
+        author = DocumentPersonalAuthor.objects.get(id=author.id)
+        assert author.metadata()['image'] == {
+            'url': thumbnail.image.url,
+            'alt': f'Image of {author.full_name()}',
+            'original_url': f'{url}/image.png',
+        }
+
+        # existing thumbnails are not fetched again
+        result, stdout, stderr = do_command_call(ids=[author.id])
+
+        assert stdout.getvalue() == (
+            'Stored 0 author image thumbnail(s), 0 failed.\n'
+        )
+        assert requested == ['/image.png']
+
+        # unless forced to
+        result, stdout, stderr = do_command_call(ids=[author.id], force=True)
+
+        assert stdout.getvalue() == (
+            'Stored 1 author image thumbnail(s), 0 failed.\n'
+        )
+        assert requested == ['/image.png', '/image.png']
+
+
+def test_fetch_author_images_changed_image(storage, image_rank):
+    files = {
+        '/old.png': make_image_content(),
+        '/new.png': make_image_content(),
+    }
+    with serve_files(files) as (url, requested):
+        author = make_author_with_image(f'{url}/old.png')
+        do_command_call(ids=[author.id])
+        author.properties.update(value=f'{url}/new.png')
+
+        result, stdout, stderr = do_command_call(ids=[author.id])
+
+        assert requested == ['/old.png', '/new.png']
+
+    thumbnail = DocumentPersonalAuthorImage.objects.get(author=author)
+    assert thumbnail.source_url == f'{url}/new.png'
+
+
+def test_fetch_author_images_failure(storage, image_rank):
+    with serve_files({}) as (url, requested):
+        author = make_author_with_image(f'{url}/missing.png')
+
+        result, stdout, stderr = do_command_call(ids=[author.id])
+
+    assert stdout.getvalue() == (
+        'Stored 0 author image thumbnail(s), 1 failed.\n'
+    )
+    assert stderr.getvalue().startswith(
+        f'Could not fetch image for author {author.id} ({url}/missing.png): '
+    )
+    assert not DocumentPersonalAuthorImage.objects.filter(
+        author=author
+    ).exists()
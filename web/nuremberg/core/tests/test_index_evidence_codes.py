@@ -0,0 +1,108 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+
+from nuremberg.documents.models import (
+    DocumentEvidenceCodeKey,
+    DocumentSource,
+    DocumentTextEvidenceCodeKey,
+    DocumentTextLink,
+)
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(**kwargs):
+    stdout = StringIO()
+    stderr = StringIO()
+    result = call_command(
+        'index_evidence_codes', stderr=stderr, stdout=stdout, **kwargs
+    )
+    return result, stdout, stderr
+
+
+def test_index_evidence_codes():
+    DocumentEvidenceCodeKey.objects.all().delete()
+    DocumentTextEvidenceCodeKey.objects.all().delete()
+    code = baker.make('DocumentEvidenceCode', prefix__code='NO', number=417)
+    text = baker.make(
+        'DocumentText', evidence_code_series='no', evidence_code_num='0417'
+    )
+    codes_count = code.__class__.objects.count()
+    texts_count = text.__class__.objects.count()
+    links_count = DocumentTextLink.objects.count() + 1
+
+    result, stdout, stderr = do_command_call(batch_size=2)
+
+    assert result is None
+    assert stdout.getvalue() == (
+        f'Created {codes_count} DocumentEvidenceCodeKey(s).\n'
+        f'Created {texts_count} DocumentTextEvidenceCodeKey(s).\n'
+        f'Created {links_count} DocumentTextLink(s).\n'
+    )
+    assert stderr.getvalue() == ''
+    assert code.key.key == 'NO-417'
+    assert code.key.document == code.document
+    assert text.evidence_code_key.key == 'NO-417'
+    assert text.document == code.document
+
+
+def test_index_evidence_codes_rebuilds_keys():
+    code = baker.make('DocumentEvidenceCode', prefix__code='NO', number=417)
+    do_command_call()
+
+    code.number = 418
+    code.save()
+    do_command_call()
+
+    assert DocumentEvidenceCodeKey.objects.get(evidence_code=code).key == (
+        'NO-418'
+    )
+    assert DocumentEvidenceCodeKey.objects.filter(key='NO-417').count() == 0
+
+
+def test_index_evidence_codes_ranks_documents():
+    text = baker.make(
+        'DocumentText', evidence_code_series='NO', evidence_code_num='417'
+    )
+    # the document with most exhibit codes goes first, then the one with the
+    # highest trial priority and the one with the highest source priority
+    sources = {}
+    for source_id, exhibits in [
+        (1, []),
+        (5, []),
+        (2, ['NMT 02']),
+        (3, ['NMT 01', 'NMT 01']),
+        (4, ['IMT']),
+    ]:
+        source = DocumentSource.objects.filter(
+            id=source_id
+        ).first() or baker.make('DocumentSource', id=source_id)
+        document = baker.make('Document', source=source)
+        baker.make(
+            'DocumentEvidenceCode',
+            prefix__code='NO',
+            number=417,
+            document=document,
+        )
+        for case_name in exhibits:
+            baker.make(
+                'DocumentExhibitCode', document=document, case__name=case_name
+            )
+        sources[source_id] = document
+    # a document with a non matching evidence code
+    baker.make('DocumentEvidenceCode', prefix__code='NO', number=418)
+
+    do_command_call()
+
+    expected = [sources[i] for i in (3, 4, 2, 1, 5)]
+    links = DocumentTextLink.objects.filter(text=text).order_by('rank')
+    assert [link.document for link in links] == expected
+    assert [link.rank for link in links] == [0, 1, 2, 3, 4]
+    assert text.document == expected[0]
+    assert list(text.documents()) == expected
+    for document in expected:
+        assert document.full_text == text
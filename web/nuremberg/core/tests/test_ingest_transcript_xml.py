@@ -0,0 +1,164 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from model_bakery import baker
+
+from nuremberg.transcripts.models import TranscriptPage
+from nuremberg.transcripts.tests.helpers import page_xml
+from nuremberg.transcripts.xml import hash_xml
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(*args, **kwargs):
+    return call_command('ingest_transcript_xml', *args, **kwargs)
+
+
+def write_pages(directory, volume, seqs, text=None):
+    for seq in seqs:
+        xml = page_xml(seq, text).replace(
+            '<p>',
+            '<p><runningHead><sessionDate n="1946-12-10">10 Dec</sessionDate>'
+            '</runningHead></p><p>',
+        )
+        path = directory / f'NRMB-NMT01-{volume:02d}_{seq:05d}_0.xml'
+        path.write_text(xml)
+
+
+@pytest.fixture
+def case():
+    return baker.make(
+        'DocumentCase', id=2, name='NMT 1: Medical Case (USA v. Brandt)'
+    )
+
+
+@pytest.fixture
+def xml_dir(tmp_path):
+    write_pages(tmp_path, 1, range(1, 8))
+    write_pages(tmp_path, 2, range(8, 13))
+    (tmp_path / 'README.txt').write_text('not a page')
+    return tmp_path
+
+
+def test_ingest_bulk(case, xml_dir, capsys):
+    do_command_call(
+        str(xml_dir), '-d', '--bulk', '--workers', 2, '--batch-size', 3
+    )
+
+    output = capsys.readouterr().out
+    assert "Don't know how to process this: README.txt" in output
+    assert 'Created transcript Transcript for NMT 1: Medical Case' in output
+    assert 'Checked 7/12 pages, stored 7' in output
+    assert 'Checked 12/12 pages, stored 5' in output
+    assert 'Ingested 12 pages (12 created, 0 updated)' in output
+    assert 'Changed 12 pages, skipped 0 unchanged pages.' in output
+
+    pages = TranscriptPage.objects.filter(transcript=case.transcript)
+    assert pages.count() == 12
+    assert case.transcript.volumes.count() == 2
+    page = pages.get(seq_number=9)
+    assert page.volume.volume_number == 2
+    assert page.volume_seq_number == 9
+    assert page.page_number == 9
+    assert page.page_label == '9'
+    assert page.date.date() == datetime.date(1946, 12, 10)
+    assert page.xml_analysis == page.analysis
+    assert 'Page 9 starts here' in page.text()
+    assert page._url == (
+        '//s3.amazonaws.com/nuremberg-transcripts/NRMB-NMT01-02_00009_0.jpg'
+    )
+    assert case.transcript.total_pages == 12
+
+
+def test_ingest_bulk_updates_pages(case, xml_dir, capsys):
+    do_command_call(str(xml_dir), '-d', '--bulk', '--workers', 2)
+    page = TranscriptPage.objects.get(transcript=case.transcript, seq_number=3)
+    write_pages(xml_dir, 1, [3], text='Updated text')
+    capsys.readouterr()
+
+    do_command_call(str(xml_dir), '-d', '--bulk', '--workers', 2)
+
+    output = capsys.readouterr().out
+    assert 'Created transcript' not in output
+    assert 'Ingested 12 pages (0 created, 1 updated)' in output
+    assert 'Changed 1 pages, skipped 11 unchanged pages.' in output
+    assert case.transcript.pages.count() == 12
+    updated = TranscriptPage.objects.get(id=page.id)
+    assert 'Updated text' in updated.text()
+    assert updated.xml_analysis['text'] == updated.text()
+    assert updated.updated_at > page.updated_at
+
+
+def test_ingest_bulk_matches_ingest(case, xml_dir, capsys):
+    fields = [
+        'volume__volume_number',
+        'volume_seq_number',
+        'seq_number',
+        'page_number',
+        'page_label',
+        'date',
+        'xml',
+        'xml_analysis',
+        '_url',
+    ]
+
+    do_command_call(str(xml_dir), '-d')
+    one_by_one = list(
+        case.transcript.pages.order_by('seq_number').values_list(*fields)
+    )
+    case.transcript.pages.all().delete()
+    do_command_call(str(xml_dir), '-d', '--bulk', '--workers', 2)
+    bulk = list(
+        case.transcript.pages.order_by('seq_number').values_list(*fields)
+    )
+
+    assert bulk == one_by_one
+
+
+@pytest.mark.parametrize('mode', [[], ['--bulk', '--workers', 2]])
+def test_ingest_skips_unchanged(case, xml_dir, tmp_path_factory, mode):
+    do_command_call(str(xml_dir), '-d', *mode)
+    pages = case.transcript.pages.order_by('seq_number')
+    updated_at = list(pages.values_list('updated_at', flat=True))
+    for page in pages:
+        assert page.xml_hash == hash_xml(page.xml)
+
+    write_pages(xml_dir, 1, [3], text='Updated text')
+    write_pages(xml_dir, 2, [9, 10])
+    changed_ids = tmp_path_factory.mktemp('ids') / 'changed.txt'
+    do_command_call(str(xml_dir), '-d', '--changed-ids', changed_ids, *mode)
+
+    changed = [
+        seq
+        for seq, before, after in zip(
+            range(1, 13),
+            updated_at,
+            pages.values_list('updated_at', flat=True),
+        )
+        if before != after
+    ]
+    assert changed == [3]
+    assert changed_ids.read_text() == f'{pages.get(seq_number=3).id}\n'
+
+
+@pytest.mark.parametrize('mode', [[], ['--bulk', '--workers', 2]])
+def test_ingest_force(case, xml_dir, tmp_path_factory, mode, capsys):
+    do_command_call(str(xml_dir), '-d', *mode)
+    capsys.readouterr()
+    changed_ids = tmp_path_factory.mktemp('ids') / 'changed.txt'
+
+    do_command_call(
+        str(xml_dir), '-d', '--force', '--changed-ids', changed_ids, *mode
+    )
+
+    assert 'Changed 12 pages, skipped 0 unchanged pages.' in (
+        capsys.readouterr().out
+    )
+    assert changed_ids.read_text().split() == [
+        str(page_id)
+        for page_id in sorted(
+            case.transcript.pages.values_list('id', flat=True)
+        )
+    ]
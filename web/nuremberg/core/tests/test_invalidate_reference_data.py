@@ -0,0 +1,41 @@
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+
+from nuremberg.core.reference_data import VERSION_CACHE_KEY
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(**kwargs):
+    stdout = StringIO()
+    stderr = StringIO()
+    result = call_command(
+        'invalidate_reference_data', stderr=stderr, stdout=stdout, **kwargs
+    )
+    return result, stdout, stderr
+
+
+def test_invalidate_reference_data(settings):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'invalidate-reference-data-test',
+        }
+    }
+    cache.set(VERSION_CACHE_KEY, 'some version')
+
+    result, stdout, stderr = do_command_call()
+
+    assert result is None
+    assert stderr.getvalue() == ''
+    assert stdout.getvalue() == (
+        'Invalidated reference data for: DocumentCase, '
+        'DocumentEvidencePrefix, DocumentImageType, DocumentLanguage, '
+        'DocumentSource, '
+        'PersonalAuthorPropertyRank\n'
+    )
+    assert cache.get(VERSION_CACHE_KEY) not in (None, 'some version')
@@ -0,0 +1,143 @@
+import pytest
+from django.core.cache import cache
+from model_bakery import baker
+
+from nuremberg.core.reference_data import ReferenceData, reference_data
+from nuremberg.documents.models import (
+    Document,
+    DocumentCase,
+    DocumentEvidenceCode,
+    DocumentEvidencePrefix,
+    DocumentLanguage,
+    DocumentSource,
+    PersonalAuthorPropertyRank,
+)
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def shared_cache(settings):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'reference-data-test',
+        }
+    }
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def test_get_loads_table_once(django_assert_num_queries):
+    language = baker.make('DocumentLanguage', name='Klingon')
+
+    with django_assert_num_queries(1):
+        first = reference_data.get(DocumentLanguage, language.id)
+        second = reference_data.get(DocumentLanguage, language.id)
+        missing = reference_data.get(DocumentLanguage, -1)
+
+    assert first.name == second.name == 'Klingon'
+    # every lookup returns a copy, so shared rows are never modified
+    assert first is not second
+    assert missing is None
+
+
+def test_get_not_registered():
+    with pytest.raises(ValueError):
+        reference_data.get(Document, 1)
+
+
+def test_derived(django_assert_num_queries):
+    baker.make('PersonalAuthorPropertyRank', name='a property', rank=7)
+
+    with django_assert_num_queries(1):
+        for _ in range(3):
+            ranks = PersonalAuthorPropertyRank.ranks()
+
+    assert ranks['a property'] == 7
+    assert ranks == PersonalAuthorPropertyRank.objects.as_dict()
+
+
+def test_invalidate(shared_cache):
+    # two processes sharing the same cache
+    registry = ReferenceData(interval=0)
+    other = ReferenceData(interval=0)
+    registry.register(DocumentLanguage)
+    other.register(DocumentLanguage)
+    language = baker.make('DocumentLanguage', name='Klingon')
+    registry.get(DocumentLanguage, language.id)
+    other.get(DocumentLanguage, language.id)
+    DocumentLanguage.objects.filter(id=language.id).update(name='Vulcan')
+
+    assert other.get(DocumentLanguage, language.id).name == 'Klingon'
+
+    registry.invalidate()
+
+    assert registry.get(DocumentLanguage, language.id).name == 'Vulcan'
+    assert other.get(DocumentLanguage, language.id).name == 'Vulcan'
+
+
+def test_version_checked_every_interval(shared_cache):
+    registry = ReferenceData(interval=3600)
+    registry.register(DocumentLanguage)
+    language = baker.make('DocumentLanguage', name='Klingon')
+    registry.get(DocumentLanguage, language.id)
+    DocumentLanguage.objects.filter(id=language.id).update(name='Vulcan')
+
+    ReferenceData().invalidate()
+
+    # the stamp is not checked again until the interval elapses
+    assert registry.get(DocumentLanguage, language.id).name == 'Klingon'
+    registry.checked_at -= 3600
+    assert registry.get(DocumentLanguage, language.id).name == 'Vulcan'
+
+
+def test_foreign_keys_resolved_from_memory(django_assert_num_queries):
+    document = baker.make(
+        'Document',
+        language__name='Klingon',
+        source__name='Typescript',
+    )
+    prefix = baker.make('DocumentEvidencePrefix', code='NO')
+    for number in range(1, 6):
+        baker.make(
+            'DocumentEvidenceCode',
+            document=document,
+            prefix=prefix,
+            number=number,
+            suffix='',
+        )
+    case = baker.make('DocumentCase', name='NMT 1: Medical Case')
+    baker.make(
+        'DocumentExhibitCode', document=document, case=case, _quantity=3
+    )
+    for model in (
+        DocumentCase,
+        DocumentEvidencePrefix,
+        DocumentLanguage,
+        DocumentSource,
+    ):
+        reference_data.table(model)
+
+    # fetch the document, its evidence codes and its exhibit codes
+    with django_assert_num_queries(3):
+        document = Document.objects.get(id=document.id)
+        names = (document.language_name, document.source_name)
+        codes = [str(code) for code in document.evidence_codes.all()]
+        cases = [code.case.name for code in document.exhibit_codes.all()]
+
+    assert names == ('Klingon', 'Typescript')
+    assert codes == [f'NO-{number}' for number in range(1, 6)]
+    assert cases == ['NMT 1: Medical Case'] * 3
+
+
+def test_foreign_keys_missing_from_memory(django_assert_num_queries):
+    reference_data.table(DocumentEvidencePrefix)
+    # created after loading the reference data
+    code = baker.make('DocumentEvidenceCode', prefix__code='PS', number=1)
+    code = DocumentEvidenceCode.objects.get(id=code.id)
+
+    with django_assert_num_queries(1):
+        assert code.prefix.code == 'PS'
@@ -0,0 +1,80 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from nuremberg.transcripts.models import RenderedTranscriptPage, TranscriptPage
+from nuremberg.transcripts.tests.helpers import make_transcript, page_xml
+
+
+pytestmark = pytest.mark.django_db
+
+
+def do_command_call(*args, **kwargs):
+    stdout = StringIO()
+    stderr = StringIO()
+    result = call_command(
+        'render_transcripts', *args, stderr=stderr, stdout=stdout, **kwargs
+    )
+    return result, stdout, stderr
+
+
+@pytest.fixture
+def transcripts():
+    return [make_transcript(pages=12), make_transcript(pages=5)]
+
+
+def test_render_transcripts(transcripts):
+    ids = [transcript.id for transcript in transcripts]
+    result, stdout, stderr = do_command_call('--ids', *ids, '--workers', 2)
+
+    assert result is None
+    assert stderr.getvalue() == ''
+    assert stdout.getvalue() == (
+        'Rendered 17 page(s) of 2 transcript(s), 0 failed.\n'
+    )
+    rendered = RenderedTranscriptPage.objects.select_related('page').get(
+        page__transcript=transcripts[0], page__seq_number=2
+    )
+    assert rendered.page_updated_at == rendered.page.updated_at
+    assert rendered.html.startswith('<p>\n Page 2 starts here and it goes on')
+    assert rendered.html.endswith('the previous page ends here.\n</p>\n')
+
+
+def test_render_transcripts_only_changed(transcripts):
+    ids = [transcript.id for transcript in transcripts]
+    do_command_call('--ids', *ids)
+
+    result, stdout, stderr = do_command_call('--ids', *ids)
+
+    assert stdout.getvalue() == (
+        'Rendered 0 page(s) of 0 transcript(s), 0 failed.\n'
+    )
+
+    page = TranscriptPage.objects.get(transcript=transcripts[1], seq_number=3)
+    page.xml = page_xml(3, 'the previous page ends here. Updated text')
+    page.save()
+
+    result, stdout, stderr = do_command_call('--ids', *ids)
+
+    assert stdout.getvalue() == (
+        'Rendered 5 page(s) of 1 transcript(s), 0 failed.\n'
+    )
+    assert 'Updated text' in page.rendered.html
+
+
+def test_render_transcripts_force(transcripts):
+    ids = [transcript.id for transcript in transcripts]
+    do_command_call('--ids', *ids)
+
+    result, stdout, stderr = do_command_call('--ids', *ids, '--force')
+
+    assert stdout.getvalue() == (
+        'Rendered 17 page(s) of 2 transcript(s), 0 failed.\n'
+    )
+    assert (
+        RenderedTranscriptPage.objects.filter(
+            page__transcript__in=transcripts
+        ).count()
+        == 17
+    )
@@ -0,0 +1,82 @@
+"""Local thumbnails for the Wikidata images of personal authors.
+
+Author metadata points to full size images hosted by Wikimedia, which can be
+several MB each. The `fetch_author_images` management command downloads them
+and stores a small thumbnail per author in the DocumentStorage as:
+
+    authors/<author id>/<hash of the original URL>.jpg
+
+and `DocumentPersonalAuthor.metadata()` points to the thumbnail instead of the
+original image once it's available.
+
+Images are downloaded with the HTTP client configured in the
+`AUTHOR_IMAGES_HTTP_CLIENT` setting: any class whose instances have a
+`get(url)` method returning the response content as bytes.
+
+"""
+import hashlib
+from io import BytesIO
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from nuremberg.core.storages import DocumentStorage, overwrite
+
+
+# Author images are shown 200px wide, thumbnails are big enough for 2x screens
+THUMBNAIL_SIZE = (400, 400)
+THUMBNAIL_QUALITY = 85
+
+
+class HttpClient:
+    """Fetch URLs with `requests`, with the user agent Wikimedia asks for."""
+
+    user_agent = (
+        'HLSNurembergTrialsProject/1.0 (https://nuremberg.law.harvard.edu)'
+    )
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = self.user_agent
+
+    def get(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+
+def get_http_client():
+    return import_string(settings.AUTHOR_IMAGES_HTTP_CLIENT)()
+
+
+def thumbnail_path(author_id, url):
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+    return f'authors/{author_id}/{digest}.jpg'
+
+
+def build_thumbnail(author_id, url, client=None, storage=None):
+    """Fetch the image at `url` and store a thumbnail for it.
+
+    Return the `(name, width, height)` of the stored thumbnail. This only uses
+    the HTTP client and the storage, so it's safe to run it in a separate
+    thread or process.
+
+    """
+    client = client or get_http_client()
+    storage = storage or DocumentStorage()
+
+    image = Image.open(BytesIO(client.get(url)))
+    # JPEG images can be scaled down while decoding, much faster for big ones
+    image.draft('RGB', THUMBNAIL_SIZE)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+
+    data = BytesIO()
+    image.save(data, format='JPEG', quality=THUMBNAIL_QUALITY)
+    name = thumbnail_path(author_id, url)
+    overwrite(storage, name, data.getvalue())
+    return name, image.width, image.height
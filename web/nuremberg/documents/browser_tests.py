@@ -9,11 +9,7 @@ from selenium.webdriver.support.expected_conditions import (
 )
 from selenium.webdriver.support.ui import Select, WebDriverWait as wait
 
-from nuremberg.core.tests.clientside_helpers import (
-    at,
-    element_has_attribute,
-    global_variable_exists,
-)
+from nuremberg.core.tests.clientside_helpers import at
 from nuremberg.core.tests.clientside_helpers import (  # noqa, pytest fixtures
     browser,
     unblocked_live_server,
@@ -157,31 +153,17 @@ def test_page_navigation(document, viewport):
 
 
 def test_pdf_generation(document):
-    # extremely ugly shim to detect PDF save
-    document.execute_script(
-        """
-        var _cENS = document.createElementNS;
-        document.createElementNS = function () {
-            document.createElementNS = _cENS;
-            window.save_link = document.createElementNS.apply(document, arguments);
-            window.save_link.dispatchEvent = function () {
-                window.save_link_clicked = true;
-            };
-            document.body.appendChild(window.save_link);
-            return window.save_link;
-        }"""
-    )
-
     document.find_element(By.CSS_SELECTOR, 'button.download-pdf').click()
-    inner_save_link = wait(document, 10).until(
-        global_variable_exists('save_link')
-    )
     save_link = wait(document, 1).until(
         visibility_of_element_located(at('.download-options a'))
     )
+    # stay on the page, only check the link to the PDF built by the server
+    document.execute_script(
+        "arguments[0].addEventListener('click', e => e.preventDefault());",
+        save_link,
+    )
     save_link.click()
     document.save_screenshot('screenshots/building-pdf.png')
-    download = wait(document, 30).until(
-        element_has_attribute(inner_save_link, 'download')
+    assert save_link.get_attribute('href').endswith(
+        reverse('documents:pdf', kwargs={'document_id': 1}) + '?from=1&to=20'
     )
-    assert 'HLSL Nuremberg Document #1 pages 1-20.pdf' in download
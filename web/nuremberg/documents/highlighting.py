@@ -0,0 +1,109 @@
+"""Highlighting of search terms in full-text documents.
+
+Full texts can be hundreds of KB long, so every term of the query is matched
+in a single pass with one compiled regular expression. The highlighted texts
+for the last few (text, query) pairs are kept in memory, so moving back and
+forth between search results and a highlighted document is cheap.
+
+"""
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.utils.html import strip_tags
+
+from nuremberg.search.forms import FieldedSearchForm
+
+
+HIGHLIGHT_START = '<mark class="highlighted">'
+HIGHLIGHT_END = '</mark>'
+
+# Amount of highlighted texts kept in memory (per process)
+CACHE_SIZE = 16
+
+
+def normalize_query(query):
+    """Return the sorted, lower cased, unique highlight terms for `query`."""
+    return tuple(
+        sorted(
+            {term.lower() for term in FieldedSearchForm.highlight_terms(query)}
+        )
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_terms(terms):
+    """Return a case insensitive regex matching any of `terms`.
+
+    Longer terms are tried first, so overlapping terms highlight the longest
+    match.
+
+    """
+    return re.compile(
+        '|'.join(
+            re.escape(term) for term in sorted(terms, key=len, reverse=True)
+        ),
+        re.IGNORECASE,
+    )
+
+
+class LRUCache:
+    """A small thread safe least recently used cache."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                self.data.move_to_end(key)
+            except KeyError:
+                return None
+            return self.data[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+highlighted_texts = LRUCache(CACHE_SIZE)
+
+
+def highlight(text, query):
+    """Return `text` with every match of the `query` terms highlighted.
+
+    HTML tags are stripped from `text` before highlighting.
+
+    """
+    text = strip_tags(text or '')
+    terms = normalize_query(query)
+    if not terms:
+        return text
+    return compile_terms(terms).sub(
+        rf'{HIGHLIGHT_START}\g<0>{HIGHLIGHT_END}', text
+    )
+
+
+def highlight_full_text(full_text, query):
+    """Return the text of the `full_text` DocumentText highlighted.
+
+    Results are cached by text id and normalized query (plus the text load
+    timestamp, so reloaded texts are never served stale).
+
+    """
+    key = (full_text.id, full_text.load_timestamp, normalize_query(query))
+    result = highlighted_texts.get(key)
+    if result is None:
+        result = highlight(full_text.text, query)
+        highlighted_texts.set(key, result)
+    return result
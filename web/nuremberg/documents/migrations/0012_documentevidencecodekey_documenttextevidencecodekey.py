@@ -0,0 +1,29 @@
+# Generated by Django 4.1.2 on 2026-10-17 00:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0011_documenttext_alter_documentactivity_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentTextEvidenceCodeKey',
+            fields=[
+                ('text', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='evidence_code_key', serialize=False, to='documents.documenttext')),
+                ('key', models.CharField(db_index=True, max_length=200)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DocumentEvidenceCodeKey',
+            fields=[
+                ('evidence_code', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='key', serialize=False, to='documents.documentevidencecode')),
+                ('key', models.CharField(db_index=True, max_length=200)),
+                ('document', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='evidence_code_keys', to='documents.document')),
+            ],
+        ),
+    ]
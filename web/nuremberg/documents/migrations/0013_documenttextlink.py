@@ -0,0 +1,26 @@
+# Generated by Django 4.1.2 on 2026-10-17 00:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0012_documentevidencecodekey_documenttextevidencecodekey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentTextLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField()),
+                ('document', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='text_links', to='documents.document')),
+                ('text', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='document_links', to='documents.documenttext')),
+            ],
+            options={
+                'unique_together': {('text', 'document')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.2 on 2026-10-17 00:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0013_documenttextlink'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentPersonalAuthorMetadata',
+            fields=[
+                ('author', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='stored_metadata', serialize=False, to='documents.documentpersonalauthor')),
+                ('metadata', models.JSONField()),
+                ('load_timestamp', models.DateTimeField(null=True)),
+                ('ranks_load_timestamp', models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
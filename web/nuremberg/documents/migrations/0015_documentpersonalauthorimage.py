@@ -0,0 +1,25 @@
+# Generated by Django 4.1.2 on 2026-10-17 00:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+import nuremberg.core.storages
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0014_documentpersonalauthormetadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentPersonalAuthorImage',
+            fields=[
+                ('author', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='image_thumbnail', serialize=False, to='documents.documentpersonalauthor')),
+                ('source_url', models.URLField(max_length=1000)),
+                ('image', models.ImageField(storage=nuremberg.core.storages.DocumentStorage(), upload_to='')),
+                ('width', models.IntegerField()),
+                ('height', models.IntegerField()),
+            ],
+        ),
+    ]
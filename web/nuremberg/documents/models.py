@@ -1,20 +1,35 @@
 import datetime
+import itertools
 import logging
 import operator
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 
 from django.db import models
-from django.db.models import Case, Count, Value, When
-from django.db.models.functions import Concat
+from django.db.models import Case, Count, Prefetch, Value, When
 from django.utils.functional import cached_property
 from django.utils.text import slugify
 
+from nuremberg.core.reference_data import ReferenceForeignKey, reference_data
 from nuremberg.core.storages import DocumentStorage
 
 
 logger = logging.getLogger(__name__)
 
 
+def evidence_code_key(series, number):
+    """Return the normalized evidence code key for `series` and `number`.
+
+    Keys are used to match full-text documents with documents described by
+    metadata, so `('ps', '0398')` and `('PS', 398)` result in the same key.
+
+    """
+    series = (series or '').strip().upper()
+    number = str(number if number is not None else '').strip()
+    if number.isdigit():
+        number = str(int(number))
+    return f'{series}-{number}'
+
+
 class Document(models.Model):
     id = models.AutoField(primary_key=True, db_column='DocID')
     title = models.CharField(max_length=255, db_column='TitleDescriptive')
@@ -23,10 +38,10 @@ class Document(models.Model):
 
     image_count = models.IntegerField(db_column='NoOfImages', default=0)
 
-    language = models.ForeignKey(
+    language = ReferenceForeignKey(
         'DocumentLanguage', db_column='DocLanguageID', on_delete=models.PROTECT
     )
-    source = models.ForeignKey(
+    source = ReferenceForeignKey(
         'DocumentSource', db_column='DocVersionID', on_delete=models.PROTECT
     )
 
@@ -39,7 +54,27 @@ class Document(models.Model):
 
     @cached_property
     def full_text(self):
-        return self.full_texts().first()
+        """The DocumentText for this instance, as stored in the text links.
+
+        Prefer the texts for which this document is the best ranked match.
+
+        """
+        return (
+            DocumentText.objects.filter(document_links__document_id=self.id)
+            .order_by('document_links__rank', 'id')
+            .first()
+        )
+
+    @cached_property
+    def version(self):
+        """A string identifying the current state of this document.
+
+        It changes whenever `updated_at` does, so it's suitable for ETags and
+        cache keys. It's `None` when the document has no `updated_at`.
+
+        """
+        if self.updated_at is not None:
+            return f'{self.id}-{self.updated_at.timestamp()}'
 
     @cached_property
     def language_name(self):
@@ -60,18 +95,91 @@ class Document(models.Model):
     def page_range(self):
         return range(1, (self.image_count or 0) + 1)
 
+    @cached_property
+    def image_index(self):
+        """Map each `(page_number, scale)` pair to its DocumentImage.
+
+        The index is built once per instance from `images.all()` (so it makes
+        use of a potential `prefetch_related('images')`), and is shared by
+        every image of this document when looking up its other scales.
+
+        """
+        result = {}
+        for image in self.images.all():
+            # keep the first image found for a given page and scale
+            result.setdefault((image.page_number, image.scale), image)
+        return result
+
     def images_screen(self):
-        test_empty = self.images.all()
-        test_empty = len(test_empty)
-        if test_empty:
-            return (
+        if self.image_index:
+            return [
                 image
                 for image in self.images.all()
                 if image.scale == DocumentImage.SCREEN
-            )
+            ]
         else:
             return "no images"
 
+    def page_images(self):
+        """Return a PageImage for every page with a screen scale image.
+
+        Thumb and full scale URLs are included when available. Use along with
+        `DocumentImage.prefetch()` to load only the images needed.
+
+        """
+        index = self.image_index
+        return [
+            PageImage(
+                page_number=page_number,
+                url=image.url,
+                width=image.width,
+                height=image.height,
+                thumb_url=getattr(
+                    index.get((page_number, DocumentImage.THUMB)), 'url', None
+                ),
+                full_url=getattr(
+                    index.get((page_number, DocumentImage.FULL)), 'url', None
+                ),
+            )
+            for (page_number, scale), image in sorted(index.items())
+            if scale == DocumentImage.SCREEN
+        ]
+
+    def manifest(self):
+        """Describe every page of this document and its available images.
+
+        The result is plain data (suitable for JSON serialization) listing,
+        for each page, its number, its physical page number, and the URL and
+        dimensions of every available image scale.
+
+        """
+        scale_names = dict(DocumentImage.IMAGE_SCALES)
+        pages = {}
+        for image in self.images.all():
+            page = pages.setdefault(
+                image.page_number,
+                {
+                    'page': image.page_number,
+                    'physical_page': image.physical_page_number,
+                    'scales': {},
+                },
+            )
+            if page['physical_page'] is None:
+                page['physical_page'] = image.physical_page_number
+            page['scales'].setdefault(
+                scale_names.get(image.scale, image.scale),
+                {
+                    'url': image.url,
+                    'width': image.width,
+                    'height': image.height,
+                },
+            )
+        return {
+            'id': self.id,
+            'total_pages': self.total_pages,
+            'pages': list(pages.values()),
+        }
+
     def date(self):
         date = self.dates.first()
         if date:
@@ -114,26 +222,27 @@ class Document(models.Model):
         "Evidence File code" or "EF code", e.g., PS-398 or NOKW-222).
 
         """
-        # ToDo: improve query by not needing the annotation and filtering.
-        # Consider using instead:
-        #   DocumentEvidenceCode.number
-        #   DocumentEvidenceCode.prefix.code
-        # (may need some extra prefetching for DocumentEvidencePrefix)
-
         # Do not use the plain `str` of DocumentEvidenceCode since for codes
         # with a suffix, the `str` representation will not match (like PS-343a)
-        evidence_codes = [
-            f'{e.prefix.code}-{e.number}' for e in self.evidence_codes.all()
+        keys = [
+            evidence_code_key(e.prefix.code, e.number)
+            for e in self.evidence_codes.all()
         ]
-        result = DocumentText.objects.annotate(
-            evidence_code=Concat(
-                'evidence_code_series', Value('-'), 'evidence_code_num'
-            ),
-        ).filter(evidence_code__in=evidence_codes)
+        # The keys are materialized and indexed by the `index_evidence_codes`
+        # management command, so this is an index lookup instead of a scan
+        # over every full-text row.
+        result = DocumentText.objects.filter(evidence_code_key__key__in=keys)
         # XXX: sort in a meaningful way in the unlikely case there are multiple
         return result
 
 
+# Lightweight, read only representation of a document page image
+PageImage = namedtuple(
+    'PageImage',
+    ['page_number', 'url', 'width', 'height', 'thumb_url', 'full_url'],
+)
+
+
 class DocumentImage(models.Model):
 
     THUMB = 't'
@@ -164,17 +273,45 @@ class DocumentImage(models.Model):
     # END DEPRECATED in favor of `image`
 
     scale = models.CharField(max_length=1, choices=IMAGE_SCALES)
-    image_type = models.ForeignKey(
+    image_type = ReferenceForeignKey(
         'DocumentImageType', on_delete=models.PROTECT
     )
     image = models.ImageField(null=True, blank=True, storage=DocumentStorage())
 
+    # Fields needed to render images, see `prefetch`
+    RENDER_FIELDS = (
+        'id',
+        'document_id',
+        'page_number',
+        'scale',
+        'width',
+        'height',
+        'image',
+        '_url',
+    )
+
     class Meta:
         ordering = ['page_number']
 
+    @classmethod
+    def prefetch(cls, *scales):
+        """Return a Prefetch loading only the `scales` images of documents.
+
+        Only the fields needed to render the images are loaded. The resulting
+        `document.images.all()` (and `document.image_index`) will only include
+        images for the given scales.
+
+        """
+        return Prefetch(
+            'images',
+            queryset=cls.objects.filter(scale__in=scales).only(
+                *cls.RENDER_FIELDS
+            ),
+        )
+
     def __str__(self):
         return "#{} Page {} {} {}x{}".format(
-            self.document.id,
+            self.document_id,
             self.page_number,
             self.scale,
             self.width,
@@ -196,14 +333,7 @@ class DocumentImage(models.Model):
         if self.scale == scale:
             return self.url
         else:
-            images = self.document.images.all()
-            filter = (
-                image
-                for image in images
-                if image.page_number == self.page_number
-                and image.scale == scale
-            )
-            scaled = next(filter, None)
+            scaled = self.document.image_index.get((self.page_number, scale))
             if scaled:
                 return scaled.url
             else:
@@ -245,7 +375,7 @@ class OldDocumentImage(models.Model):
         db_column='FileName', max_length=8, blank=True, null=True
     )
 
-    image_type = models.ForeignKey(
+    image_type = ReferenceForeignKey(
         'DocumentImageType', db_column='PageTypeID', on_delete=models.PROTECT
     )
 
@@ -254,6 +384,7 @@ class OldDocumentImage(models.Model):
         db_table = 'tblImagesList'
 
 
+@reference_data.register
 class DocumentImageType(models.Model):
     id = models.AutoField(primary_key=True, db_column='PageTypeID')
     name = models.CharField(max_length=50, db_column='PageType')
@@ -266,6 +397,7 @@ class DocumentImageType(models.Model):
         return self.name
 
 
+@reference_data.register
 class DocumentSource(models.Model):
     id = models.AutoField(primary_key=True, db_column='VersionID')
     name = models.CharField(max_length=50, db_column='Version')
@@ -278,6 +410,7 @@ class DocumentSource(models.Model):
         return self.name
 
 
+@reference_data.register
 class DocumentLanguage(models.Model):
     id = models.AutoField(primary_key=True, db_column='LanguageID')
     name = models.CharField(max_length=15, db_column='Language')
@@ -329,20 +462,74 @@ class DocumentDate(models.Model):
         return result
 
 
+def group_author_properties(authors):
+    """Yield `(author, properties)` for every author in `authors`.
+
+    Properties for all the authors are streamed with a single query ordered by
+    author, and grouped in a single pass. Authors are yielded ordered by id.
+
+    """
+    authors = sorted(authors, key=operator.attrgetter('id'))
+    properties = (
+        PersonalAuthorProperty.objects.filter(
+            personal_author_id__in={author.id for author in authors}
+        )
+        .order_by('personal_author_id', 'id')
+        .iterator()
+    )
+    groups = (
+        (author_id, list(group))
+        for author_id, group in itertools.groupby(
+            properties, key=operator.attrgetter('personal_author_id')
+        )
+    )
+    author_id, group = next(groups, (None, []))
+    for author in authors:
+        while author_id is not None and author_id < author.id:
+            author_id, group = next(groups, (None, []))
+        yield author, group if author_id == author.id else []
+
+
 class DocumentPersonalAuthorQuerySet(models.QuerySet):
+    def _metadata_by_id(self, authors, **kwargs):
+        result = {}
+        missing = []
+        for author in authors:
+            if author.get_stored_metadata() is None:
+                missing.append(author)
+            else:
+                result[author.id] = author.metadata(**kwargs)
+
+        if missing:
+            # Given than ranks are not available via DB relationships (yet?),
+            # we use the cached ranks to avoid many queries when iterating
+            # over every author property.
+            ranks = PersonalAuthorPropertyRank.ranks()
+            for author, properties in group_author_properties(missing):
+                result[author.id] = author.metadata(
+                    ranks, properties=properties, **kwargs
+                )
+        return result
+
+    def metadata_by_id(self, **kwargs):
+        """Return a dict mapping author ids to their metadata.
+
+        Stored metadata is read along with the authors, so usually this is a
+        single query. Metadata for authors with no stored metadata is built
+        from their properties, fetched all at once (2 queries in total).
+
+        """
+        return self._metadata_by_id(
+            self.select_related('stored_metadata', 'image_thumbnail'), **kwargs
+        )
+
     def metadata(self, **kwargs):
-        # Given than ranks are not available via DB relationships (yet?), we
-        # cache them all to avoid many queries when iterating over every author
-        # property. This is total 3 queries! \o/
-        ranks = dict(
-            PersonalAuthorPropertyRank.objects.all().values_list(
-                'name', 'rank'
-            )
+        """Return the metadata of every author, in the queryset order."""
+        authors = list(
+            self.select_related('stored_metadata', 'image_thumbnail')
         )
-        return [
-            author.metadata(ranks, **kwargs)
-            for author in self.prefetch_related('properties')
-        ]
+        metadata = self._metadata_by_id(authors, **kwargs)
+        return [metadata[author.id] for author in authors]
 
 
 DocumentPersonalAuthorManager = DocumentPersonalAuthorQuerySet.as_manager
@@ -380,46 +567,122 @@ class DocumentPersonalAuthor(models.Model):
         else:
             return self.first_name or self.last_name or 'Unknown'
 
+    def get_stored_metadata(self):
+        """Return the stored metadata for this author, or None."""
+        try:
+            return self.stored_metadata
+        except DocumentPersonalAuthorMetadata.DoesNotExist:
+            return None
+
+    def get_image_thumbnail(self):
+        """Return the local thumbnail for the image of this author, or None."""
+        try:
+            return self.image_thumbnail
+        except DocumentPersonalAuthorImage.DoesNotExist:
+            return None
+
     def metadata(
         self,
         ranks=None,
+        properties=None,
         max_properties=None,
         max_property_values=None,
         max_qualifiers=None,
         max_qualifier_values=None,
     ):
-        result = {
+        """Return the author details along with their ranked properties.
+
+        The stored metadata (see the `build_author_metadata` management
+        command) is used when available, otherwise it's built from the author
+        properties. The `max_*` limits are applied to the resulting lists.
+        Images point to their local thumbnail when available (see the
+        `fetch_author_images` management command).
+
+        """
+        stored = self.get_stored_metadata()
+        if stored:
+            built = stored.metadata
+        else:
+            built = self.build_metadata(ranks, properties)
+
+        image = built['image']
+        thumbnail = self.get_image_thumbnail() if image else None
+        if thumbnail and thumbnail.source_url == image['url']:
+            image = {
+                'url': thumbnail.image.url,
+                'alt': image['alt'],
+                'original_url': image['url'],
+            }
+
+        return {
             'author': {
                 'name': self.full_name(),
                 'id': self.id,
                 'slug': self.slug,
                 'title': self.title,
-                'description': '',
+                'description': built['description'],
             },
-            'image': None,
-            'properties': [],
+            'image': image,
+            'properties': [
+                {
+                    'rank': prop['rank'],
+                    'name': prop['name'],
+                    'prop_values': [
+                        {
+                            'value': prop_value['value'],
+                            'qualifiers': [
+                                (
+                                    name,
+                                    [
+                                        # periods are stored as lists
+                                        tuple(v) if isinstance(v, list) else v
+                                        for v in values[:max_qualifier_values]
+                                    ],
+                                )
+                                for name, values in prop_value['qualifiers'][
+                                    :max_qualifiers
+                                ]
+                            ],
+                        }
+                        for prop_value in prop['prop_values'][
+                            :max_property_values
+                        ]
+                    ],
+                }
+                for prop in built['properties'][:max_properties]
+            ],
         }
 
+    def build_metadata(self, ranks=None, properties=None):
+        """Group the author properties by name, value and qualifier.
+
+        Return a JSON serializable dict with the author description and image,
+        and every ranked property sorted by rank, with no limits applied.
+        `properties` defaults to every property of this author.
+
+        """
+        result = {'description': '', 'image': None, 'properties': []}
+
         if ranks is None:  # reuse rank information between exploded properties
-            ranks = dict(
-                PersonalAuthorPropertyRank.objects.all().values_list(
-                    'name', 'rank'
-                )
-            )
+            ranks = PersonalAuthorPropertyRank.ranks()
 
         # Properties grouped by name, then by qualifier
         grouped_props = defaultdict(lambda: {'rank': 0, 'prop_values': {}})
 
-        # use all() with no modifiers, make use of potential prefetch_related
-        for p in self.properties.all():
+        if properties is None:
+            # use all() with no modifiers, make use of potential
+            # prefetch_related
+            properties = self.properties.all()
+
+        for p in properties:
             rank = ranks.get(p.name)
 
             if rank is None or rank < 1:
                 continue
 
-            if not result['author']['description']:
+            if not result['description']:
                 # use first non empty property to update author's description
-                result['author']['description'] = p.personal_author_description
+                result['description'] = p.personal_author_description
 
             key = p.name
 
@@ -495,7 +758,7 @@ class DocumentPersonalAuthor(models.Model):
             for prop_value, qualifiers in prop_items['prop_values'].items():
                 prop_items['prop_values'][prop_value] = sorted_qualifiers = {
                     # sort the qualifier's values alphabetically
-                    q: sorted(qs)[:max_qualifier_values]
+                    q: sorted(qs)
                     for q, qs in qualifiers.items()
                 }
 
@@ -534,22 +797,20 @@ class DocumentPersonalAuthor(models.Model):
                         (
                             {
                                 'value': value,
-                                'qualifiers': sorted(qualifiers.items())[
-                                    :max_qualifiers
-                                ],
+                                'qualifiers': sorted(qualifiers.items()),
                             }
                             for value, qualifiers in props[
                                 'prop_values'
                             ].items()
                         ),
                         key=operator.itemgetter('value'),
-                    )[:max_property_values],
+                    ),
                 }
                 for name, props in grouped_props.items()
             ),
             key=operator.itemgetter('rank'),
             reverse=True,
-        )[:max_properties]
+        )
 
         return result
 
@@ -617,6 +878,13 @@ class DocumentsToGroupAuthors(models.Model):
         db_table = 'tblGroupAuthorsList'
 
 
+class PersonalAuthorPropertyRankQuerySet(models.QuerySet):
+    def as_dict(self):
+        """Return a dict mapping property names to their ranks."""
+        return dict(self.values_list('name', 'rank'))
+
+
+@reference_data.register
 class PersonalAuthorPropertyRank(models.Model):
     id = models.AutoField(db_column='RecordID', primary_key=True)
     name = models.CharField(db_column='Property', max_length=200, unique=True)
@@ -624,6 +892,8 @@ class PersonalAuthorPropertyRank(models.Model):
     rank = models.IntegerField(db_column='PropertyRank')
     load_timestamp = models.DateTimeField(db_column='LoadTimeStamp')
 
+    objects = PersonalAuthorPropertyRankQuerySet.as_manager()
+
     class Meta:
         managed = False
         db_table = 'tblNurAuthorsWikidataPropertiesRanked'
@@ -633,6 +903,13 @@ class PersonalAuthorPropertyRank(models.Model):
             self.name, self.rank, self.instance_count
         )
 
+    @classmethod
+    def ranks(cls):
+        """Return a dict mapping property names to their ranks (cached)."""
+        return reference_data.derived(
+            cls, 'ranks', lambda ranks: {r.name: r.rank for r in ranks}
+        )
+
 
 class PersonalAuthorProperty(models.Model):
     id = models.AutoField(db_column='RecordID', primary_key=True)
@@ -688,6 +965,7 @@ class PersonalAuthorProperty(models.Model):
             return result.rank
 
 
+@reference_data.register
 class DocumentCase(models.Model):
     id = models.AutoField(primary_key=True, db_column='CaseID')
     name = models.CharField(max_length=100, db_column='Case_temp')
@@ -751,7 +1029,7 @@ class DocumentDefendant(models.Model):
     id = models.AutoField(primary_key=True, db_column='DefendantID')
     last_name = models.CharField(max_length=110, db_column='DefLName')
     first_name = models.CharField(max_length=25, db_column='DefFName')
-    case = models.ForeignKey(
+    case = ReferenceForeignKey(
         DocumentCase,
         related_name='defendants',
         db_column='CaseID',
@@ -806,7 +1084,7 @@ class DocumentActivity(models.Model):
 
     id = models.AutoField(primary_key=True, db_column='ActivityID')
     name = models.CharField(max_length=100, db_column='Activity')
-    case = models.ForeignKey(
+    case = ReferenceForeignKey(
         DocumentCase,
         related_name='activities',
         db_column='CaseID',
@@ -848,6 +1126,7 @@ class DocumentsToActivities(models.Model):
         db_table = 'tblActivitiesList'
 
 
+@reference_data.register
 class DocumentEvidencePrefix(models.Model):
     id = models.AutoField(
         db_column='NMTCodeID', primary_key=True
@@ -868,7 +1147,7 @@ class DocumentEvidenceCode(models.Model):
     id = models.AutoField(
         db_column='NMTListID', primary_key=True
     )  # Field name made lowercase.
-    prefix = models.ForeignKey(
+    prefix = ReferenceForeignKey(
         DocumentEvidencePrefix,
         db_column='NMTListCodeID',
         on_delete=models.PROTECT,
@@ -903,7 +1182,7 @@ class DocumentExhibitCodeName(models.Model):
     name = models.CharField(
         db_column='DefenseExhName', max_length=50, blank=True, null=True
     )  # Field name made lowercase.
-    case = models.ForeignKey(
+    case = ReferenceForeignKey(
         DocumentCase, db_column='CaseID', on_delete=models.CASCADE
     )
 
@@ -923,7 +1202,7 @@ class DocumentExhibitCode(models.Model):
         on_delete=models.CASCADE,
     )
 
-    case = models.ForeignKey(
+    case = ReferenceForeignKey(
         DocumentCase, db_column='DocCaseID', on_delete=models.CASCADE
     )
     prosecution_number = models.IntegerField(
@@ -1006,6 +1285,8 @@ class DocumentExhibitCode(models.Model):
 
 
 class DocumentText(models.Model):
+    RANKING = ('-exhibit_codes_count', '-cases_score', '-source_score')
+
     id = models.AutoField(db_column='RecordID', primary_key=True)
     title = models.CharField(db_column='Title', max_length=1000)
     evidence_code_tag = models.CharField(db_column='DocID', max_length=100)
@@ -1062,7 +1343,56 @@ class DocumentText(models.Model):
 
     @cached_property
     def document(self):
-        return self.documents().first()
+        """The best ranked Document for this text, as stored in the links.
+
+        The links are computed by the `index_evidence_codes` management
+        command using the same ranking as `documents()`.
+
+        """
+        return (
+            Document.objects.filter(text_links__text_id=self.id)
+            .order_by('text_links__rank')
+            .first()
+        )
+
+    @staticmethod
+    def rank_documents(queryset):
+        """Annotate `queryset` with the scores used to rank Documents.
+
+        Sorting by `RANKING` puts the best ranked documents first, see the
+        `documents()` docstring for details.
+
+        """
+        # Calculate trial exhibit priority as explained in `documents()`
+        cases_score = Case(
+            When(exhibit_codes__case__name__startswith='IMT', then=100),
+            When(exhibit_codes__case__name__startswith='NMT 11', then=12),
+            When(exhibit_codes__case__name__startswith='NMT 12', then=11),
+            When(exhibit_codes__case__name__startswith='NMT 06', then=10),
+            When(exhibit_codes__case__name__startswith='NMT 10', then=9),
+            When(exhibit_codes__case__name__startswith='NMT 09', then=8),
+            When(exhibit_codes__case__name__startswith='NMT 07', then=7),
+            When(exhibit_codes__case__name__startswith='NMT 08', then=6),
+            When(exhibit_codes__case__name__startswith='NMT 01', then=5),
+            When(exhibit_codes__case__name__startswith='NMT 03', then=4),
+            When(exhibit_codes__case__name__startswith='NMT 04', then=3),
+            When(exhibit_codes__case__name__startswith='NMT 05', then=2),
+            When(exhibit_codes__case__name__startswith='NMT 02', then=1),
+            default=Value(0),
+        )
+        # Calculate document source priority as explained above
+        source_score = Case(
+            When(source_id=1, then=10),  # Case Files/English
+            When(source_id=9, then=9),  # Staff Evidence Analysis
+            When(source_id=11, then=8),  # Typescript--German
+            When(source_id=5, then=7),  # Photostat
+            default=Value(0),
+        )
+        return queryset.annotate(
+            exhibit_codes_count=Count('exhibit_codes'),
+            cases_score=cases_score,
+            source_score=source_score,
+        )
 
     def documents(self):
         """Fetch the most relevant Document for this DocumentText.
@@ -1115,51 +1445,142 @@ class DocumentText(models.Model):
             )
             return Document.objects.none()
 
-        # Calculate trial exhibit priority as explained in the docstring
-        cases_score = Case(
-            When(exhibit_codes__case__name__startswith='IMT', then=100),
-            When(exhibit_codes__case__name__startswith='NMT 11', then=12),
-            When(exhibit_codes__case__name__startswith='NMT 12', then=11),
-            When(exhibit_codes__case__name__startswith='NMT 06', then=10),
-            When(exhibit_codes__case__name__startswith='NMT 10', then=9),
-            When(exhibit_codes__case__name__startswith='NMT 09', then=8),
-            When(exhibit_codes__case__name__startswith='NMT 07', then=7),
-            When(exhibit_codes__case__name__startswith='NMT 08', then=6),
-            When(exhibit_codes__case__name__startswith='NMT 01', then=5),
-            When(exhibit_codes__case__name__startswith='NMT 03', then=4),
-            When(exhibit_codes__case__name__startswith='NMT 04', then=3),
-            When(exhibit_codes__case__name__startswith='NMT 05', then=2),
-            When(exhibit_codes__case__name__startswith='NMT 02', then=1),
-            default=Value(0),
-        )
-        # Calculate document source priority as explained above
-        source_score = Case(
-            When(source_id=1, then=10),  # Case Files/English
-            When(source_id=9, then=9),  # Staff Evidence Analysis
-            When(source_id=11, then=8),  # Typescript--German
-            When(source_id=5, then=7),  # Photostat
-            default=Value(0),
-        )
         # We can't use `self.evidence_code_tag` because the ordering of series
         # and number varies (some have series-num, others have num-series).
 
-        matches = (
+        matches = self.rank_documents(
             Document.objects.filter(
-                evidence_codes__number=evidence_code_number,
-                evidence_codes__prefix__code=self.evidence_code_series,
-            )
-            .annotate(
-                exhibit_codes_count=Count('exhibit_codes'),
-                cases_score=cases_score,
-                source_score=source_score,
-            )
-            .order_by(
-                '-exhibit_codes_count',
-                '-cases_score',
-                '-source_score',
+                evidence_code_keys__key=evidence_code_key(
+                    self.evidence_code_series, evidence_code_number
+                ),
             )
-        )
+        ).order_by(*self.RANKING)
         # XXX: ToDo: match full-text language with document language. Currently
         # there is no way of knowing the full-text doc's lang.
         # A future dump of this table will include that piece of information.
         return matches
+
+
+class DocumentEvidenceCodeKey(models.Model):
+    """Materialized normalized key for each DocumentEvidenceCode.
+
+    Populated by the `index_evidence_codes` management command.
+
+    """
+
+    evidence_code = models.OneToOneField(
+        DocumentEvidenceCode,
+        primary_key=True,
+        related_name='key',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    document = models.ForeignKey(
+        Document,
+        related_name='evidence_code_keys',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    key = models.CharField(max_length=200, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class DocumentTextEvidenceCodeKey(models.Model):
+    """Materialized normalized key for each DocumentText.
+
+    Populated by the `index_evidence_codes` management command.
+
+    """
+
+    text = models.OneToOneField(
+        DocumentText,
+        primary_key=True,
+        related_name='evidence_code_key',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    key = models.CharField(max_length=200, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class DocumentTextLink(models.Model):
+    """Precomputed ranking of the Documents matching each DocumentText.
+
+    The best ranked document for a text has rank 0. Populated by the
+    `index_evidence_codes` management command.
+
+    """
+
+    text = models.ForeignKey(
+        DocumentText,
+        related_name='document_links',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    document = models.ForeignKey(
+        Document,
+        related_name='text_links',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    rank = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = [('text', 'document')]
+
+    def __str__(self):
+        return f'{self.text_id} -> {self.document_id} (rank {self.rank})'
+
+
+class DocumentPersonalAuthorMetadata(models.Model):
+    """Materialized `DocumentPersonalAuthor.build_metadata()` for each author.
+
+    Populated by the `build_author_metadata` management command, which
+    rebuilds the metadata of every author whose properties (or the property
+    ranks) were reloaded since the metadata was built.
+
+    """
+
+    author = models.OneToOneField(
+        DocumentPersonalAuthor,
+        primary_key=True,
+        related_name='stored_metadata',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    metadata = models.JSONField()
+    # latest load timestamps of the author properties and the property ranks
+    # used to build the metadata
+    load_timestamp = models.DateTimeField(null=True)
+    ranks_load_timestamp = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f'Metadata for author {self.author_id}'
+
+
+class DocumentPersonalAuthorImage(models.Model):
+    """Local thumbnail for the image in the metadata of an author.
+
+    Populated by the `fetch_author_images` management command.
+
+    """
+
+    author = models.OneToOneField(
+        DocumentPersonalAuthor,
+        primary_key=True,
+        related_name='image_thumbnail',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    # the original image the thumbnail was made from
+    source_url = models.URLField(max_length=1000)
+    image = models.ImageField(storage=DocumentStorage())
+    width = models.IntegerField()
+    height = models.IntegerField()
+
+    def __str__(self):
+        return f'Image for author {self.author_id}'
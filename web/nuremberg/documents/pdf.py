@@ -0,0 +1,406 @@
+"""Server side PDF export for document images.
+
+The PDF is written incrementally: every page image is read from the storage,
+embedded and released before moving on to the next one, so memory usage does
+not depend on the amount of pages exported. JPEG files (the vast majority of
+document images) are embedded as-is, other formats are converted to JPEG.
+
+Use it like so:
+
+    pdf = DocumentPDF(document, from_page=1, to_page=20)
+    for chunk in pdf:
+        ...  # write chunk somewhere
+
+"""
+import logging
+import os
+import textwrap
+from io import BytesIO
+
+from django.conf import settings
+from django.template.defaultfilters import date as date_filter
+from django.template.defaultfilters import pluralize
+from PIL import Image
+
+from .models import DocumentImage
+
+
+logger = logging.getLogger(__name__)
+
+
+# Page images are laid out as the viewer does, at 75 pixels per inch
+IMAGE_RESOLUTION = 75
+POINTS_PER_INCH = 72
+
+# US Letter cover page, in points
+COVER_SIZE = (612, 792)
+COVER_MARGIN = 36
+
+# Image color modes that can be embedded without conversion
+COLOR_SPACES = {'L': '/DeviceGray', 'RGB': '/DeviceRGB'}
+
+# Besides whole documents, only ranges of this many pages (1-50, 51-100 and so
+# on) are cached, so clients can not fill the cache with arbitrary ranges
+PDF_CACHE_PAGES = 50
+
+
+def cover_lines(document, from_page, to_page):
+    """Return `(font size, bold, text)` lines describing `document`.
+
+    The information matches the one shown in the document viewer sidebar.
+
+    """
+    result = [
+        (12, False, 'Harvard Law School Library - Nuremberg Trials Project'),
+        (12, False, ''),
+    ]
+
+    def section(heading, values):
+        values = list(values)
+        if values:
+            result.append((10, True, f'{heading}{pluralize(values)}'))
+            result.extend((10, False, value) for value in values)
+
+    cases = ' '.join(case.tag_name for case in document.cases.all())
+    if cases:
+        result.append((10, True, cases))
+    result.append((16, True, document.title))
+    if document.literal_title:
+        result.append((11, False, document.literal_title))
+
+    date = document.date()
+    result.append(
+        (10, False, date_filter(date, 'd F Y') if date else 'Date Unknown')
+    )
+
+    personal_authors = [
+        f'{author.full_name()} ({author.title})'
+        if author.title
+        else author.full_name()
+        for author in document.personal_authors.all()
+    ]
+    section('Author', personal_authors or ['Unknown'])
+    section(
+        'Institutional Author',
+        (author.name for author in document.group_authors.all()),
+    )
+    section(
+        'Defendant',
+        (
+            f'{defendant.first_name} {defendant.last_name}'
+            for defendant in document.defendants.all()
+        ),
+    )
+
+    result.append((10, False, ''))
+    result.append((10, False, f'Total Pages: {document.total_pages}'))
+    result.append((10, False, f'Language of Text: {document.language_name}'))
+    result.append((10, False, f'Source of Text: {document.source_name}'))
+
+    evidence_codes = [str(code) for code in document.evidence_codes.all()]
+    if evidence_codes:
+        result.append(
+            (
+                10,
+                False,
+                f'Evidence Code{pluralize(evidence_codes)}: '
+                + ', '.join(evidence_codes),
+            )
+        )
+    exhibit_codes = [
+        str(code)
+        for code in document.exhibit_codes.all()
+        if code.prosecution_number or code.defense_number
+    ]
+    if exhibit_codes:
+        result.append(
+            (
+                10,
+                False,
+                f'Exhibit Code{pluralize(exhibit_codes)}: '
+                + ', '.join(exhibit_codes),
+            )
+        )
+    result.append((10, False, f'HLSL Item No.: {document.id}'))
+    section(
+        'Trial Issue',
+        (activity.short_name for activity in document.activities.all()),
+    )
+
+    result.append((10, False, ''))
+    result.append((10, False, f'Pages {from_page} to {to_page} included'))
+    return result
+
+
+def pdf_string(text):
+    """Encode `text` as a PDF literal string using WinAnsiEncoding."""
+    data = text.encode('cp1252', errors='replace')
+    for char in (b'\\', b'(', b')'):
+        data = data.replace(char, b'\\' + char)
+    data = data.replace(b'\r', b' ').replace(b'\n', b' ')
+    return b'(' + data + b')'
+
+
+class DocumentPDF:
+    """Iterable producing the bytes of a PDF for a range of document pages.
+
+    The first page of the PDF is a cover with the document's metadata, and
+    each following page holds the best available image (full scale, falling
+    back to screen scale) for the corresponding document page.
+
+    """
+
+    CATALOG = 1
+    PAGES = 2
+    FONT = 3
+    BOLD_FONT = 4
+
+    def __init__(self, document, from_page, to_page, cover=True):
+        self.document = document
+        self.from_page = from_page
+        self.to_page = to_page
+        self.cover = cover
+
+    def __iter__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.kids = []
+        self.next_object = self.BOLD_FONT + 1
+
+        yield self.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        yield self.write_object(
+            self.CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES
+        )
+        for number, name in (
+            (self.FONT, b'Helvetica'),
+            (self.BOLD_FONT, b'Helvetica-Bold'),
+        ):
+            yield self.write_object(
+                number,
+                b'<< /Type /Font /Subtype /Type1 /BaseFont /%s '
+                b'/Encoding /WinAnsiEncoding >>' % name,
+            )
+
+        if self.cover:
+            yield from self.cover_page()
+        for page_number in range(self.from_page, self.to_page + 1):
+            yield from self.image_page(page_number)
+
+        yield self.write_object(
+            self.PAGES,
+            b'<< /Type /Pages /Kids [%s] /Count %d >>'
+            % (
+                b' '.join(b'%d 0 R' % kid for kid in self.kids),
+                len(self.kids),
+            ),
+        )
+        yield self.write_trailer()
+
+    def write(self, data):
+        self.offset += len(data)
+        return data
+
+    def new_object(self):
+        result = self.next_object
+        self.next_object += 1
+        return result
+
+    def write_object(self, number, body):
+        self.offsets[number] = self.offset
+        return self.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+
+    def write_stream(self, number, entries, stream):
+        """Write a stream object, `entries` are the rest of its dictionary."""
+        return self.write_object(
+            number,
+            b'<< %s/Length %d >>\nstream\n%s\nendstream'
+            % (entries + b' ' if entries else b'', len(stream), stream),
+        )
+
+    def write_trailer(self):
+        size = self.next_object
+        xref = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        for number in range(1, size):
+            xref.append(b'%010d 00000 n \n' % self.offsets[number])
+        xref.append(
+            b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (size, self.CATALOG, self.offset)
+        )
+        return self.write(b''.join(xref))
+
+    def write_page(self, width, height, content, resources):
+        content_number = self.new_object()
+        page_number = self.new_object()
+        self.kids.append(page_number)
+        yield self.write_stream(content_number, b'', content)
+        yield self.write_object(
+            page_number,
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] '
+            b'/Contents %d 0 R /Resources << %s >> >>'
+            % (self.PAGES, width, height, content_number, resources),
+        )
+
+    def cover_page(self):
+        width, height = COVER_SIZE
+        content = [b'BT']
+        y = height - COVER_MARGIN
+        for size, bold, text in cover_lines(
+            self.document, self.from_page, self.to_page
+        ):
+            # Helvetica glyphs are about half an em wide on average
+            chars = int((width - 2 * COVER_MARGIN) / (size * 0.5))
+            for line in textwrap.wrap(text, chars) or ['']:
+                y -= size * 1.4
+                if y < COVER_MARGIN:
+                    break
+                content.append(
+                    b'/F%d %d Tf 1 0 0 1 %d %.2f Tm %s Tj'
+                    % (
+                        2 if bold else 1,
+                        size,
+                        COVER_MARGIN,
+                        y,
+                        pdf_string(line),
+                    )
+                )
+        content.append(b'ET')
+        yield from self.write_page(
+            width,
+            height,
+            b'\n'.join(content),
+            b'/Font << /F1 %d 0 R /F2 %d 0 R >>' % (self.FONT, self.BOLD_FONT),
+        )
+
+    def find_image(self, page_number):
+        index = self.document.image_index
+        for scale in (DocumentImage.FULL, DocumentImage.SCREEN):
+            image = index.get((page_number, scale))
+            if image is not None and image.image:
+                return image
+
+    def read_image(self, image):
+        """Return `(width, height, color space, JPEG data)` for `image`."""
+        with image.image.open('rb') as f:
+            data = f.read()
+        with Image.open(BytesIO(data)) as im:
+            if im.format != 'JPEG' or im.mode not in COLOR_SPACES:
+                im = im.convert('L' if im.mode in ('1', 'L', 'LA') else 'RGB')
+                output = BytesIO()
+                im.save(output, format='JPEG', quality=90)
+                data = output.getvalue()
+            return im.width, im.height, COLOR_SPACES[im.mode], data
+
+    def missing_page(self, page_number):
+        width, height = COVER_SIZE
+        content = b'BT /F1 12 Tf 1 0 0 1 %d %d Tm %s Tj ET' % (
+            COVER_MARGIN,
+            height - 2 * COVER_MARGIN,
+            pdf_string(f'Missing Image No. {page_number}'),
+        )
+        yield from self.write_page(
+            width, height, content, b'/Font << /F1 %d 0 R >>' % self.FONT
+        )
+
+    def image_page(self, page_number):
+        image = self.find_image(page_number)
+        if image is None:
+            yield from self.missing_page(page_number)
+            return
+
+        try:
+            width, height, color_space, data = self.read_image(image)
+        except (OSError, Image.DecompressionBombError):
+            # missing files (`FileNotFoundError` in every storage) and images
+            # PIL can not decode, other errors are bugs and are not hidden
+            logger.exception(
+                'Can not add page %s of document %s to PDF (image: %s)',
+                page_number,
+                self.document.id,
+                image,
+            )
+            yield from self.missing_page(page_number)
+            return
+
+        # use the screen dimensions, as the viewer does, so every page has the
+        # same size regardless of the resolution of the embedded image
+        screen = self.document.image_index.get(
+            (page_number, DocumentImage.SCREEN)
+        )
+        page_width, page_height = width, height
+        if screen is not None and screen.width and screen.height:
+            page_width, page_height = screen.width, screen.height
+        page_width *= POINTS_PER_INCH / IMAGE_RESOLUTION
+        page_height *= POINTS_PER_INCH / IMAGE_RESOLUTION
+
+        image_number = self.new_object()
+        yield self.write_stream(
+            image_number,
+            b'/Type /XObject /Subtype /Image /Width %d /Height %d '
+            b'/ColorSpace %s /BitsPerComponent 8 /Filter /DCTDecode'
+            % (width, height, color_space.encode('ascii')),
+            data,
+        )
+        del data
+        content = b'q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q' % (
+            page_width,
+            page_height,
+        )
+        yield from self.write_page(
+            page_width,
+            page_height,
+            content,
+            b'/XObject << /Im0 %d 0 R >>' % image_number,
+        )
+
+
+def is_cached_range(total_pages, from_page, to_page):
+    """Return whether the PDF for the given page range should be cached.
+
+    That is the whole document, or a range aligned to `PDF_CACHE_PAGES`.
+
+    """
+    if from_page == 1 and to_page == total_pages:
+        return True
+    return (from_page - 1) % PDF_CACHE_PAGES == 0 and to_page == min(
+        from_page + PDF_CACHE_PAGES - 1, total_pages
+    )
+
+
+def cached_pdf_path(document, from_page, to_page):
+    """Return the path where the PDF for the given page range is cached.
+
+    Cached files are named after the document version, so PDFs for outdated
+    versions of a document are never served. Return `None` when the document
+    has no version information or the range is not cached (see
+    `is_cached_range`), meaning the PDF is only streamed.
+
+    """
+    if not document.version or not is_cached_range(
+        document.total_pages, from_page, to_page
+    ):
+        return None
+    return os.path.join(
+        settings.DOCUMENTS_PDF_CACHE_DIR,
+        f'{document.version}_{from_page}-{to_page}.pdf',
+    )
+
+
+def remove_outdated_pdfs(document):
+    """Remove the cached PDFs of previous versions of `document`."""
+    try:
+        names = os.listdir(settings.DOCUMENTS_PDF_CACHE_DIR)
+    except FileNotFoundError:
+        return
+    # versions start with the document id, see `Document.version`
+    prefix = f'{document.id}-'
+    for name in names:
+        if (
+            name.startswith(prefix)
+            and name.endswith('.pdf')
+            and not name.startswith(f'{document.version}_')
+        ):
+            try:
+                os.remove(os.path.join(settings.DOCUMENTS_PDF_CACHE_DIR, name))
+            except FileNotFoundError:
+                # removed by another process meanwhile
+                pass
@@ -1,7 +1,7 @@
 import json
 
 from haystack import indexes
-from nuremberg.documents.models import Document
+from nuremberg.documents.models import Document, DocumentPersonalAuthor
 
 
 class JsonField(indexes.CharField):
@@ -53,6 +53,19 @@ class DocumentIndex(indexes.SearchIndex, indexes.Indexable):
 
     trial_activities = indexes.MultiValueField(faceted=True, null=True)
 
+    # Limits for the authors metadata stored in the index
+    AUTHORS_METADATA_LIMITS = {
+        'max_properties': 8,
+        'max_property_values': 4,
+        'max_qualifiers': 3,
+        'max_qualifier_values': 3,
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # metadata of the personal authors seen during the current indexing
+        self.authors_metadata = {}
+
     def get_model(self):
         return Document
 
@@ -60,6 +73,8 @@ class DocumentIndex(indexes.SearchIndex, indexes.Indexable):
         return 'updated_at'
 
     def index_queryset(self, using=None):
+        # a new indexing is starting, forget about the authors seen so far
+        self.authors_metadata = {}
         return (
             Document.objects.select_related()
             .prefetch_related('dates')
@@ -81,15 +96,34 @@ class DocumentIndex(indexes.SearchIndex, indexes.Indexable):
             author.short_name() for author in document.group_authors.all()
         ] + [author.full_name() for author in document.personal_authors.all()]
 
+    def get_authors_metadata(self, authors):
+        """Return the metadata of every author in `authors`.
+
+        Most authors are shared by many documents, so the metadata is built
+        once per indexing, for all the authors not seen so far at once.
+
+        """
+        missing = {
+            author.id
+            for author in authors
+            if author.id not in self.authors_metadata
+        }
+        if missing:
+            self.authors_metadata.update(
+                DocumentPersonalAuthor.objects.filter(
+                    id__in=missing
+                ).metadata_by_id(**self.AUTHORS_METADATA_LIMITS)
+            )
+        return [self.authors_metadata[author.id] for author in authors]
+
     def prepare_authors_properties(self, document):
+        # use all() with no modifiers, make use of the prefetched authors
+        personal_authors = sorted(
+            document.personal_authors.all(), key=lambda author: author.id
+        )
         result = [
             author.metadata() for author in document.group_authors.all()
-        ] + document.personal_authors.all().order_by('id').metadata(
-            max_properties=8,
-            max_property_values=4,
-            max_qualifiers=3,
-            max_qualifier_values=3,
-        )
+        ] + self.get_authors_metadata(personal_authors)
         # json modifiers for the most compact json representation
         return json.dumps(result, indent=None, separators=(',', ':'))
 
@@ -0,0 +1,134 @@
+"""Thumbnail sprite sheets for document pages.
+
+All the thumbnails of a document are packed in a few JPEG sheets, so the
+viewer can show every page thumbnail with a handful of requests instead of
+one request per page. Sheets are stored in the DocumentStorage as:
+
+    sprites/<document id>/sprites.json
+    sprites/<document id>/<version>/<sheet number>.jpg
+
+where `sprites.json` has the version and maps every page to its sheet and
+position:
+
+    {
+        "version": "3f2a9c01b7de",
+        "sheets": [
+            {"name": "sprites/1/3f2a9c01b7de/0.jpg", "width": 750, ...}
+        ],
+        "pages": {"1": {"sheet": 0, "x": 0, "y": 0, "width": 70, "height": 96}}
+    }
+
+The version is derived from the thumbnails (and the sheet layout), so sheets
+never change once stored and can be cached forever. Rebuilding the sprites for
+new thumbnails stores the sheets under a new version, and the sheets of older
+versions are kept for clients still holding the previous `sprites.json`.
+
+"""
+import hashlib
+import json
+import math
+from io import BytesIO
+
+from PIL import Image
+
+from nuremberg.core.storages import DocumentStorage, overwrite
+
+
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+SPRITE_QUALITY = 85
+
+
+def sprites_path(document_id):
+    return f'sprites/{document_id}'
+
+
+def map_path(document_id):
+    return f'{sprites_path(document_id)}/sprites.json'
+
+
+def sheet_path(document_id, version, sheet):
+    return f'{sprites_path(document_id)}/{version}/{sheet}.jpg'
+
+
+def read_thumbs(images, storage):
+    """Yield `(page number, data, image)` for every readable image in `images`.
+
+    `data` are the bytes of the thumbnail as stored.
+
+    """
+    for page_number, name in images:
+        try:
+            with storage.open(name, 'rb') as f:
+                data = f.read()
+            thumb = Image.open(BytesIO(data))
+            thumb.load()
+        except (OSError, ValueError):
+            # missing or broken thumbnails are left out of the sheets
+            continue
+        if thumb.mode != 'RGB':
+            thumb = thumb.convert('RGB')
+        yield page_number, data, thumb
+
+
+def sprites_version(thumbs):
+    """Return the version of the sheets for the `read_thumbs` of a document."""
+    digest = hashlib.sha1(
+        f'{SPRITE_COLUMNS}x{SPRITE_ROWS}:{SPRITE_QUALITY}'.encode('ascii')
+    )
+    for page_number, data, _ in thumbs:
+        digest.update(b'%d:%d:' % (page_number, len(data)))
+        digest.update(data)
+    return digest.hexdigest()[:12]
+
+
+def build_sprites(document_id, images, storage=None):
+    """Build and store the sprite sheets for a document.
+
+    `images` is a list of `(page number, image name)` of the document
+    thumbnails. Return the amount of pages included in the sheets. This only
+    uses the storage, so it's safe to run it in a separate process.
+
+    """
+    storage = storage or DocumentStorage()
+    thumbs = list(read_thumbs(sorted(images), storage))
+    version = sprites_version(thumbs)
+    thumbs = [(page_number, thumb) for page_number, _, thumb in thumbs]
+    per_sheet = SPRITE_COLUMNS * SPRITE_ROWS
+    sprites = {'version': version, 'sheets': [], 'pages': {}}
+
+    for sheet in range(math.ceil(len(thumbs) / per_sheet)):
+        sheet_thumbs = thumbs[sheet * per_sheet : (sheet + 1) * per_sheet]
+        # every cell is as big as the biggest thumbnail in the sheet
+        cell_width = max(thumb.width for _, thumb in sheet_thumbs)
+        cell_height = max(thumb.height for _, thumb in sheet_thumbs)
+        columns = min(SPRITE_COLUMNS, len(sheet_thumbs))
+        rows = math.ceil(len(sheet_thumbs) / columns)
+        image = Image.new(
+            'RGB', (columns * cell_width, rows * cell_height), 'white'
+        )
+        for i, (page_number, thumb) in enumerate(sheet_thumbs):
+            x = (i % columns) * cell_width
+            y = (i // columns) * cell_height
+            image.paste(thumb, (x, y))
+            sprites['pages'][str(page_number)] = {
+                'sheet': sheet,
+                'x': x,
+                'y': y,
+                'width': thumb.width,
+                'height': thumb.height,
+            }
+
+        data = BytesIO()
+        image.save(data, format='JPEG', quality=SPRITE_QUALITY)
+        name = sheet_path(document_id, version, sheet)
+        overwrite(storage, name, data.getvalue())
+        sprites['sheets'].append(
+            {'name': name, 'width': image.width, 'height': image.height}
+        )
+
+    # the map is written last, so it only exists for complete sheets
+    overwrite(
+        storage, map_path(document_id), json.dumps(sprites).encode('utf-8')
+    )
+    return len(sprites['pages'])
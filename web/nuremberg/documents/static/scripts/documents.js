@@ -37,7 +37,6 @@ modulejs.define('documents', ['DocumentViewport', 'DocumentTools', 'DownloadPDF'
     $('.download-options').removeClass('hide');
     $('.download-options input[name=from-page]').val(1);
     $('.download-options input[name=to-page]').val(viewportView.model.attributes.totalPages);
-    modulejs.require('JSPDFLoaded');
   });
   $('.do-download').on('click', function () {
     var fromPage = parseInt($('.download-options input[name=from-page]').val());
@@ -50,10 +49,13 @@ modulejs.define('documents', ['DocumentViewport', 'DocumentTools', 'DownloadPDF'
     if (fromPage > viewportView.model.attributes.totalPages || toPage > viewportView.model.attributes.totalPages || fromPage < 1 || toPage < 1) {
       $('.download-options input[name=from-page]').val(1);
       $('.download-options input[name=to-page]').val(viewportView.model.attributes.totalPages);
-      return;
+      return false;
     }
 
-    DownloadPDF(viewportView, fromPage, toPage);
+    // the link itself downloads the PDF
+    $(this).attr('href', DownloadPDF(fromPage, toPage));
+    $('.download-options').addClass('hide');
+    $('.download-pdf').removeClass('hide');
   });
 
   $('.clear-search').on('click', function (e) {
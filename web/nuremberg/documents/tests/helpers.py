@@ -1,7 +1,18 @@
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+
 import pytest
+from django.core.management import call_command
 from model_bakery import baker
+from PIL import Image
 
-from nuremberg.documents.models import Document, PersonalAuthorProperty
+from nuremberg.documents.models import (
+    Document,
+    DocumentImage,
+    PersonalAuthorProperty,
+)
 
 
 @pytest.mark.django_db
@@ -36,6 +47,30 @@ def make_document(evidence_codes=None, **kwargs):
     return result
 
 
+def index_evidence_codes():
+    call_command('index_evidence_codes', stdout=StringIO())
+
+
+def build_author_metadata():
+    call_command('build_author_metadata', stdout=StringIO())
+
+
+def make_document_images(document, pages, scales=None):
+    scales = scales or [scale for scale, _ in DocumentImage.IMAGE_SCALES]
+    image_type = baker.make('DocumentImageType')
+    return DocumentImage.objects.bulk_create(
+        DocumentImage(
+            document=document,
+            page_number=page,
+            scale=scale,
+            image=f'HLSL_NUR_{document.id:05d}{page:03d}_{scale}.jpg',
+            image_type=image_type,
+        )
+        for page in range(1, pages + 1)
+        for scale in scales
+    )
+
+
 def make_random_text(length=100):
     base = (
         'Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam '
@@ -44,3 +79,44 @@ def make_random_text(length=100):
     )
     result = base * ((len(base) // length) + 1)
     return result[:length]
+
+
+def make_image_content(size=(1000, 800), color='red', format='PNG'):
+    data = BytesIO()
+    Image.new('RGB', size, color).save(data, format=format)
+    return data.getvalue()
+
+
+@contextmanager
+def serve_files(files):
+    """Serve `files` (a dict of path to content) over HTTP on localhost.
+
+    Yield the base URL of the server, and a list where every requested path is
+    appended. Paths not in `files` get a 404.
+
+    """
+    requested = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requested.append(self.path)
+            content = files.get(self.path)
+            if content is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}', requested
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,67 @@
+import pytest
+import requests
+from PIL import Image
+
+from nuremberg.core.storages import DocumentStorage
+from nuremberg.documents.author_images import (
+    THUMBNAIL_SIZE,
+    HttpClient,
+    build_thumbnail,
+    thumbnail_path,
+)
+from .helpers import make_image_content, serve_files
+
+
+@pytest.fixture
+def storage(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return DocumentStorage()
+
+
+def test_thumbnail_path():
+    first = thumbnail_path(1, 'https://example.com/first.jpg')
+    second = thumbnail_path(1, 'https://example.com/second.jpg')
+
+    assert first.startswith('authors/1/')
+    assert first.endswith('.jpg')
+    assert first != second
+    assert first == thumbnail_path(1, 'https://example.com/first.jpg')
+
+
+@pytest.mark.parametrize('format', ['PNG', 'JPEG'])
+def test_build_thumbnail(storage, format):
+    files = {'/image': make_image_content((2000, 1000), format=format)}
+
+    with serve_files(files) as (url, requested):
+        name, width, height = build_thumbnail(
+            7, f'{url}/image', client=HttpClient(), storage=storage
+        )
+
+    assert requested == ['/image']
+    assert name == thumbnail_path(7, f'{url}/image')
+    assert (width, height) == (THUMBNAIL_SIZE[0], THUMBNAIL_SIZE[0] // 2)
+    with storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        assert image.format == 'JPEG'
+        assert image.size == (width, height)
+
+
+def test_build_thumbnail_small_image(storage):
+    files = {'/image': make_image_content((100, 150))}
+
+    with serve_files(files) as (url, requested):
+        name, width, height = build_thumbnail(
+            7, f'{url}/image', client=HttpClient(), storage=storage
+        )
+
+    assert (width, height) == (100, 150)
+
+
+def test_build_thumbnail_not_found(storage):
+    with serve_files({}) as (url, requested):
+        with pytest.raises(requests.HTTPError):
+            build_thumbnail(
+                7, f'{url}/image', client=HttpClient(), storage=storage
+            )
+
+    assert not storage.exists(thumbnail_path(7, f'{url}/image'))
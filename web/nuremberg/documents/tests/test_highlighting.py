@@ -0,0 +1,131 @@
+import datetime
+
+import pytest
+from model_bakery import baker
+
+from nuremberg.documents import highlighting
+from nuremberg.documents.highlighting import (
+    LRUCache,
+    highlight,
+    highlight_full_text,
+    normalize_query,
+)
+
+
+def marked(term):
+    return f'<mark class="highlighted">{term}</mark>'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    highlighting.highlighted_texts.clear()
+    yield
+    highlighting.highlighted_texts.clear()
+
+
+@pytest.mark.parametrize(
+    'query, expected',
+    [
+        ('', ()),
+        ('*', ()),
+        ('Lorem ipsum lorem', ('ipsum', 'lorem')),
+        ('lorem -ipsum', ('lorem',)),
+        ('"Lorem ipsum" dolor', ('dolor', 'lorem ipsum')),
+        ('lorem OR ipsum', ('ipsum', 'lorem')),
+        ('(lorem ipsum)', ('ipsum', 'lorem')),
+        ('all:lorem author:ipsum', ('lorem',)),
+        ('lorem -all:ipsum', ('lorem',)),
+        (
+            'evidence:NO-417 exhibit:"Prosecution 22"',
+            ('no-417', 'prosecution 22'),
+        ),
+        ('all:lorem|ipsum', ('ipsum', 'lorem')),
+        ('date:unknown all:unknown', ()),
+    ],
+)
+def test_normalize_query(query, expected):
+    assert normalize_query(query) == expected
+
+
+def test_highlight():
+    text = 'Lorem ipsum dolor sit amet, LOREM IPSUM, lorem ipsums.'
+
+    result = highlight(text, 'lorem ipsum')
+
+    assert result == (
+        f'{marked("Lorem")} {marked("ipsum")} dolor sit amet, '
+        f'{marked("LOREM")} {marked("IPSUM")}, '
+        f'{marked("lorem")} {marked("ipsum")}s.'
+    )
+
+
+def test_highlight_phrase_and_overlapping_terms():
+    text = 'The Lorem ipsum dolor, the lorem, the ipsum.'
+
+    result = highlight(text, '"lorem ipsum" lorem the')
+
+    assert result == (
+        f'{marked("The")} {marked("Lorem ipsum")} dolor, {marked("the")} '
+        f'{marked("lorem")}, {marked("the")} ipsum.'
+    )
+
+
+def test_highlight_special_characters():
+    text = 'See document 1.5 (NO-417) and 105.'
+
+    result = highlight(text, 'evidence:NO-417 1.5')
+
+    assert (
+        result == f'See document {marked("1.5")} ({marked("NO-417")}) and 105.'
+    )
+
+
+def test_highlight_strips_tags():
+    assert highlight('<b>Lorem</b> ipsum', 'lorem') == (
+        f'{marked("Lorem")} ipsum'
+    )
+    assert highlight('<b>Lorem</b> ipsum', 'author:lorem') == 'Lorem ipsum'
+    assert highlight(None, 'lorem') == ''
+
+
+def test_highlight_full_text_cached(monkeypatch):
+    calls = []
+
+    def counting_highlight(text, query):
+        calls.append((text, query))
+        return highlight(text, query)
+
+    monkeypatch.setattr(highlighting, 'highlight', counting_highlight)
+    full_text = baker.prepare(
+        'DocumentText',
+        id=1,
+        text='Lorem ipsum',
+        load_timestamp=datetime.datetime(2022, 1, 1),
+    )
+
+    first = highlight_full_text(full_text, 'lorem')
+    # the normalized query is the same
+    second = highlight_full_text(full_text, 'LOREM  lorem')
+
+    assert first == second == f'{marked("Lorem")} ipsum'
+    assert len(calls) == 1
+
+    # a different query or a reloaded text are highlighted again
+    highlight_full_text(full_text, 'ipsum')
+    full_text.load_timestamp = datetime.datetime(2022, 1, 2)
+    highlight_full_text(full_text, 'lorem')
+
+    assert len(calls) == 3
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
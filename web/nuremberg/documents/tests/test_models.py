@@ -7,11 +7,21 @@ from django.utils.text import slugify
 from nuremberg.documents.models import (
     Document,
     DocumentDate,
+    DocumentImage,
     DocumentPersonalAuthor,
+    DocumentPersonalAuthorMetadata,
     DocumentText,
     PersonalAuthorProperty,
+    evidence_code_key,
+    group_author_properties,
+)
+from .helpers import (
+    build_author_metadata,
+    index_evidence_codes,
+    make_author,
+    make_document,
+    make_document_images,
 )
-from .helpers import make_author, make_document
 
 
 pytestmark = pytest.mark.django_db
@@ -80,6 +90,46 @@ def test_document_retrieve_full_text_no_evidence_code_match():
     assert doc.text == ''
 
 
+def test_document_retrieve_full_text_simple():
+    doc_text = baker.make(
+        'DocumentText', evidence_code_series='FF', evidence_code_num='0123'
+    )
+    baker.make(
+        'DocumentText', evidence_code_series='FF', evidence_code_num='12'
+    )
+    doc = make_document(evidence_codes=['Z-12', 'FF-123'])
+    index_evidence_codes()
+
+    assert list(doc.full_texts()) == [doc_text]
+    assert doc.full_text == doc_text
+    assert doc.text == doc_text.text
+
+
+def test_document_retrieve_full_text_not_indexed():
+    baker.make(
+        'DocumentText', evidence_code_series='FF', evidence_code_num='123'
+    )
+    doc = make_document(evidence_codes=['FF-123'])
+
+    # keys are only materialized by the `index_evidence_codes` command
+    assert doc.full_texts().count() == 0
+
+
+@pytest.mark.parametrize(
+    'series, number, expected',
+    [
+        ('PS', 398, 'PS-398'),
+        ('PS', '398', 'PS-398'),
+        (' ps ', '0398', 'PS-398'),
+        ('NOKW', '407-IX', 'NOKW-407-IX'),
+        ('NO', None, 'NO-'),
+        (None, '12', '-12'),
+    ],
+)
+def test_evidence_code_key(series, number, expected):
+    assert evidence_code_key(series, number) == expected
+
+
 def test_document_retrieve_full_text_real_729():
     for doc_id in [30, 3058, 2539]:
         doc = Document.objects.get(id=doc_id)
@@ -111,6 +161,117 @@ def test_document_retrieve_full_text_real_473():
         assert doc.text == result.text
 
 
+def test_document_images_screen_empty():
+    doc = baker.make('Document')
+
+    assert doc.image_index == {}
+    assert doc.images_screen() == 'no images'
+
+
+def test_document_images_screen():
+    doc = baker.make('Document')
+    make_document_images(doc, pages=3)
+
+    result = doc.images_screen()
+
+    assert [i.page_number for i in result] == [1, 2, 3]
+    assert all(i.scale == DocumentImage.SCREEN for i in result)
+
+
+def test_document_image_find_url_uses_index(django_assert_num_queries):
+    doc = baker.make('Document')
+    make_document_images(doc, pages=5)
+    doc = Document.objects.prefetch_related('images').get(id=doc.id)
+
+    with django_assert_num_queries(0):
+        screen = list(doc.images_screen())
+        urls = [(i.thumb_url(), i.screen_url(), i.full_url()) for i in screen]
+
+    assert urls == [
+        (
+            f'/media/HLSL_NUR_{doc.id:05d}{page:03d}_t.jpg',
+            f'/media/HLSL_NUR_{doc.id:05d}{page:03d}_s.jpg',
+            f'/media/HLSL_NUR_{doc.id:05d}{page:03d}_f.jpg',
+        )
+        for page in range(1, 6)
+    ]
+
+
+def test_document_image_find_url_missing_scale():
+    doc = baker.make('Document')
+    make_document_images(doc, pages=2, scales=[DocumentImage.SCREEN])
+    doc = Document.objects.prefetch_related('images').get(id=doc.id)
+
+    for image in doc.images_screen():
+        assert image.thumb_url() is None
+        assert image.full_url() is None
+        assert image.screen_url() == image.url
+
+
+def test_document_page_images_empty():
+    doc = baker.make('Document')
+
+    assert doc.page_images() == []
+
+
+def test_document_page_images(django_assert_num_queries):
+    doc = baker.make('Document')
+    make_document_images(doc, pages=3)
+    doc = Document.objects.prefetch_related(
+        DocumentImage.prefetch(
+            DocumentImage.THUMB, DocumentImage.SCREEN, DocumentImage.FULL
+        )
+    ).get(id=doc.id)
+
+    with django_assert_num_queries(0):
+        result = doc.page_images()
+
+    assert [
+        (i.page_number, i.url, i.thumb_url, i.full_url) for i in result
+    ] == [
+        (
+            page,
+            f'/media/HLSL_NUR_{doc.id:05d}{page:03d}_s.jpg',
+            f'/media/HLSL_NUR_{doc.id:05d}{page:03d}_t.jpg',
+            f'/media/HLSL_NUR_{doc.id:05d}{page:03d}_f.jpg',
+        )
+        for page in range(1, 4)
+    ]
+
+
+def test_document_page_images_missing_scales():
+    doc = baker.make('Document')
+    make_document_images(doc, pages=2, scales=[DocumentImage.SCREEN])
+    doc = Document.objects.prefetch_related(
+        DocumentImage.prefetch(DocumentImage.THUMB, DocumentImage.SCREEN)
+    ).get(id=doc.id)
+
+    result = doc.page_images()
+
+    assert [i.page_number for i in result] == [1, 2]
+    assert all(i.thumb_url is None and i.full_url is None for i in result)
+
+
+def test_document_image_prefetch_only_loads_scales():
+    doc = baker.make('Document')
+    make_document_images(doc, pages=2)
+    doc = Document.objects.prefetch_related(
+        DocumentImage.prefetch(DocumentImage.SCREEN)
+    ).get(id=doc.id)
+
+    images = list(doc.images.all())
+
+    assert [(i.page_number, i.scale) for i in images] == [
+        (1, DocumentImage.SCREEN),
+        (2, DocumentImage.SCREEN),
+    ]
+    assert images[0].get_deferred_fields() == {
+        field.attname
+        for field in DocumentImage._meta.concrete_fields
+        if field.attname not in DocumentImage.RENDER_FIELDS
+    }
+
+
 def test_author_slug_full_name():
     author = make_author(
         first_name='First Name: So Many #$ different Characters! ♡',
@@ -417,7 +578,8 @@ def test_author_properties_groups_qualifiers(django_assert_num_queries):
         qualifier_value='ignored',
     )
 
-    with django_assert_num_queries(2):  # fetch ranks and properties
+    # fetch stored metadata (none), ranks and properties
+    with django_assert_num_queries(3):
         result = author.metadata()
 
     # order is given by higher rank first, then value
@@ -1000,6 +1162,7 @@ def test_document_text_retrieve_documents_simple():
     )
     evidence_codes = ['Z-123', 'FF-123']
     doc = make_document(evidence_codes=evidence_codes)
+    index_evidence_codes()
 
     assert sorted(str(e) for e in doc.evidence_codes.all()) == sorted(
         evidence_codes
@@ -1063,3 +1226,210 @@ def test_document_text_retrieve_documents_real_473():
         2446,
     ]
     assert doc_text_473.document == Document.objects.get(id=49)
+
+
+class CountingIndex(dict):
+    lookups = 0
+
+    def get(self, *args):
+        self.lookups += 1
+        return super().get(*args)
+
+
+def test_document_image_urls_use_the_index(django_assert_num_queries):
+    doc = baker.make('Document', image_count=60)
+    make_document_images(doc, pages=60)
+    doc = Document.objects.prefetch_related('images').get(id=doc.id)
+    index = doc.__dict__['image_index'] = CountingIndex(doc.image_index)
+
+    with django_assert_num_queries(0):
+        urls = [
+            (image.thumb_url(), image.full_url())
+            for image in doc.images_screen()
+        ]
+
+    assert len(urls) == 60
+    assert all(thumb and full for thumb, full in urls)
+    # one index lookup per URL, instead of a scan of all the images
+    assert index.lookups == 2 * 60
+
+
+@pytest.fixture
+def author_property_ranks():
+    return [
+        baker.make('PersonalAuthorPropertyRank', name=name, rank=rank)
+        for name, rank in (
+            ('a property', 30),
+            ('another property', 20),
+            ('date of birth', 10),
+            ('image', 5),
+        )
+    ]
+
+
+def make_author_with_properties(ranks):
+    author = make_author()
+    for rank in ranks:
+        for value in ('value C', 'value A', 'value B'):
+            for qualifier, qualifier_values in (
+                ('start time', ['1930', '1920', '1910']),
+                ('end time', ['1935', '1925', '1915']),
+                ('country', ['DE', 'AT']),
+                ('subject has role', ['role']),
+            ):
+                for qualifier_value in qualifier_values:
+                    baker.make(
+                        'PersonalAuthorProperty',
+                        personal_author=author,
+                        name=rank.name,
+                        value=f'{rank.name} {value}',
+                        qualifier=qualifier,
+                        qualifier_value=qualifier_value,
+                    )
+    return author
+
+
+@pytest.mark.parametrize(
+    'limits',
+    [
+        {},
+        {
+            'max_properties': 2,
+            'max_property_values': 2,
+            'max_qualifiers': 2,
+            'max_qualifier_values': 2,
+        },
+        {'max_properties': 1, 'max_qualifier_values': 1},
+    ],
+)
+def test_author_stored_metadata(
+    django_assert_num_queries, author_property_ranks, limits
+):
+    author = make_author_with_properties(author_property_ranks)
+    expected = author.metadata(**limits)
+    assert expected['properties']
+    assert expected['image']
+
+    build_author_metadata()
+    author = DocumentPersonalAuthor.objects.get(id=author.id)
+
+    # fetch stored metadata and image thumbnail (none)
+    with django_assert_num_queries(2):
+        result = author.metadata(**limits)
+
+    assert result == expected
+
+
+def test_author_stored_metadata_queryset(
+    django_assert_num_queries, author_property_ranks
+):
+    authors = [
+        make_author_with_properties(author_property_ranks) for _ in range(2)
+    ]
+    ids = [author.id for author in authors]
+    expected = DocumentPersonalAuthor.objects.filter(id__in=ids).metadata(
+        max_properties=3, max_qualifier_values=2
+    )
+
+    build_author_metadata()
+
+    with django_assert_num_queries(1):  # fetch authors and stored metadata
+        result = DocumentPersonalAuthor.objects.filter(id__in=ids).metadata(
+            max_properties=3, max_qualifier_values=2
+        )
+
+    assert result == expected
+
+
+def test_author_stored_metadata_uses_author_details(author_property_ranks):
+    author = make_author_with_properties(author_property_ranks)
+    build_author_metadata()
+    DocumentPersonalAuthor.objects.filter(id=author.id).update(
+        first_name='Jane', last_name='Roe'
+    )
+    author = DocumentPersonalAuthor.objects.get(id=author.id)
+
+    result = author.metadata()
+
+    assert result['author']['name'] == 'Jane Roe'
+    assert result['author']['slug'] == 'jane-roe'
+    assert DocumentPersonalAuthorMetadata.objects.filter(
+        author_id=author.id
+    ).exists()
+
+
+def test_group_author_properties(
+    django_assert_num_queries, author_property_ranks
+):
+    first = make_author_with_properties(author_property_ranks[:1])
+    second = make_author_with_properties(author_property_ranks[1:2])
+    no_properties = make_author()
+
+    with django_assert_num_queries(1):
+        result = [
+            (author, [p.id for p in properties])
+            for author, properties in group_author_properties(
+                [second, no_properties, first, second]
+            )
+        ]
+
+    assert result == [
+        (first, [p.id for p in first.properties.order_by('id')]),
+        (second, [p.id for p in second.properties.order_by('id')]),
+        (second, [p.id for p in second.properties.order_by('id')]),
+        (no_properties, []),
+    ]
+
+
+def test_author_metadata_by_id(
+    django_assert_num_queries, author_property_ranks
+):
+    authors = [
+        make_author_with_properties(author_property_ranks) for _ in range(3)
+    ]
+    ids = [author.id for author in authors]
+    limits = {'max_properties': 2, 'max_qualifier_values': 1}
+    expected = {author.id: author.metadata(**limits) for author in authors}
+
+    # fetch authors (and stored metadata, none) and properties, ranks are
+    # already cached
+    with django_assert_num_queries(2):
+        result = DocumentPersonalAuthor.objects.filter(
+            id__in=ids
+        ).metadata_by_id(**limits)
+
+    assert result == expected
+
+
+def test_author_metadata_uses_image_thumbnail():
+    author = make_author()
+    baker.make('PersonalAuthorPropertyRank', name='image', rank=30)
+    baker.make(
+        'PersonalAuthorProperty',
+        personal_author=author,
+        name='image',
+        value='https://example.com/original.jpg',
+        qualifier='',
+        qualifier_value='',
+    )
+    original = author.metadata()['image']
+    thumbnail = baker.make(
+        'DocumentPersonalAuthorImage',
+        author=author,
+        source_url='https://example.com/original.jpg',
+        image='authors/thumbnail.jpg',
+    )
+    author = DocumentPersonalAuthor.objects.get(id=author.id)
+
+    assert author.metadata()['image'] == {
+        'url': thumbnail.image.url,
+        'alt': original['alt'],
+        'original_url': 'https://example.com/original.jpg',
+    }
+
+    # thumbnails for other images are ignored
+    thumbnail.source_url = 'https://example.com/previous.jpg'
+    thumbnail.save()
+    author = DocumentPersonalAuthor.objects.get(id=author.id)
+
+    assert author.metadata()['image'] == original
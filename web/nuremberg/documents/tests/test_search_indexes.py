@@ -0,0 +1,51 @@
+import json
+
+import pytest
+from model_bakery import baker
+
+from nuremberg.documents.search_indexes import DocumentIndex
+from .helpers import make_author
+
+
+pytestmark = pytest.mark.django_db
+
+
+def test_prepare_authors_properties(django_assert_num_queries):
+    rank = baker.make('PersonalAuthorPropertyRank', name='a property', rank=10)
+    authors = []
+    for _ in range(2):
+        author = make_author()
+        baker.make(
+            'PersonalAuthorProperty',
+            personal_author=author,
+            name=rank.name,
+            value=f'value {author.id}',
+        )
+        authors.append(author)
+    documents = baker.make('Document', _quantity=2)
+    for document in documents:
+        for author in authors:
+            baker.make(
+                'DocumentsToPersonalAuthors', document=document, author=author
+            )
+    index = DocumentIndex()
+    documents = list(
+        index.index_queryset().filter(id__in=[d.id for d in documents])
+    )
+    expected = json.dumps(
+        [
+            author.metadata(**DocumentIndex.AUTHORS_METADATA_LIMITS)
+            for author in authors
+        ],
+        separators=(',', ':'),
+    )
+
+    # fetch authors (and stored metadata, none) and properties once, ranks
+    # are already cached
+    with django_assert_num_queries(2):
+        result = [
+            index.prepare_authors_properties(document)
+            for document in documents
+        ]
+
+    assert result == [expected, expected]
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from PIL import Image
+
+from nuremberg.documents.sprites import (
+    SPRITE_COLUMNS,
+    SPRITE_ROWS,
+    build_sprites,
+    map_path,
+    sheet_path,
+)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return FileSystemStorage(location=str(tmp_path))
+
+
+def save_thumbs(storage, sizes):
+    result = []
+    for page_number, size in enumerate(sizes, start=1):
+        name = f'thumb_{page_number}.jpg'
+        color = (page_number % 256, 0, 0)
+        with storage.open(name, 'wb') as f:
+            Image.new('RGB', size, color).save(f, format='JPEG')
+        result.append((page_number, name))
+    return result
+
+
+def test_build_sprites(storage):
+    images = save_thumbs(storage, [(70, 96), (60, 90), (96, 70)])
+
+    count = build_sprites(3, images, storage=storage)
+
+    assert count == 3
+    sprites = json.loads(storage.open(map_path(3)).read())
+    version = sprites['version']
+    assert sprites == {
+        'version': version,
+        'sheets': [
+            {'name': sheet_path(3, version, 0), 'width': 288, 'height': 96}
+        ],
+        'pages': {
+            '1': {'sheet': 0, 'x': 0, 'y': 0, 'width': 70, 'height': 96},
+            '2': {'sheet': 0, 'x': 96, 'y': 0, 'width': 60, 'height': 90},
+            '3': {'sheet': 0, 'x': 192, 'y': 0, 'width': 96, 'height': 70},
+        },
+    }
+    with Image.open(storage.open(sheet_path(3, version, 0))) as sheet:
+        assert sheet.size == (288, 96)
+        # the second thumbnail is where the map says
+        r, g, b = sheet.getpixel((96 + 30, 45))
+        assert abs(r - 2) < 10 and g < 10 and b < 10
+
+
+def test_build_sprites_new_version(storage):
+    images = save_thumbs(storage, [(70, 96), (60, 90)])
+    build_sprites(3, images, storage=storage)
+    first = json.loads(storage.open(map_path(3)).read())
+
+    # same thumbnails, same version
+    build_sprites(3, images, storage=storage)
+    assert json.loads(storage.open(map_path(3)).read()) == first
+
+    with storage.open(images[1][1], 'wb') as f:
+        Image.new('RGB', (60, 90), 'blue').save(f, format='JPEG')
+    build_sprites(3, images, storage=storage)
+    second = json.loads(storage.open(map_path(3)).read())
+
+    assert second['version'] != first['version']
+    assert second['sheets'][0]['name'] == sheet_path(3, second['version'], 0)
+    # sheets of the previous version are kept
+    assert storage.exists(first['sheets'][0]['name'])
+
+
+def test_build_sprites_many_sheets(storage):
+    per_sheet = SPRITE_COLUMNS * SPRITE_ROWS
+    images = save_thumbs(storage, [(10, 20)] * (per_sheet + 5))
+
+    count = build_sprites(3, images, storage=storage)
+
+    assert count == per_sheet + 5
+    sprites = json.loads(storage.open(map_path(3)).read())
+    assert [(s['width'], s['height']) for s in sprites['sheets']] == [
+        (SPRITE_COLUMNS * 10, SPRITE_ROWS * 20),
+        (5 * 10, 20),
+    ]
+    assert sprites['pages'][str(per_sheet)] == {
+        'sheet': 0,
+        'x': (SPRITE_COLUMNS - 1) * 10,
+        'y': (SPRITE_ROWS - 1) * 20,
+        'width': 10,
+        'height': 20,
+    }
+    assert sprites['pages'][str(per_sheet + 1)]['sheet'] == 1
+
+
+def test_build_sprites_missing_thumbs(storage):
+    images = save_thumbs(storage, [(10, 20), (10, 20)])
+    storage.delete(images[0][1])
+
+    count = build_sprites(3, images + [(3, 'missing.jpg')], storage=storage)
+
+    assert count == 1
+    sprites = json.loads(storage.open(map_path(3)).read())
+    assert list(sprites['pages']) == ['2']
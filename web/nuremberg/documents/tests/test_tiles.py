@@ -0,0 +1,116 @@
+import json
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from PIL import Image
+
+from nuremberg.documents.tiles import (
+    TILE_SIZE,
+    build_pyramid,
+    info_path,
+    level_images,
+    max_level,
+    pyramid_version,
+    tile_path,
+)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return FileSystemStorage(location=str(tmp_path))
+
+
+def save_image(storage, name, size, mode='RGB'):
+    with storage.open(name, 'wb') as f:
+        Image.new(mode, size, 'white').save(f, format='JPEG')
+    return name
+
+
+def image_version(storage, name):
+    with storage.open(name, 'rb') as f:
+        return pyramid_version(f.read())
+
+
+@pytest.mark.parametrize(
+    'width, height, expected',
+    [(1, 1, 0), (2, 1, 1), (256, 100, 8), (257, 100, 9), (1000, 1500, 11)],
+)
+def test_max_level(width, height, expected):
+    assert max_level(width, height) == expected
+
+
+def test_level_images():
+    image = Image.new('RGB', (600, 301))
+
+    result = [(level, im.size) for level, im in level_images(image)]
+
+    assert result == [
+        (10, (600, 301)),
+        (9, (300, 151)),
+        (8, (150, 76)),
+        (7, (75, 38)),
+        (6, (38, 19)),
+        (5, (19, 10)),
+        (4, (10, 5)),
+        (3, (5, 3)),
+        (2, (3, 2)),
+        (1, (2, 1)),
+        (0, (1, 1)),
+    ]
+
+
+def test_build_pyramid(storage):
+    name = save_image(storage, 'page.jpg', (600, 301))
+    version = image_version(storage, name)
+
+    count = build_pyramid(5, 2, name, storage=storage)
+
+    # 3x2 tiles for level 10, 2x1 for level 9 and 1 for each other level
+    assert count == 6 + 2 + 9
+    assert json.loads(storage.open(info_path(5, 2)).read()) == {
+        'width': 600,
+        'height': 301,
+        'tile_size': TILE_SIZE,
+        'format': 'jpg',
+        'levels': 11,
+        'version': version,
+    }
+    with Image.open(storage.open(tile_path(5, 2, version, 10, 0, 0))) as tile:
+        assert tile.size == (TILE_SIZE, TILE_SIZE)
+    with Image.open(storage.open(tile_path(5, 2, version, 10, 2, 1))) as tile:
+        assert tile.size == (600 - 2 * TILE_SIZE, 301 - TILE_SIZE)
+    with Image.open(storage.open(tile_path(5, 2, version, 0, 0, 0))) as tile:
+        assert tile.size == (1, 1)
+    assert not storage.exists(tile_path(5, 2, version, 10, 3, 0))
+
+
+def test_build_pyramid_overwrites_tiles(storage):
+    name = save_image(storage, 'page.jpg', (300, 300))
+    build_pyramid(5, 2, name, storage=storage)
+    count = build_pyramid(5, 2, name, storage=storage)
+
+    assert count == 2 * 2 + 9
+    version = image_version(storage, name)
+    _, files = storage.listdir(f'tiles/5/2/{version}/9')
+    assert sorted(files) == ['0_0.jpg', '0_1.jpg', '1_0.jpg', '1_1.jpg']
+
+
+def test_build_pyramid_new_version(storage):
+    name = save_image(storage, 'page.jpg', (300, 300))
+    build_pyramid(5, 2, name, storage=storage)
+    old_version = image_version(storage, name)
+
+    storage.delete(name)
+    name = save_image(storage, 'page.jpg', (100, 100), mode='L')
+    count = build_pyramid(5, 2, name, storage=storage)
+
+    assert count == 8
+    version = image_version(storage, name)
+    assert version != old_version
+    info = json.loads(storage.open(info_path(5, 2)).read())
+    assert info['width'] == 100
+    assert info['version'] == version
+    with Image.open(storage.open(tile_path(5, 2, version, 7, 0, 0))) as tile:
+        assert tile.size == (100, 100)
+    # clients holding the previous info can still get the previous tiles
+    assert storage.exists(tile_path(5, 2, old_version, 8, 0, 0))
@@ -1,16 +1,41 @@
+import datetime
+import json
+import os
+import re
+from io import BytesIO, StringIO
 from urllib.parse import urlencode
 
 import pytest
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from model_bakery import baker
+from PIL import Image
 
 from nuremberg.core.tests.acceptance_helpers import PyQuery, client
+from nuremberg.documents import pdf
 from nuremberg.documents.models import (
     Document,
+    DocumentDefendant,
+    DocumentImage,
     DocumentPersonalAuthor,
+    DocumentPersonalAuthorMetadata,
     DocumentText,
 )
-from .helpers import make_author, make_document, make_random_text
+from nuremberg.documents.sprites import build_sprites
+from nuremberg.documents.tiles import build_pyramid
+from nuremberg.documents.views import invalidate_sidebar
+from .helpers import (
+    build_author_metadata,
+    index_evidence_codes,
+    make_author,
+    make_document,
+    make_document_images,
+    make_random_text,
+)
 
 
 pytestmark = pytest.mark.django_db
@@ -130,6 +155,43 @@ def test_document_3799():
     assert 'HLSL Item No.: 3799' in info
 
 
+def test_document_images_only_loads_needed_scales():
+    document = make_document()
+    make_document_images(document, pages=2)
+    # only the screen scale is available for the last page
+    baker.make(
+        'DocumentImage',
+        document=document,
+        page_number=3,
+        scale=DocumentImage.SCREEN,
+        image=f'HLSL_NUR_{document.id:05d}003_s.jpg',
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        page = get_document(document.id)
+
+    images = page('.document-image')
+    assert [PyQuery(i).attr['data-page'] for i in images] == ['1', '2', '3']
+    assert images.eq(0).attr['data-thumb-url'] == (
+        f'/media/HLSL_NUR_{document.id:05d}001_t.jpg'
+    )
+    assert images.eq(0).attr['data-full-url'] == (
+        f'/media/HLSL_NUR_{document.id:05d}001_f.jpg'
+    )
+    assert images.eq(2).attr['data-thumb-url'] == ''
+    assert images.eq(2).attr['data-full-url'] == ''
+
+    images_queries = [
+        q['sql']
+        for q in queries.captured_queries
+        if f'FROM "{DocumentImage._meta.db_table}"' in q['sql']
+    ]
+    assert len(images_queries) == 1
+    # half and double scale images are not loaded
+    assert f"'{DocumentImage.HALF}'" not in images_queries[0]
+    assert f"'{DocumentImage.DOUBLE}'" not in images_queries[0]
+
+
 def assert_author_properties_html(
     response, name, description, image_url, image_alt, *properties
 ):
@@ -455,6 +517,7 @@ def test_document_details_mode_text():
         evidence_code_series='PPSS',
         evidence_code_num='123456',
     )
+    index_evidence_codes()
 
     content = get_document(doc.id)
     links = content.find('[data-test="full-text-view"]')
@@ -484,6 +547,7 @@ def test_document_details_mode_text_term_higlighting():
         evidence_code_series='PPSS',
         evidence_code_num='123456',
     )
+    index_evidence_codes()
 
     q = 'lorem ipsum'
     content = get_document(doc.id, q=q)
@@ -507,3 +571,667 @@ def test_document_details_mode_text_term_higlighting():
         content.find('[data-test="document-text-viewport"]').html().strip()
         == f'<p>{highlithed}</p>'
     )
+
+
+def authors_url(ids):
+    return reverse('documents:authors') + f'?{urlencode({"ids": ids})}'
+
+
+def make_authors_with_properties(count):
+    rank = baker.make('PersonalAuthorPropertyRank', name='a property', rank=5)
+    result = []
+    for _ in range(count):
+        author = make_author()
+        baker.make(
+            'PersonalAuthorProperty',
+            personal_author=author,
+            name=rank.name,
+            value=f'value for {author.id}',
+        )
+        result.append(author)
+    return result
+
+
+def test_authors():
+    first, second = make_authors_with_properties(2)
+    missing = second.id + 1000
+
+    response = client.get(
+        authors_url(f'{second.id},{missing}, {first.id},{second.id}')
+    )
+
+    assert response.status_code == 200
+    assert 'application/json' in response.headers['Content-Type']
+    assert 'public' in response.headers['Cache-Control']
+    assert 'max-age=86400' in response.headers['Cache-Control']
+    # ordered as requested, skipping duplicated and unknown ids
+    assert response.json() == {
+        'authors': [
+            json.loads(json.dumps(second.metadata())),
+            json.loads(json.dumps(first.metadata())),
+        ]
+    }
+
+
+@pytest.mark.parametrize('ids', ['', ',', '1,a', ','.join(['1'] * 101)])
+def test_authors_invalid_ids(ids):
+    response = client.get(authors_url(ids))
+
+    assert response.status_code == 400
+
+
+def test_authors_not_modified(django_assert_num_queries):
+    authors = make_authors_with_properties(3)
+    build_author_metadata()
+    url = authors_url(','.join(str(author.id) for author in authors))
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert [i['author']['id'] for i in response.json()['authors']] == [
+        author.id for author in authors
+    ]
+    etag = response.headers['ETag']
+
+    # only the stored metadata and image versions are queried
+    with django_assert_num_queries(2):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert 'max-age=86400' in response.headers['Cache-Control']
+
+    # rebuilt metadata invalidates the ETag
+    DocumentPersonalAuthorMetadata.objects.filter(
+        author_id=authors[0].id
+    ).update(
+        load_timestamp=datetime.datetime(
+            2000, 1, 1, tzinfo=datetime.timezone.utc
+        )
+    )
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+
+
+def test_authors_not_modified_image(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    authors = make_authors_with_properties(2)
+    build_author_metadata()
+    url = authors_url(','.join(str(author.id) for author in authors))
+    etag = client.get(url).headers['ETag']
+
+    # a new local thumbnail changes the image urls, so the ETag too
+    baker.make(
+        'DocumentPersonalAuthorImage',
+        author=authors[1],
+        source_url='https://example.com/image.jpg',
+        image='authors/image.jpg',
+        width=10,
+        height=10,
+    )
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_document_manifest_not_found():
+    assert Document.objects.filter(id=0).count() == 0
+
+    response = client.get(
+        reverse('documents:manifest', kwargs={'document_id': 0})
+    )
+
+    assert response.status_code == 404
+
+
+def test_document_manifest():
+    doc = baker.make('Document', image_count=2)
+    make_document_images(doc, pages=2, scales=['t', 's'])
+    doc.images.filter(page_number=2).update(
+        physical_page_number=7, width=10, height=20
+    )
+
+    response = client.get(
+        reverse('documents:manifest', kwargs={'document_id': doc.id})
+    )
+
+    assert response.status_code == 200
+    assert 'application/json' in response.headers['Content-Type']
+    assert response.headers['ETag'] == f'"{doc.version}"'
+
+    def image(page, scale, width=None, height=None):
+        return {
+            'url': f'/media/HLSL_NUR_{doc.id:05d}{page:03d}_{scale}.jpg',
+            'width': width,
+            'height': height,
+        }
+
+    assert response.json() == {
+        'id': doc.id,
+        'total_pages': 2,
+        'pages': [
+            {
+                'page': 1,
+                'physical_page': None,
+                'scales': {'thumb': image(1, 't'), 'screen': image(1, 's')},
+            },
+            {
+                'page': 2,
+                'physical_page': 7,
+                'scales': {
+                    'thumb': image(2, 't', 10, 20),
+                    'screen': image(2, 's', 10, 20),
+                },
+            },
+        ],
+    }
+
+
+def test_document_manifest_not_modified():
+    doc = baker.make('Document')
+    make_document_images(doc, pages=1)
+    url = reverse('documents:manifest', kwargs={'document_id': doc.id})
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=f'"{doc.version}"')
+
+    assert response.status_code == 304
+    assert response.content == b''
+
+    # a newer version of the document invalidates the ETag
+    doc.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=f'"{doc.version}"')
+
+    assert response.status_code == 200
+
+
+@pytest.fixture
+def cached_client(settings, request):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': request.node.name,
+        }
+    }
+    # skip the site-wide cache middleware, test only view level caches
+    settings.CACHE_MIDDLEWARE_SECONDS = 0
+    return Client()
+
+
+def test_document_manifest_server_side_cache(
+    cached_client, django_assert_num_queries
+):
+    client = cached_client
+    doc = baker.make('Document')
+    make_document_images(doc, pages=3)
+    url = reverse('documents:manifest', kwargs={'document_id': doc.id})
+
+    expected = client.get(url).json()
+    assert len(expected['pages']) == 3
+
+    # etag and document lookup, but no images
+    with django_assert_num_queries(2):
+        response = client.get(url)
+
+    assert response.json() == expected
+
+
+@pytest.fixture
+def pdf_document(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    settings.DOCUMENTS_PDF_CACHE_DIR = str(tmp_path / 'pdfs')
+    os.makedirs(settings.MEDIA_ROOT)
+
+    doc = baker.make('Document', title='Letter (draft) to Hans', image_count=3)
+    images = make_document_images(doc, pages=3, scales=['s', 'f'])
+    for image in images:
+        if image.scale == 's':
+            image.width, image.height = 150, 300
+        elif image.page_number == 2:
+            # not a JPEG, needs conversion
+            image.image = image.image.name.replace('.jpg', '.png')
+        elif image.page_number == 3:
+            # missing full scale image, screen image is used instead
+            image.image = None
+        image.save()
+        if image.image:
+            Image.new('RGB', (30, 60), 'white').save(
+                os.path.join(settings.MEDIA_ROOT, image.image.name)
+            )
+    return doc
+
+
+def pdf_url(document_id, **qs):
+    url = reverse('documents:pdf', kwargs={'document_id': document_id})
+    if qs:
+        url += '?' + urlencode(qs)
+    return url
+
+
+def test_document_pdf_not_found():
+    response = client.get(pdf_url(document_id=1234))
+
+    assert response.status_code == 404
+
+
+def test_document_pdf_no_images():
+    doc = baker.make('Document', image_count=0)
+
+    response = client.get(pdf_url(document_id=doc.id))
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize(
+    'qs', [{'from': 'abc'}, {'to': ''}, {'from': '1', 'to': '2.5'}]
+)
+def test_document_pdf_invalid_range(pdf_document, qs):
+    response = client.get(pdf_url(document_id=pdf_document.id, **qs))
+
+    assert response.status_code == 400
+
+
+def test_document_pdf(pdf_document):
+    response = client.get(pdf_url(document_id=pdf_document.id))
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Type'] == 'application/pdf'
+    assert response['Content-Disposition'] == (
+        'attachment; filename="HLSL Nuremberg Document #'
+        f'{pdf_document.id} pages 1-3.pdf"'
+    )
+    content = b''.join(response.streaming_content)
+    assert content.startswith(b'%PDF-1.4')
+    assert content.endswith(b'%%EOF\n')
+    # cover plus one page per document page
+    assert content.count(b'/Type /Page ') == 4
+    assert content.count(b'/Subtype /Image') == 3
+    assert b'(Letter \\(draft\\) to Hans) Tj' in content
+    assert b'(Pages 1 to 3 included) Tj' in content
+    # screen dimensions (150x300 pixels at 75 dpi) are used for every page
+    assert content.count(b'/MediaBox [0 0 144.00 288.00]') == 3
+
+    # every cross reference entry points to its object
+    xref = content[content.rindex(b'\nxref\n') + 1 :].split(b'\n')
+    count = int(xref[1].split()[1])
+    for number in range(1, count):
+        offset = int(xref[2 + number].split()[0])
+        assert content[offset:].startswith(b'%d 0 obj' % number)
+
+    # every stream has the right length
+    for match in re.finditer(rb'/Length (\d+) >>\nstream\n', content):
+        end = match.end() + int(match.group(1))
+        assert content[end:].startswith(b'\nendstream\nendobj\n')
+
+
+def test_document_pdf_page_range(pdf_document):
+    response = client.get(
+        pdf_url(document_id=pdf_document.id, **{'from': 3, 'to': 2})
+    )
+
+    assert response.status_code == 200
+    assert response['Content-Disposition'].endswith('pages 2-3.pdf"')
+    content = b''.join(response.streaming_content)
+    assert content.count(b'/Type /Page ') == 3
+    assert b'(Pages 2 to 3 included) Tj' in content
+
+
+def test_document_pdf_single_page_clamped(pdf_document):
+    response = client.get(
+        pdf_url(document_id=pdf_document.id, **{'from': 10, 'to': 20})
+    )
+
+    assert response.status_code == 200
+    assert response['Content-Disposition'].endswith('page 3.pdf"')
+    content = b''.join(response.streaming_content)
+    assert content.count(b'/Type /Page ') == 2
+
+
+def test_document_pdf_missing_image(pdf_document):
+    pdf_document.images.filter(page_number=2).delete()
+
+    response = client.get(pdf_url(document_id=pdf_document.id))
+
+    content = b''.join(response.streaming_content)
+    assert content.count(b'/Type /Page ') == 4
+    assert content.count(b'/Subtype /Image') == 2
+    assert b'(Missing Image No. 2) Tj' in content
+
+
+def test_document_pdf_unreadable_image(settings, pdf_document):
+    images = {
+        image.page_number: image
+        for image in pdf_document.images.filter(scale='f')
+    }
+    # page 1 is not an image, page 2 is missing in the storage
+    with open(images[1].image.path, 'wb') as f:
+        f.write(b'not an image')
+    os.remove(images[2].image.path)
+
+    response = client.get(pdf_url(document_id=pdf_document.id))
+
+    content = b''.join(response.streaming_content)
+    assert content.count(b'/Type /Page ') == 4
+    assert content.count(b'/Subtype /Image') == 1
+    assert b'(Missing Image No. 1) Tj' in content
+    assert b'(Missing Image No. 2) Tj' in content
+
+
+def test_document_pdf_cached(settings, pdf_document):
+    url = pdf_url(document_id=pdf_document.id)
+    content = b''.join(client.get(url).streaming_content)
+    assert os.listdir(settings.DOCUMENTS_PDF_CACHE_DIR) == [
+        f'{pdf_document.version}_1-3.pdf'
+    ]
+
+    # images are not read again
+    for name in os.listdir(settings.MEDIA_ROOT):
+        os.remove(os.path.join(settings.MEDIA_ROOT, name))
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == content
+
+    # a new version of the document is not served from the cache, and the
+    # PDFs of the previous version are removed
+    pdf_document.save()
+    content = b''.join(client.get(url).streaming_content)
+    assert content.count(b'/Subtype /Image') == 0
+    version = Document.objects.get(id=pdf_document.id).version
+    assert os.listdir(settings.DOCUMENTS_PDF_CACHE_DIR) == [
+        f'{version}_1-3.pdf'
+    ]
+
+
+def test_document_pdf_cached_ranges(settings, monkeypatch, pdf_document):
+    monkeypatch.setattr(pdf, 'PDF_CACHE_PAGES', 2)
+
+    for from_page, to_page in [(1, 2), (3, 3), (2, 3), (1, 1), (2, 2)]:
+        url = pdf_url(
+            document_id=pdf_document.id, **{'from': from_page, 'to': to_page}
+        )
+        response = client.get(url)
+        assert response.status_code == 200
+        b''.join(response.streaming_content)
+
+    # only the aligned ranges are cached, other ranges are just streamed
+    assert sorted(os.listdir(settings.DOCUMENTS_PDF_CACHE_DIR)) == [
+        f'{pdf_document.version}_1-2.pdf',
+        f'{pdf_document.version}_3-3.pdf',
+    ]
+
+
+def make_sidebar_document():
+    doc = baker.make('Document', title='Some title')
+    baker.make(
+        'DocumentsToDefendants',
+        document=doc,
+        defendant__first_name='Karl',
+        defendant__last_name='Brandt',
+    )
+    return doc
+
+
+def rename_defendants(doc, last_name):
+    # related data changes do not update the document
+    DocumentDefendant.objects.filter(documents=doc).update(last_name=last_name)
+
+
+def get_sidebar(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return PyQuery(response.content)('.document-info').text()
+
+
+def test_document_sidebar_cached(cached_client):
+    doc = make_sidebar_document()
+    url = document_show_url(doc.id)
+
+    with CaptureQueriesContext(connection) as uncached:
+        assert 'Karl Brandt' in get_sidebar(cached_client, url)
+    rename_defendants(doc, 'Rose')
+    with CaptureQueriesContext(connection) as cached:
+        assert 'Karl Brandt' in get_sidebar(cached_client, url)
+
+    assert len(cached) < len(uncached)
+    assert not any('tblDefendants' in q['sql'] for q in cached)
+
+    # a new version of the document renders a new sidebar
+    doc.save()
+    assert 'Karl Rose' in get_sidebar(cached_client, url)
+
+
+def test_document_sidebar_invalidate(cached_client):
+    doc = make_sidebar_document()
+    url = document_show_url(doc.id)
+    assert 'Karl Brandt' in get_sidebar(cached_client, url)
+    rename_defendants(doc, 'Rose')
+
+    invalidate_sidebar(doc)
+
+    assert 'Karl Rose' in get_sidebar(cached_client, url)
+
+
+def test_document_sidebar_invalidate_command(cached_client):
+    doc = make_sidebar_document()
+    url = document_show_url(doc.id)
+    assert 'Karl Brandt' in get_sidebar(cached_client, url)
+    rename_defendants(doc, 'Rose')
+
+    stdout = StringIO()
+    call_command('invalidate_document_sidebars', ids=[doc.id], stdout=stdout)
+
+    assert stdout.getvalue() == 'Invalidated 1 document sidebar(s).\n'
+    assert 'Karl Rose' in get_sidebar(cached_client, url)
+
+
+def test_document_sidebar_author_metadata(cached_client, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    doc = make_sidebar_document()
+    author = make_author()
+    baker.make('DocumentsToPersonalAuthors', document=doc, author=author)
+    build_author_metadata()
+    url = document_show_url(doc.id)
+
+    def author_image_urls():
+        response = cached_client.get(url)
+        assert response.status_code == 200
+        return [
+            img.attrib['src']
+            for img in PyQuery(response.content)(
+                '.document-info [data-test="author-image"]'
+            )
+        ]
+
+    assert 'https://example.com/image.jpg' not in author_image_urls()
+
+    # rebuilt metadata renders a new sidebar, with no invalidation needed
+    stored = DocumentPersonalAuthorMetadata.objects.get(author=author)
+    stored.metadata['image'] = {
+        'url': 'https://example.com/image.jpg',
+        'alt': 'An image',
+    }
+    stored.load_timestamp = datetime.datetime(
+        2000, 1, 1, tzinfo=datetime.timezone.utc
+    )
+    stored.save()
+    assert author_image_urls() == ['https://example.com/image.jpg']
+
+    # so does a new local thumbnail
+    baker.make(
+        'DocumentPersonalAuthorImage',
+        author=author,
+        source_url='https://example.com/image.jpg',
+        image='authors/image.jpg',
+        width=10,
+        height=10,
+    )
+    assert author_image_urls() == ['/media/authors/image.jpg']
+
+
+def make_sidebar_text(doc):
+    prefix = baker.make('DocumentEvidencePrefix', code='NO')
+    for number in (1, 2):
+        baker.make(
+            'DocumentEvidenceCode', document=doc, prefix=prefix, number=number
+        )
+    full_text = baker.make(
+        'DocumentText',
+        text=make_random_text(150),
+        evidence_code_series='NO',
+        evidence_code_num='1',
+    )
+    index_evidence_codes()
+    return full_text
+
+
+def test_document_sidebar_text_mode(cached_client):
+    doc = make_sidebar_document()
+    full_text = make_sidebar_text(doc)
+
+    image_sidebar = get_sidebar(cached_client, document_show_url(doc.id))
+    text_sidebar = get_sidebar(
+        cached_client, document_show_url(full_text.id, mode='text')
+    )
+
+    # the text mode lists the evidence code of the text only
+    assert 'Evidence Codes: NO-1 , NO-2' in image_sidebar
+    assert 'Evidence Code: NO-1' in text_sidebar
+    assert 'Karl Brandt' in text_sidebar
+
+
+def test_document_sidebar_text_mode_invalidate(cached_client):
+    doc = make_sidebar_document()
+    full_text = make_sidebar_text(doc)
+    url = document_show_url(full_text.id, mode='text')
+    assert 'Karl Brandt' in get_sidebar(cached_client, url)
+    rename_defendants(doc, 'Rose')
+    assert 'Karl Brandt' in get_sidebar(cached_client, url)
+
+    invalidate_sidebar(doc)
+
+    assert 'Karl Rose' in get_sidebar(cached_client, url)
+
+
+def test_document_sidebar_text_without_document(cached_client):
+    full_text = baker.make(
+        'DocumentText',
+        title='Text title',
+        evidence_code_series='ZZ',
+        evidence_code_num='999999',
+    )
+    url = document_show_url(full_text.id, mode='text')
+    assert 'Text title' in get_sidebar(cached_client, url)
+
+    DocumentText.objects.filter(id=full_text.id).update(title='New title')
+    assert 'Text title' in get_sidebar(cached_client, url)
+
+    # reloaded texts are rendered again
+    DocumentText.objects.filter(id=full_text.id).update(
+        title='New title',
+        load_timestamp=full_text.load_timestamp + datetime.timedelta(days=1),
+    )
+    assert 'New title' in get_sidebar(cached_client, url)
+
+
+def fail_exists(self, name):
+    raise AssertionError(f'Unexpected storage lookup for {name}')
+
+
+def test_document_tiles(settings, monkeypatch, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    with open(tmp_path / 'page.jpg', 'wb') as f:
+        Image.new('RGB', (300, 200)).save(f, format='JPEG')
+    build_pyramid(1234, 2, 'page.jpg')
+    # files are opened right away, without checking for them first
+    monkeypatch.setattr(FileSystemStorage, 'exists', fail_exists)
+
+    response = client.get(
+        reverse(
+            'documents:tiles-info',
+            kwargs={'document_id': 1234, 'page_number': 2},
+        )
+    )
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/json'
+    assert response['Cache-Control'] == 'public, max-age=86400'
+    info = json.loads(b''.join(response.streaming_content))
+    assert info['width'] == 300
+    assert info['levels'] == 10
+
+    response = client.get(
+        reverse(
+            'documents:tile',
+            kwargs={
+                'document_id': 1234,
+                'page_number': 2,
+                'version': info['version'],
+                'level': 9,
+                'column': 1,
+                'row': 0,
+            },
+        )
+    )
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'image/jpeg'
+    assert response['Cache-Control'] == ('public, max-age=31536000, immutable')
+    with Image.open(BytesIO(b''.join(response.streaming_content))) as tile:
+        assert tile.size == (300 - 256, 200)
+
+
+@pytest.mark.parametrize(
+    'url',
+    [
+        '/documents/1234/tiles/2/info.json',
+        '/documents/1234/tiles/2/0123456789ab/9/0_0.jpg',
+        '/documents/1234/tiles/2/0123456789ab/9/5_0.jpg',
+    ],
+)
+def test_document_tiles_not_found(settings, tmp_path, url):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+    response = client.get(url)
+
+    assert response.status_code == 404
+
+
+def test_document_sprites(settings, monkeypatch, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    with open(tmp_path / 'thumb.jpg', 'wb') as f:
+        Image.new('RGB', (10, 20)).save(f, format='JPEG')
+    build_sprites(1234, [(1, 'thumb.jpg')])
+    monkeypatch.setattr(FileSystemStorage, 'exists', fail_exists)
+
+    response = client.get(
+        reverse('documents:sprites', kwargs={'document_id': 1234})
+    )
+
+    assert response.status_code == 200
+    assert response['Cache-Control'] == 'public, max-age=86400'
+    version = response.json()['version']
+    assert response.json() == {
+        'version': version,
+        'sheets': [
+            {
+                'url': f'/media/sprites/1234/{version}/0.jpg',
+                'width': 10,
+                'height': 20,
+            }
+        ],
+        'pages': {
+            '1': {'sheet': 0, 'x': 0, 'y': 0, 'width': 10, 'height': 20}
+        },
+    }
+
+
+def test_document_sprites_not_found(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+    response = client.get(
+        reverse('documents:sprites', kwargs={'document_id': 1234})
+    )
+
+    assert response.status_code == 404
@@ -0,0 +1,139 @@
+"""Deep zoom tile pyramids for document images.
+
+Every page image is split in square tiles at several zoom levels, following
+the Deep Zoom layout: the highest level has the original image size and each
+level below halves the previous one, down to level 0 (a single pixel).
+
+Tiles are stored in the DocumentStorage as:
+
+    tiles/<document id>/<page number>/info.json
+    tiles/<document id>/<page number>/<version>/<level>/<column>_<row>.jpg
+
+where `info.json` describes the pyramid (image size, tile size, amount of
+levels and version), so clients know which tiles to request for a given zoom.
+
+The version is derived from the contents of the page image, so tiles never
+change once stored and can be cached forever. Rebuilding a pyramid for a new
+image stores its tiles under a new version, and the tiles of older versions
+are kept for clients still holding the previous `info.json`.
+
+The pyramids are groundwork for deep zoom: the document viewer does not
+request tiles yet, and still zooms into the full scale page images.
+
+"""
+import hashlib
+import json
+import math
+from io import BytesIO
+
+from PIL import Image
+
+from nuremberg.core.storages import DocumentStorage, overwrite
+
+
+TILE_SIZE = 256
+TILE_FORMAT = 'jpg'
+TILE_QUALITY = 85
+
+
+def tiles_path(document_id, page_number):
+    return f'tiles/{document_id}/{page_number}'
+
+
+def info_path(document_id, page_number):
+    return f'{tiles_path(document_id, page_number)}/info.json'
+
+
+def tile_path(document_id, page_number, version, level, column, row):
+    return (
+        f'{tiles_path(document_id, page_number)}/{version}/{level}/'
+        f'{column}_{row}.{TILE_FORMAT}'
+    )
+
+
+def pyramid_version(data):
+    """Return the version of the pyramid for the page image bytes `data`."""
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+def max_level(width, height):
+    return math.ceil(math.log2(max(width, height, 1)))
+
+
+def level_images(image):
+    """Yield `(level, image)` for every level of the pyramid for `image`.
+
+    Levels are produced from the highest to the lowest one, each resized
+    from the previous level so the full image is only downscaled once.
+
+    """
+    level = max_level(*image.size)
+    while True:
+        yield level, image
+        if level == 0:
+            break
+        level -= 1
+        image = image.resize(
+            (
+                max(1, math.ceil(image.width / 2)),
+                max(1, math.ceil(image.height / 2)),
+            ),
+            Image.Resampling.LANCZOS,
+        )
+
+
+def build_pyramid(document_id, page_number, image_name, storage=None):
+    """Build and store the tile pyramid for a page image.
+
+    Return the amount of tiles stored. This only uses the storage, so it's
+    safe to run it in a separate process.
+
+    """
+    storage = storage or DocumentStorage()
+    with storage.open(image_name, 'rb') as f:
+        data = f.read()
+    version = pyramid_version(data)
+    image = Image.open(BytesIO(data))
+    image.load()
+    if image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')
+
+    count = 0
+    for level, level_image in level_images(image):
+        for row in range(math.ceil(level_image.height / TILE_SIZE)):
+            for column in range(math.ceil(level_image.width / TILE_SIZE)):
+                left, upper = column * TILE_SIZE, row * TILE_SIZE
+                tile = level_image.crop(
+                    (
+                        left,
+                        upper,
+                        min(left + TILE_SIZE, level_image.width),
+                        min(upper + TILE_SIZE, level_image.height),
+                    )
+                )
+                data = BytesIO()
+                tile.save(data, format='JPEG', quality=TILE_QUALITY)
+                overwrite(
+                    storage,
+                    tile_path(
+                        document_id, page_number, version, level, column, row
+                    ),
+                    data.getvalue(),
+                )
+                count += 1
+
+    # the info file is written last, so it only exists for complete pyramids
+    info = {
+        'width': image.width,
+        'height': image.height,
+        'tile_size': TILE_SIZE,
+        'format': TILE_FORMAT,
+        'levels': max_level(image.width, image.height) + 1,
+        'version': version,
+    }
+    overwrite(
+        storage,
+        info_path(document_id, page_number),
+        json.dumps(info).encode('utf-8'),
+    )
+    return count
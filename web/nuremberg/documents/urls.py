@@ -3,12 +3,31 @@ from . import views
 
 app_name = 'documents'
 urlpatterns = [
+    path(
+        '<int:document_id>/manifest',
+        views.manifest,
+        name='manifest',
+    ),
+    path('<int:document_id>/pdf', views.pdf, name='pdf'),
+    path('<int:document_id>/sprites', views.sprites, name='sprites'),
+    path(
+        '<int:document_id>/tiles/<int:page_number>/info.json',
+        views.tiles_info,
+        name='tiles-info',
+    ),
+    path(
+        '<int:document_id>/tiles/<int:page_number>/<slug:version>/'
+        '<int:level>/<int:column>_<int:row>.jpg',
+        views.tile,
+        name='tile',
+    ),
     re_path(
         r'^(?P<document_id>\d+)-(?P<slug>[-\w]+)?$',
         views.Show.as_view(),
         name='show',
     ),
     re_path(r'^(?P<document_id>\d+)[-\w]*$', views.Show.as_view()),
+    path('authors', views.authors, name='authors'),
     path(
         'authors/<int:author_id>-<str:author_slug>',
         views.author_properties,
@@ -1,32 +1,119 @@
-from django.http import JsonResponse
+import hashlib
+import json
+import os
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.exceptions import BadRequest
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, render
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.views.generic import View
-from haystack.utils import Highlighter
 
-from .models import Document, DocumentPersonalAuthor, DocumentText
+from nuremberg.core.storages import DocumentStorage, save_while_streaming
+from .highlighting import highlight_full_text
+from .models import (
+    Document,
+    DocumentImage,
+    DocumentPersonalAuthor,
+    DocumentPersonalAuthorImage,
+    DocumentPersonalAuthorMetadata,
+    DocumentText,
+)
+from .pdf import DocumentPDF, cached_pdf_path, remove_outdated_pdfs
+from .sprites import map_path as sprites_map_path
+from .tiles import info_path, tile_path
+
+
+# Rendered sidebars are versioned, so they can be kept for long
+SIDEBAR_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def sidebar_version(document):
+    """Return the version of the sidebar rendered for `document`.
+
+    `document` is either a Document or, for full texts without a matching
+    document, a DocumentText.
+
+    For documents, the version includes the stored metadata and thumbnails
+    of their personal authors, so rebuilding them (see the
+    `build_author_metadata` and `fetch_author_images` commands) renders the
+    author hovers again.
+
+    """
+    if not isinstance(document, Document):
+        return f'text-{document.id}-{document.load_timestamp.timestamp()}'
+    if document.version is None:
+        return None
+    authors = sorted(
+        document.personal_authors.values_list(
+            'id',
+            'stored_metadata__load_timestamp',
+            'stored_metadata__ranks_load_timestamp',
+            'image_thumbnail__source_url',
+            'image_thumbnail__image',
+        )
+    )
+    digest = hashlib.md5(repr(authors).encode('utf-8')).hexdigest()
+    return f'{document.version}-{digest}'
+
+
+def sidebar_codes(full_text=None):
+    """Return the part of the sidebar key for its evidence codes.
+
+    The image mode lists the evidence codes of the document, while the text
+    mode lists the evidence code of the text, even for a matching document.
+
+    """
+    return 'document' if full_text is None else f'text-{full_text.id}'
 
 
-class DocumentHighlighter(Highlighter):
-    def find_window(self, highlight_locations):
-        # Do not truncate the text at all -- show everything, from start to end
-        return (0, len(self.text_block))
+def invalidate_sidebar(document):
+    """Remove the cached sidebar fragments for `document`.
+
+    Changes to a document itself or to its author metadata change its
+    sidebar version, but changes to other related data (codes, cases, etc.)
+    do not, so call this after such changes. The cache is per process unless
+    a shared backend is configured (see `CACHE_URL` in the settings), so
+    otherwise restart the app instead.
+
+    """
+    version = sidebar_version(document)
+    if isinstance(document, Document):
+        texts = DocumentText.objects.filter(
+            document_links__document_id=document.id
+        ).only('id')
+        codes = [sidebar_codes()] + [sidebar_codes(text) for text in texts]
+    else:
+        codes = [sidebar_codes(document)]
+    cache.delete_many(
+        [make_template_fragment_key('document-cases', [version])]
+        + [
+            make_template_fragment_key('document-sidebar', [version, code])
+            for code in codes
+        ]
+    )
 
 
 class Show(View):
     template_name = 'documents/show.html'
 
-    def highlight_query(self, text, query):
-        highlight = DocumentHighlighter(query, html_tag='mark')
-        return highlight.highlight(text)
-
     def get(self, request, document_id, *args, **kwargs):
         mode = request.GET.get('mode', 'image')
         query = request.GET.get('q')
 
         if mode == 'text':
             full_text = get_object_or_404(DocumentText, id=document_id)
-            document = full_text.documents().first()
+            document = full_text.document
             evidence_codes = [full_text.evidence_code]
+            codes = sidebar_codes(full_text)
             if document is None:
                 # For texts without a matching document, ignore `HLSL Item No.`
                 document = full_text
@@ -34,20 +121,29 @@ class Show(View):
             else:
                 hlsl_item_id = document.id
             if query:
-                full_text.text = self.highlight_query(full_text.text, query)
+                full_text.text = highlight_full_text(full_text, query)
         else:
             document = get_object_or_404(
                 Document.objects.prefetch_related(
-                    'activities', 'evidence_codes', 'exhibit_codes', 'images'
-                )
-                .select_related('language')
-                .select_related('source'),
+                    DocumentImage.prefetch(
+                        DocumentImage.THUMB,
+                        DocumentImage.SCREEN,
+                        DocumentImage.FULL,
+                    )
+                ),
                 id=document_id,
             )
-            full_text = document.full_texts().first()
+            full_text = document.full_text
             evidence_codes = document.evidence_codes.all()
+            codes = sidebar_codes()
             hlsl_item_id = document_id
 
+        # Sidebar related data is only queried when the cached sidebar for
+        # this version of the document is missing, and both modes share it
+        # except for the evidence codes.
+        # Documents without version information are never cached.
+        version = sidebar_version(document)
+        timeout = SIDEBAR_CACHE_TIMEOUT if version else 0
         return render(
             request,
             self.template_name,
@@ -58,12 +154,20 @@ class Show(View):
                 'mode': mode,
                 'evidence_codes': evidence_codes,
                 'query': query,
+                'sidebar_cache_timeout': timeout,
+                'sidebar_codes': codes,
+                'sidebar_version': version or f'uncached-{document.id}',
             },
         )
 
 
 def author_properties(request, author_id, author_slug=None):
-    author = get_object_or_404(DocumentPersonalAuthor, id=author_id)
+    author = get_object_or_404(
+        DocumentPersonalAuthor.objects.select_related(
+            'stored_metadata', 'image_thumbnail'
+        ),
+        id=author_id,
+    )
     result = author.metadata()
 
     if request.accepts('text/html'):
@@ -72,3 +176,177 @@ def author_properties(request, author_id, author_slug=None):
         response = JsonResponse(data=result)
 
     return response
+
+
+# Author metadata only changes when it's rebuilt, let clients keep it for a day
+AUTHORS_CACHE_SECONDS = 60 * 60 * 24
+MAX_AUTHOR_IDS = 100
+
+
+def requested_author_ids(request):
+    """Return the unique author ids in the `ids` GET param, in order."""
+    try:
+        ids = [
+            int(i) for i in request.GET.get('ids', '').split(',') if i.strip()
+        ]
+    except ValueError:
+        raise BadRequest('Invalid author ids')
+    if not ids or len(ids) > MAX_AUTHOR_IDS:
+        raise BadRequest(f'Between 1 and {MAX_AUTHOR_IDS} ids are required')
+    return list(dict.fromkeys(ids))
+
+
+def authors_etag(request):
+    ids = requested_author_ids(request)
+    versions = sorted(
+        DocumentPersonalAuthorMetadata.objects.filter(
+            author_id__in=ids
+        ).values_list('author_id', 'load_timestamp', 'ranks_load_timestamp')
+    )
+    if len(versions) != len(ids):
+        # not every author has stored metadata, there is no version for them
+        return None
+    # local thumbnails replace the image urls in the metadata
+    images = sorted(
+        DocumentPersonalAuthorImage.objects.filter(
+            author_id__in=ids
+        ).values_list('author_id', 'source_url', 'image')
+    )
+    return hashlib.md5(repr((versions, images)).encode('utf-8')).hexdigest()
+
+
+@cache_control(public=True, max_age=AUTHORS_CACHE_SECONDS)
+@condition(etag_func=authors_etag)
+def authors(request):
+    """Return the metadata of every author in `ids`, skipping unknown ones."""
+    ids = requested_author_ids(request)
+    metadata = DocumentPersonalAuthor.objects.filter(
+        id__in=ids
+    ).metadata_by_id()
+    return JsonResponse(
+        {'authors': [metadata[i] for i in ids if i in metadata]}
+    )
+
+
+def manifest_etag(request, document_id):
+    document = Document.objects.only('updated_at').filter(id=document_id)
+    return getattr(document.first(), 'version', None)
+
+
+@condition(etag_func=manifest_etag)
+def manifest(request, document_id):
+    """Return the pages of a document and their images, as JSON.
+
+    Groundwork for a viewer loading pages on demand: the document viewer does
+    not read this (its `data-manifest-url`) yet, and still renders every page
+    in its HTML.
+
+    """
+    document = get_object_or_404(Document, id=document_id)
+    cache_key = f'documents:manifest:{document.version}'
+    result = cache.get(cache_key) if document.version else None
+    if result is None:
+        # json modifiers for the most compact json representation
+        result = json.dumps(
+            document.manifest(), indent=None, separators=(',', ':')
+        )
+        if document.version:
+            cache.set(cache_key, result)
+
+    return HttpResponse(result, content_type='application/json')
+
+
+def pdf(request, document_id):
+    document = get_object_or_404(
+        Document.objects.prefetch_related(
+            'activities',
+            'cases',
+            'dates',
+            'defendants',
+            'evidence_codes',
+            'exhibit_codes__defense_name',
+            'group_authors',
+            'images',
+            'personal_authors',
+        ),
+        id=document_id,
+    )
+    total_pages = document.total_pages or 0
+    if not total_pages:
+        raise Http404('Document has no pages')
+
+    try:
+        from_page = int(request.GET.get('from', 1))
+        to_page = int(request.GET.get('to', total_pages))
+    except ValueError:
+        raise BadRequest('Invalid page range')
+    from_page, to_page = sorted(
+        min(max(page, 1), total_pages) for page in (from_page, to_page)
+    )
+
+    if from_page == to_page:
+        page_label = f'page {from_page}'
+    else:
+        page_label = f'pages {from_page}-{to_page}'
+    filename = f'HLSL Nuremberg Document #{document.id} {page_label}.pdf'
+
+    path = cached_pdf_path(document, from_page, to_page)
+    if path and os.path.exists(path):
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=filename,
+            content_type='application/pdf',
+        )
+
+    content = DocumentPDF(document, from_page, to_page)
+    if path:
+        remove_outdated_pdfs(document)
+        content = save_while_streaming(content, path)
+    response = StreamingHttpResponse(content, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# Tile URLs include the pyramid version, so tiles never change for a given URL
+# and clients can keep them for a year
+TILE_CACHE_SECONDS = 60 * 60 * 24 * 365
+# Pyramids and sprites may be rebuilt (for example, with new images), only
+# their versioned tiles and sheets never change
+TILE_INFO_CACHE_SECONDS = 60 * 60 * 24
+
+
+def storage_response(path, content_type):
+    try:
+        f = DocumentStorage().open(path, 'rb')
+    except FileNotFoundError:
+        raise Http404('No tile found')
+    return FileResponse(f, content_type=content_type)
+
+
+@cache_control(public=True, max_age=TILE_INFO_CACHE_SECONDS)
+def tiles_info(request, document_id, page_number):
+    return storage_response(
+        info_path(document_id, page_number), 'application/json'
+    )
+
+
+@cache_control(public=True, max_age=TILE_CACHE_SECONDS, immutable=True)
+def tile(request, document_id, page_number, version, level, column, row):
+    return storage_response(
+        tile_path(document_id, page_number, version, level, column, row),
+        'image/jpeg',
+    )
+
+
+@cache_control(public=True, max_age=TILE_INFO_CACHE_SECONDS)
+def sprites(request, document_id):
+    storage = DocumentStorage()
+    try:
+        with storage.open(sprites_map_path(document_id), 'rb') as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        raise Http404('No sprites found')
+    for sheet in result['sheets']:
+        sheet['url'] = storage.url(sheet.pop('name'))
+    return JsonResponse(result)
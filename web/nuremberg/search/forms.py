@@ -217,7 +217,8 @@ class FieldedSearchForm(SearchForm):
             field_queries.append([sections.popleft(), sections.popleft()])
         return (auto_query, field_queries)
 
-    def parse_query_keywords(self, full_query):
+    @staticmethod
+    def parse_query_keywords(full_query):
         """Parser that extracts single field keyword queries
 
         Also extract () keyword groups or "" exact matches.
@@ -237,6 +238,40 @@ class FieldedSearchForm(SearchForm):
                 field_queries.append([None, query])
         return (auto_query, field_queries)
 
+    @classmethod
+    def highlight_terms(cls, full_query):
+        """Return the terms that `search` would highlight for `full_query`.
+
+        Terms come from the same fields as the highlight query built in
+        `apply_field_query`, excluding negated fields and keywords. Quoted
+        phrases are kept as a single term.
+
+        """
+        auto_query, field_queries = cls.parse_query_keywords(full_query)
+        result = []
+        for field, value in [['all', auto_query]] + field_queries:
+            field = field or 'all'
+            if field[0] == '-' or not value or value.isspace():
+                continue
+            field_key = cls.search_fields.get(field)
+            if field_key not in ('exhibit_codes', 'evidence_codes', 'text'):
+                continue
+            for value in re.split(r'[|]', value):
+                if re.match(
+                    r'^\s*"?(none|unknown)"?\s*$', value, re.IGNORECASE
+                ):
+                    continue
+                for phrase, word in re.findall(r'"([^"]+)"|(\S+)', value):
+                    term = phrase.strip() or word.strip('()')
+                    if (
+                        term
+                        and term != '*'
+                        and not term.startswith('-')
+                        and term not in ('AND', 'OR', 'NOT')
+                    ):
+                        result.append(term)
+        return result
+
     def apply_field_query(self, sqs, field_query):
         (field, value) = field_query
 
@@ -1,5 +1,6 @@
 import environ
 import os
+import tempfile
 
 
 # Load the environment smartly
@@ -196,6 +197,29 @@ if not LOCAL_DEVELOPMENT:
         f'https://{AWS_S3_REGION_NAME}.digitaloceanspaces.com'
     )
 
+# The default cache is local to every process. Cached document sidebars and
+# reference tables are only invalidated across processes (see the
+# `invalidate_document_sidebars` and `invalidate_reference_data` commands) when
+# CACHE_URL points to a shared backend, such as memcached or redis.
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://')}
+
+# Server generated PDFs for document page ranges are cached in this directory
+DOCUMENTS_PDF_CACHE_DIR = env(
+    "DOCUMENTS_PDF_CACHE_DIR",
+    default=os.path.join(tempfile.gettempdir(), 'nuremberg-document-pdfs'),
+)
+
+# Full text exports of transcripts are cached in this directory
+TRANSCRIPTS_EXPORT_CACHE_DIR = env(
+    "TRANSCRIPTS_EXPORT_CACHE_DIR",
+    default=os.path.join(
+        tempfile.gettempdir(), 'nuremberg-transcript-exports'
+    ),
+)
+
+# HTTP client used to download author images, see documents.author_images
+AUTHOR_IMAGES_HTTP_CLIENT = 'nuremberg.documents.author_images.HttpClient'
+
 # Look for images in AWS S3
 # DOCUMENTS_URL = f'http://s3.amazonaws.com/nuremberg-documents/'
 # TRANSCRIPTS_URL = f'http://s3.amazonaws.com/nuremberg-transcripts/'
@@ -0,0 +1,105 @@
+"""Full text exports of transcripts, for researchers and bulk downloads.
+
+A transcript is exported page by page in seq order, in one of the
+`EXPORT_FORMATS`:
+
+- `txt`: a header line per page (seq, page label and date) and its text
+- `jsonl`: a JSON object per line, with `seq`, `page`, `date` and `text`
+
+Pages are read with a bounded iterator, so exporting a transcript of any size
+uses little memory. The XML of a page is only read when its analysis is not
+stored yet (see the `analyze_transcript_pages` command).
+
+"""
+import json
+import os
+import re
+
+from django.conf import settings
+
+from .models import pending_xml
+
+
+EXPORT_FORMATS = {
+    'txt': 'text/plain; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+EXPORT_CHUNK_SIZE = 200
+
+speaker_span = re.compile(r'<span class="speaker">(.*?)</span>', re.DOTALL)
+
+
+def plain_text(text):
+    """Clean the analyzed text of a page: no markup, one line per paragraph."""
+    text = speaker_span.sub(r'\1', text)
+    paragraphs = (' '.join(p.split()) for p in text.split('\n\n'))
+    return '\n\n'.join(p for p in paragraphs if p)
+
+
+def export_pages(transcript, export_format):
+    """Yield the export of `transcript` in `export_format`, as bytes."""
+    pages = (
+        transcript.pages.order_by('seq_number')
+        # the related manager sets `transcript` on every page, so load its id
+        .only('transcript', 'seq_number', 'page_label', 'date', 'xml_analysis')
+        # read the XML along with the pages missing the analysis, instead of
+        # loading it with a query per page
+        .annotate(pending_xml=pending_xml())
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for page in pages:
+        if page.xml_analysis is None:
+            page.xml = page.pending_xml
+        text = plain_text(page.text())
+        if export_format == 'jsonl':
+            row = {
+                'seq': page.seq_number,
+                'page': page.page_label,
+                'date': page.date.strftime('%Y-%m-%d') if page.date else None,
+                'text': text,
+            }
+            chunk = json.dumps(row, ensure_ascii=False) + '\n'
+        else:
+            date = page.date.strftime('%d %B %Y') if page.date else 'Undated'
+            chunk = (
+                f'=== HLSL Seq. No. {page.seq_number} | '
+                f'Page {page.page_label or "Unlabeled"} | {date} ===\n\n'
+                f'{text}\n\n'
+            )
+        yield chunk.encode('utf-8')
+
+
+def cached_export_path(transcript, export_format):
+    """Return the path where the export of `transcript` is cached.
+
+    Cached files are named after the version of the transcript pages, so
+    outdated exports are never served. Return `None` when the transcript has
+    no pages.
+
+    """
+    if not transcript.pages_version:
+        return None
+    return os.path.join(
+        settings.TRANSCRIPTS_EXPORT_CACHE_DIR,
+        f'{transcript.pages_version}.{export_format}',
+    )
+
+
+def remove_outdated_exports(transcript):
+    """Remove the cached exports of previous versions of `transcript`."""
+    try:
+        names = os.listdir(settings.TRANSCRIPTS_EXPORT_CACHE_DIR)
+    except FileNotFoundError:
+        return
+    # versions start with the transcript id, see `Transcript.pages_version`
+    prefix = f'{transcript.id}-'
+    for name in names:
+        if name.startswith(prefix) and not name.startswith(
+            f'{transcript.pages_version}.'
+        ):
+            try:
+                os.remove(
+                    os.path.join(settings.TRANSCRIPTS_EXPORT_CACHE_DIR, name)
+                )
+            except FileNotFoundError:
+                # removed by another process meanwhile
+                pass
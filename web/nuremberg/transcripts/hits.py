@@ -0,0 +1,98 @@
+"""Positions of search hits within a transcript.
+
+The transcript viewer moves between the matches of a search without going
+through the paginated search results. `search_hits` returns every matching
+page of a transcript at once, in seq order:
+
+    {'query': 'exhibit', 'pages': 2, 'hits': 5,
+     'results': [{'seq': 3, 'page': '12', 'count': 4}, ...]}
+
+Solr only returns the seq numbers of the matching pages (no highlighting and
+no stored text), and hits are counted in the analyzed text of each page (see
+`TranscriptPage.analysis`) with the same terms the search results highlight.
+Since Solr stems words, a page always counts at least one hit.
+
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.utils.html import strip_tags
+from haystack.query import SearchQuerySet
+from lxml import etree
+
+from nuremberg.documents.highlighting import compile_terms, normalize_query
+from nuremberg.search.forms import FieldedSearchForm
+from .models import pending_xml
+from .xml import analyze_page
+
+
+HITS_CACHE_SECONDS = 60 * 60 * 24
+# The longest transcripts have a few thousand pages, fetch them all at once
+MAX_HIT_PAGES = 20000
+COUNT_CHUNK_SIZE = 500
+
+
+def matching_seq_numbers(transcript, query):
+    """Return the sorted seq numbers of the pages matching `query`."""
+    form = FieldedSearchForm(
+        {'q': query},
+        searchqueryset=SearchQuerySet(),
+        sort_results='page',
+        transcript_id=transcript.id,
+    )
+    results = form.search().values_list('seq_number', flat=True)
+    # the form highlights matches, which is the slowest part of the query
+    results.query.highlight = False
+    return sorted(int(seq) for seq in results[:MAX_HIT_PAGES])
+
+
+def count_hits(transcript, seq_numbers, query):
+    """Return `{'seq', 'page', 'count'}` for each of the `seq_numbers`."""
+    terms = normalize_query(query)
+    pattern = compile_terms(terms) if terms else None
+    results = []
+    for i in range(0, len(seq_numbers), COUNT_CHUNK_SIZE):
+        # pages not analyzed yet are counted in their XML
+        pages = (
+            transcript.pages.filter(
+                seq_number__in=seq_numbers[i : i + COUNT_CHUNK_SIZE]
+            )
+            .order_by('seq_number')
+            .values_list(
+                'seq_number', 'page_label', 'xml_analysis', pending_xml()
+            )
+        )
+        for seq_number, page_label, analysis, xml in pages:
+            if analysis is None and xml:
+                try:
+                    analysis = analyze_page(xml)
+                except etree.XMLSyntaxError:
+                    pass
+            count = 0
+            if pattern and analysis:
+                text = strip_tags(analysis['text'])
+                count = sum(1 for _ in pattern.finditer(text))
+            results.append(
+                {'seq': seq_number, 'page': page_label, 'count': max(count, 1)}
+            )
+    return results
+
+
+def search_hits(transcript, query):
+    """Return the hits of `query` in `transcript`, cached until it changes."""
+    query = query.strip()
+    digest = hashlib.sha1(query.encode('utf-8')).hexdigest()
+    key = f'transcripts:hits:{transcript.pages_version}:{digest}'
+    hits = cache.get(key)
+    if hits is None:
+        results = count_hits(
+            transcript, matching_seq_numbers(transcript, query), query
+        )
+        hits = {
+            'query': query,
+            'pages': len(results),
+            'hits': sum(result['count'] for result in results),
+            'results': results,
+        }
+        cache.set(key, hits, HITS_CACHE_SECONDS)
+    return hits
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.2 on 2026-10-17 00:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0007_alter_transcriptpage_image_url_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedTranscriptPage',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rendered', serialize=False, to='transcripts.transcriptpage')),
+                ('html', models.TextField(blank=True)),
+                ('page_updated_at', models.DateTimeField()),
+                ('rendered_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
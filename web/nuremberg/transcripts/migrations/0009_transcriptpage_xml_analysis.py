@@ -0,0 +1,18 @@
+# Generated by Django 4.1.2 on 2026-10-17 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0008_renderedtranscriptpage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcriptpage',
+            name='xml_analysis',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
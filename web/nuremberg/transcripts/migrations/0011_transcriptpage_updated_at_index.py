@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-17 01:51
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transcripts', '0010_transcriptpage_xml_hash'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='transcriptpage',
+            index_together={('transcript', 'seq_number'), ('transcript', 'date'), ('transcript', 'page_number'), ('volume', 'volume_seq_number'), ('transcript', 'updated_at')},
+        ),
+    ]
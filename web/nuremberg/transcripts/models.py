@@ -1,19 +1,87 @@
+import bisect
 import logging
-import re
+from collections import namedtuple
 from datetime import datetime
 from lxml import etree
 
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Case, F, Max, TextField, Value, When
+from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.text import slugify
 
 from nuremberg.core.storages import TranscriptStorage
 from nuremberg.documents.models import DocumentCase, DocumentActivity
-from .xml import TranscriptPageJoiner
+from .xml import TranscriptPageJoiner, analyze_page, hash_xml
 
 
 logger = logging.getLogger(__name__)
 
+# Joined page ranges are keyed by the last update of their pages, so they can
+# be cached for long
+JOINED_PAGES_CACHE_SECONDS = 60 * 60 * 24 * 7
+NAVIGATION_CACHE_SECONDS = 60 * 60 * 24
+
+
+class TranscriptNavigation:
+    """Sorted page numbers and dates of a transcript, to find seq numbers.
+
+    Built with a single query and kept in the cache (see
+    `Transcript.navigation`), so going to a page or a date only needs the
+    query for the pages version.
+
+    """
+
+    def __init__(self, pages):
+        """Build the index from the `(seq, page number, date)` of pages."""
+        pages = list(pages)
+        self.total_pages = len(pages)
+
+        # page numbers can repeat, so they are sorted along with their seqs
+        numbered = sorted(
+            (page_number, seq)
+            for seq, page_number, _ in pages
+            if page_number is not None
+        )
+        self.page_numbers = [page_number for page_number, _ in numbered]
+        self.page_seqs = [seq for _, seq in numbered]
+
+        first_seqs = {}
+        for seq, _, date in sorted(pages):
+            if date is not None:
+                first_seqs.setdefault(date, seq)
+        self.dates = sorted(first_seqs)
+        self.date_seqs = [first_seqs[date] for date in self.dates]
+
+    def seq_from_page_date(self, page_date):
+        """Return the first seq for the `page_date` datetime, or None."""
+        i = bisect.bisect_left(self.dates, page_date)
+        if i < len(self.dates) and self.dates[i] == page_date:
+            return self.date_seqs[i]
+        return None
+
+    def seq_from_page_number(self, page_number, seq_number):
+        """Return the seq for `page_number` closest to `seq_number`.
+
+        When there is no such page number, guess it from the closest lower
+        page number. Return None if there is no lower page number either.
+
+        """
+        start = bisect.bisect_left(self.page_numbers, page_number)
+        end = bisect.bisect_right(self.page_numbers, page_number, start)
+        if start < end:
+            i = bisect.bisect_left(self.page_seqs, seq_number, start, end)
+            closest = [
+                self.page_seqs[j] for j in (i - 1, i) if start <= j < end
+            ]
+            return min(closest, key=lambda seq: abs(seq - seq_number))
+        if start:
+            lower = self.page_numbers[start - 1]
+            i = bisect.bisect_left(self.page_numbers, lower)
+            return self.page_seqs[i] + (page_number - lower)
+        return None
+
 
 class Transcript(models.Model):
     case = models.OneToOneField(
@@ -37,46 +105,135 @@ class Transcript(models.Model):
         return min(max(seq, 1), self.total_pages)
 
     @cached_property
+    def pages_version(self):
+        """A string identifying the current state of the transcript pages.
+
+        It changes whenever a page is updated, so it's suitable for cache keys
+        and file names. It's `None` when the transcript has no pages. The
+        `(transcript, updated_at)` index makes it a single index lookup.
+
+        """
+        latest = self.pages.aggregate(latest=Max('updated_at'))['latest']
+        if latest is not None:
+            return f'{self.id}-{latest.timestamp()}'
+
+    @cached_property
+    def navigation(self):
+        # Keyed by the pages version, so every process sees changed pages
+        # without the cache having to be shared or cleared.
+        cache_key = f'transcripts:navigation:{self.id}:{self.pages_version}'
+        result = cache.get(cache_key)
+        if result is None:
+            result = TranscriptNavigation(
+                self.pages.values_list('seq_number', 'page_number', 'date')
+            )
+            cache.set(cache_key, result, NAVIGATION_CACHE_SECONDS)
+        return result
+
+    def invalidate_navigation(self):
+        """Forget the navigation of this instance after changing the pages."""
+        self.__dict__.pop('pages_version', None)
+        self.__dict__.pop('navigation', None)
+
+    @property
     def total_pages(self):
-        return self.pages.count()
+        return self.navigation.total_pages
 
     def dates(self):
-        return self.pages.order_by().values_list('date', flat=True).distinct()
+        return self.navigation.dates
 
     def get_seq_from_page_date(self, page_date, seq_number):
         # find the seq number for provided date
         # assume dates are valid since they come from selection
-        page_date = datetime.strptime(page_date, '%Y-%m-%d')
-        page = self.pages.filter(date=page_date).order_by('seq_number').first()
-        if page:
-            return page.seq_number
-        return seq_number
+        page_date = timezone.make_aware(
+            datetime.strptime(page_date, '%Y-%m-%d')
+        )
+        result = self.navigation.seq_from_page_date(page_date)
+        return seq_number if result is None else result
 
     def get_seq_from_page_number(self, page_number, seq_number):
         # find the seq number for provided page number
         # we have to be a bit tricky because page numbers can repeat
-        page = (
-            self.pages.filter(page_number=page_number)
-            .extra(
-                select={'distance': "ABS(seq_number - %s)"},
-                select_params=(seq_number,),
-                order_by=('distance',),
-            )
-            .first()
+        result = self.navigation.seq_from_page_number(page_number, seq_number)
+        return seq_number if result is None else result
+
+    def range_updated_at(self, from_seq, to_seq):
+        """Return the last update of the pages from `from_seq` to `to_seq`."""
+        return self.pages.filter(
+            seq_number__gte=from_seq, seq_number__lte=to_seq
+        ).aggregate(latest=Max('updated_at'))['latest']
+
+    def joined_pages(self, from_seq, to_seq):
+        """Return the joined HTML for the pages from `from_seq` to `to_seq`.
+
+        The result is a dict with the `html_pages` of a TranscriptPageJoiner
+        (using PageDetails instead of TranscriptPage objects) and its
+        `from_seq` and `to_seq`.
+
+        When every page in the range is pre-rendered (see the
+        `render_transcripts` command) the result is a slice of the rendered
+        pages. Otherwise the pages are joined and the result is stored in the
+        cache, keyed by the range and the latest update of its pages, so the
+        XML of the pages is only parsed again after they change.
+
+        """
+        pages = self.pages.filter(
+            seq_number__gte=from_seq, seq_number__lte=to_seq
         )
-        if page:
-            return page.seq_number
+        include_first = from_seq == 1
+        include_last = to_seq == self.total_pages
+
+        details = list(
+            pages.defer('xml')
+            .select_related('rendered')
+            .order_by('seq_number')
+        )
+        rendered = [page.rendered_html() for page in details]
+        if details and None not in rendered:
+            # the first and last pages only complete the joins of a range
+            shown = [
+                (page, html)
+                for page, html in zip(details, rendered)
+                if (include_first or page.seq_number > from_seq)
+                and (include_last or page.seq_number < to_seq)
+            ]
+            return {
+                'html_pages': [
+                    {'page': page.details(), 'html': html}
+                    for page, html in shown
+                    if html
+                ],
+                'from_seq': shown[0][0].seq_number if shown else None,
+                'to_seq': shown[-1][0].seq_number if shown else None,
+            }
+
+        updated_at = max((page.updated_at for page in details), default=None)
+        if updated_at is None:
+            cache_key = None
         else:
-            # guesstimate
-            page = (
-                self.pages.filter(page_number__lte=page_number)
-                .order_by('-page_number')
-                .first()
+            cache_key = (
+                f'transcripts:joined:{self.id}:{from_seq}:{to_seq}:'
+                f'{include_first:d}{include_last:d}:{updated_at.timestamp()}'
             )
-            if page:
-                return page.seq_number + (page_number - page.page_number)
-
-        return seq_number
+        result = cache.get(cache_key) if cache_key else None
+        if result is None:
+            joiner = TranscriptPageJoiner(
+                pages.order_by('seq_number'),
+                include_first=include_first,
+                include_last=include_last,
+            )
+            joiner.build_html()
+            result = {
+                'html_pages': [
+                    {'page': row['page'].details(), 'html': row['html']}
+                    for row in joiner.html_pages
+                ],
+                'from_seq': joiner.from_seq,
+                'to_seq': joiner.to_seq,
+            }
+            if cache_key:
+                cache.set(cache_key, result, JOINED_PAGES_CACHE_SECONDS)
+        return result
 
 
 class TranscriptVolume(models.Model):
@@ -91,6 +248,27 @@ class TranscriptVolume(models.Model):
         return 'Transcript volume {}'.format(self.volume_number)
 
 
+def pending_xml():
+    """Return an annotation with the XML of pages missing their analysis.
+
+    Pages analyzed already (see the `analyze_transcript_pages` command) get
+    `None`, so the XML of a page is only read when it's needed.
+
+    """
+    return Case(
+        When(xml_analysis__isnull=True, then=F('xml')),
+        default=Value(None),
+        output_field=TextField(),
+    )
+
+
+# Lightweight, read only representation of a transcript page
+PageDetails = namedtuple(
+    'PageDetails',
+    ['seq_number', 'page_number', 'page_label', 'date', 'image_url'],
+)
+
+
 # class TranscriptPageQuerySet(models.QuerySet):
 #     use_for_related_fields = True
 #     def joined_text(self):
@@ -117,6 +295,12 @@ class TranscriptPage(models.Model):
     page_label = models.CharField(max_length=10, blank=True, null=True)
 
     xml = models.TextField()
+    # the `analyze_page` record for `xml`, kept up to date by `save()`
+    xml_analysis = models.JSONField(blank=True, null=True, editable=False)
+    # the `hash_xml` of `xml`, to skip unchanged pages when re-ingesting
+    xml_hash = models.CharField(
+        max_length=64, blank=True, null=True, editable=False
+    )
     image = models.ImageField(
         null=True, blank=True, storage=TranscriptStorage()
     )
@@ -133,6 +317,7 @@ class TranscriptPage(models.Model):
             ('transcript', 'seq_number'),
             ('transcript', 'page_number'),
             ('transcript', 'date'),
+            ('transcript', 'updated_at'),
             ('volume', 'volume_seq_number'),
         )
 
@@ -152,84 +337,123 @@ class TranscriptPage(models.Model):
             )
         return result
 
+    def details(self):
+        return PageDetails(
+            self.seq_number,
+            self.page_number,
+            self.page_label,
+            self.date,
+            self.image_url,
+        )
+
+    def rendered_html(self):
+        """Return the pre-rendered HTML of this page, None if outdated."""
+        try:
+            rendered = self.rendered
+        except RenderedTranscriptPage.DoesNotExist:
+            return None
+        if rendered.page_updated_at != self.updated_at:
+            return None
+        return rendered.html
+
     def xml_tree(self):
         return etree.fromstring(self.xml.encode('utf8'))
 
+    @property
+    def analysis(self):
+        """Return the `analyze_page` record for the XML of this page.
+
+        The record is computed once per XML value, and stored along with the
+        page when saving it (so pages loaded from the database don't need to
+        parse their XML at all).
+
+        """
+        # a deferred XML field is only loaded when the record is missing
+        xml = self.__dict__.get('xml')
+        cached = self.__dict__.get('_analysis')
+        if cached is None or cached[0] is not xml:
+            if xml is None:
+                xml = self.xml
+            cached = self._analysis = (xml, analyze_page(xml))
+        return cached[1]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if instance.__dict__.get('xml_analysis') is not None:
+            instance._analysis = (
+                instance.__dict__.get('xml'),
+                instance.xml_analysis,
+            )
+        return instance
+
+    def set_xml(self, xml, analysis):
+        """Set the XML of the page along with its known `analyze_page` record.
+
+        Useful when the XML was analyzed elsewhere (e.g. in another process),
+        and to store pages without `save()`, as `bulk_create` does.
+
+        """
+        self.xml = xml
+        self.xml_analysis = analysis
+        self.xml_hash = hash_xml(xml)
+        self._analysis = (xml, analysis)
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None or 'xml' in update_fields:
+            try:
+                self.xml_analysis = self.analysis
+            except etree.XMLSyntaxError:
+                self.xml_analysis = None
+            self.xml_hash = hash_xml(self.xml)
+            if update_fields is not None:
+                update_fields = {*update_fields, 'xml_analysis', 'xml_hash'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
     def populate_from_xml(self):
-        for event, element in etree.iterwalk(self.xml_tree()):
-            if event != 'end':
-                continue
-            if element.tag == 'seqNo':
-                self.seq_number = int(element.text)
-            elif element.tag == 'sessionDate':
-                try:
-                    self.date = datetime.strptime(element.get('n'), '%Y-%m-%d')
-                except:
-                    self.date = None
-            elif element.tag == 'pageNum':
-                self.page_label = element.get('n')
-                page_int = re.sub(r'[^\d]', '', self.page_label)
-                if page_int:
-                    self.page_number = int(page_int)
-                else:
-                    self.page_number = None
+        metadata = self.analysis['metadata']
+        if 'seq_number' in metadata:
+            self.seq_number = metadata['seq_number']
+        if 'date' in metadata:
+            self.date = metadata['date'] and datetime.strptime(
+                metadata['date'], '%Y-%m-%d'
+            )
+        if 'page_label' in metadata:
+            self.page_label = metadata['page_label']
+            self.page_number = metadata['page_number']
 
     def text(self):
         # TODO: this blob won't allow exact phrase matches across transcript pages.
         # It might be extended a few words into either adjacent page to allow that.
-        text = ''
-        for event, element in etree.iterwalk(
-            self.xml_tree(), events=('start', 'end')
-        ):
-            if element.tag == 'p':
-                if len(element) and element[0].tag == 'runningHead':
-                    continue
-                if event == 'start':
-                    if element.text:
-                        if len(
-                            element.text
-                        ) < 20 and TranscriptPageJoiner.ignore_p.match(
-                            element.text
-                        ):
-                            continue
-                        text += element.text
-                else:
-                    text += '\n\n'
-            elif event == 'end' and element.tag == 'spkr':
-                if element.text:
-                    text += '<span class="speaker">{}</span> '.format(
-                        element.text
-                    )
-                if element.tail:
-                    text += element.tail
-            elif event == 'end' and element.tag in (
-                'evidenceFileDoc',
-                'exhibitDocDef',
-                'exhibitDocPros',
-            ):
-                if element.text:
-                    text += element.text
-                if element.tail:
-                    text += element.tail
-        return text
+        return self.analysis['text']
+
+    def speakers(self):
+        return list(self.analysis['speakers'])
 
     def extract_evidence_codes(self):
-        codes = []
-        for event, element in etree.iterwalk(self.xml_tree()):
-            if element.tag == 'evidenceFileDoc':
-                codes.append(element.get('n'))
-        return codes
+        return list(self.analysis['evidence_codes'])
 
     def extract_exhibit_codes(self):
-        codes = []
-        for event, element in etree.iterwalk(self.xml_tree()):
-            if element.tag == 'exhibitDocPros':
-                codes.append('Prosecution {}'.format(element.get('n')))
-            elif element.tag == 'exhibitDocDef':
-                codes.append(
-                    '{} {}'.format(
-                        element.get('def') or 'Unknown Defendant',
-                        element.get('n'),
-                    )
-                )
-        return codes
+        return list(self.analysis['exhibit_codes'])
+
+
+class RenderedTranscriptPage(models.Model):
+    """The HTML of a page, joined along with the rest of its transcript.
+
+    Built by the `render_transcripts` management command.
+
+    """
+
+    page = models.OneToOneField(
+        TranscriptPage,
+        primary_key=True,
+        related_name='rendered',
+        on_delete=models.CASCADE,
+    )
+    html = models.TextField(blank=True)
+    # the `updated_at` of the page when it was rendered
+    page_updated_at = models.DateTimeField()
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return 'Rendered page for {}'.format(self.page_id)
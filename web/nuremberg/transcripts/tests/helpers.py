@@ -0,0 +1,47 @@
+import datetime
+
+from model_bakery import baker
+
+from nuremberg.transcripts.xml import TranscriptPageJoiner
+
+
+def page_xml(seq, text=None):
+    if text is None:
+        text = (
+            f'the previous page ends here. Page {seq} starts here and it '
+            'goes on'
+        )
+    return (
+        f'<transcriptBody><seqNo>{seq}</seqNo><p>{text}</p>'
+        f'<pageNum n="{seq}">{seq}</pageNum></transcriptBody>'
+    )
+
+
+def make_transcript(pages=30, **kwargs):
+    transcript = baker.make('Transcript', **kwargs)
+    volume = baker.make(
+        'TranscriptVolume', transcript=transcript, volume_number=1
+    )
+    for seq in range(1, pages + 1):
+        baker.make(
+            'TranscriptPage',
+            transcript=transcript,
+            volume=volume,
+            seq_number=seq,
+            volume_seq_number=seq,
+            page_number=seq,
+            page_label=str(seq),
+            date=datetime.datetime(1946, 12, 10, tzinfo=datetime.timezone.utc),
+            xml=page_xml(seq),
+            image=f'transcripts/{seq}.jpg',
+        )
+    return transcript
+
+
+class FullHtmlJoiner(TranscriptPageJoiner):
+    """The joiner searching sentence ends in the whole page HTML, as it used
+    to. Its output is the reference for the joiner using a bounded tail."""
+
+    def put(self, text):
+        super().put(text)
+        self.tail = ''.join(self.page_parts)
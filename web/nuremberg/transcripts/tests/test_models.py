@@ -0,0 +1,226 @@
+import datetime
+import os
+
+import pytest
+from django.utils import timezone
+
+from nuremberg.transcripts import models
+from nuremberg.transcripts.models import Transcript, TranscriptPage
+from nuremberg.transcripts.xml import analyze_page
+from .helpers import make_transcript
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def locmem_cache(settings, request):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': request.node.name,
+        }
+    }
+
+
+def utc_date(year, month, day):
+    return datetime.datetime(year, month, day, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture
+def transcript():
+    result = make_transcript(pages=10)
+    page_numbers = [None, 1, 2, 3, 1, 2, 3, 7, 8, None]
+    dates = [utc_date(1946, 12, 9)] * 3 + [utc_date(1946, 12, 10)] * 4
+    dates += [None] * 3
+    for seq, (page_number, date) in enumerate(
+        zip(page_numbers, dates), start=1
+    ):
+        TranscriptPage.objects.filter(
+            transcript=result, seq_number=seq
+        ).update(page_number=page_number, date=date)
+    return Transcript.objects.get(id=result.id)
+
+
+def test_navigation(transcript, django_assert_num_queries):
+    # the pages version and the pages
+    with django_assert_num_queries(2):
+        assert transcript.total_pages == 10
+
+    with django_assert_num_queries(0):
+        assert transcript.dates() == [
+            utc_date(1946, 12, 9),
+            utc_date(1946, 12, 10),
+        ]
+        assert transcript.clamp_seq(12) == 10
+
+
+@pytest.mark.parametrize(
+    'page_number, seq_number, expected',
+    [
+        (1, 1, 2),
+        (1, 5, 5),
+        (1, 4, 5),
+        (2, 4, 3),
+        (2, 9, 6),
+        (8, 1, 9),
+        # guessed from the closest lower page number
+        (5, 1, 6),
+        (100, 1, 101),
+        # no lower page number
+        (0, 3, 3),
+    ],
+)
+def test_get_seq_from_page_number(
+    transcript, page_number, seq_number, expected
+):
+    assert transcript.get_seq_from_page_number(page_number, seq_number) == (
+        expected
+    )
+
+
+def test_get_seq_from_page_date(transcript):
+    assert transcript.get_seq_from_page_date('1946-12-09', 5) == 1
+    assert transcript.get_seq_from_page_date('1946-12-10', 1) == 4
+    assert transcript.get_seq_from_page_date('1947-01-01', 5) == 5
+
+
+def test_navigation_cached(
+    locmem_cache, transcript, django_assert_num_queries
+):
+    assert transcript.total_pages == 10
+
+    transcript = Transcript.objects.get(id=transcript.id)
+    # only the pages version is queried
+    with django_assert_num_queries(1):
+        assert transcript.total_pages == 10
+        assert transcript.get_seq_from_page_number(7, 1) == 8
+        assert transcript.get_seq_from_page_date('1946-12-10', 1) == 4
+
+
+def test_invalidate_navigation(locmem_cache, transcript):
+    assert transcript.get_seq_from_page_number(7, 1) == 8
+    TranscriptPage.objects.filter(transcript=transcript, seq_number=10).update(
+        page_number=7, updated_at=timezone.now()
+    )
+
+    transcript.invalidate_navigation()
+
+    assert transcript.get_seq_from_page_number(7, 10) == 10
+    transcript = Transcript.objects.get(id=transcript.id)
+    assert transcript.get_seq_from_page_number(7, 10) == 10
+
+
+def test_navigation_follows_page_changes(locmem_cache, transcript):
+    # other processes never invalidate the navigation, the key changes instead
+    assert transcript.get_seq_from_page_number(7, 1) == 8
+    TranscriptPage.objects.filter(transcript=transcript, seq_number=10).update(
+        page_number=7, updated_at=timezone.now()
+    )
+
+    transcript = Transcript.objects.get(id=transcript.id)
+    assert transcript.get_seq_from_page_number(7, 10) == 10
+
+
+@pytest.fixture
+def page_xml():
+    path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        'good',
+        'NRMB-NMT01-01_00136_0.xml',
+    )
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def analyze_calls(monkeypatch):
+    calls = []
+
+    def counted(xml):
+        calls.append(xml)
+        return analyze_page(xml)
+
+    monkeypatch.setattr(models, 'analyze_page', counted)
+    return calls
+
+
+def test_page_analysis(page_xml, analyze_calls):
+    page = TranscriptPage(xml=page_xml)
+
+    page.populate_from_xml()
+
+    assert page.seq_number == 136
+    assert page.date == datetime.datetime(1946, 12, 10)
+    assert page.page_label == '121'
+    assert page.page_number == 121
+    assert page.text().startswith(
+        '\n\n\n    <span class="speaker">AFTERNOON SESSION</span> \n  \n\n'
+    )
+    assert 'The next document is NO-416, which will be' in page.text()
+    assert page.extract_evidence_codes() == ['NO-416', 'NO-417']
+    assert page.extract_exhibit_codes() == ['Prosecution 22']
+    assert page.speakers() == [
+        'AFTERNOON SESSION',
+        'THE MARSHAL:',
+        'MR. MCHANEY:',
+    ]
+    assert page.analysis['metadata'] == {
+        'seq_number': 136,
+        'date': '1946-12-10',
+        'page_label': '121',
+        'page_number': 121,
+    }
+    # the XML was parsed only once
+    assert len(analyze_calls) == 1
+
+
+def test_page_analysis_xml_changed(page_xml):
+    page = TranscriptPage(xml=page_xml)
+    assert page.extract_evidence_codes() == ['NO-416', 'NO-417']
+
+    page.xml = page_xml.replace('NO-417', 'NO-418')
+
+    assert page.extract_evidence_codes() == ['NO-416', 'NO-418']
+
+
+def test_page_analysis_stored(
+    transcript, page_xml, analyze_calls, django_assert_num_queries
+):
+    page = transcript.pages.get(seq_number=1)
+    page.xml = page_xml
+    page.save()
+    expected = page.analysis
+    analyze_calls.clear()
+
+    page = TranscriptPage.objects.get(id=page.id)
+    assert page.analysis == expected
+
+    page = TranscriptPage.objects.defer('xml').get(id=page.id)
+    with django_assert_num_queries(0):
+        assert page.extract_exhibit_codes() == ['Prosecution 22']
+
+    assert analyze_calls == []
+
+
+def test_page_analysis_not_stored(transcript, django_assert_num_queries):
+    TranscriptPage.objects.filter(transcript=transcript).update(
+        xml_analysis=None
+    )
+    page = TranscriptPage.objects.defer('xml').get(
+        transcript=transcript, seq_number=1
+    )
+
+    # the XML is loaded to analyze it
+    with django_assert_num_queries(1):
+        assert 'Page 1 starts here' in page.text()
+
+
+def test_page_invalid_xml_saved(transcript):
+    page = transcript.pages.get(seq_number=1)
+    page.xml = 'not XML'
+
+    page.save()
+
+    page.refresh_from_db()
+    assert page.xml_analysis is None
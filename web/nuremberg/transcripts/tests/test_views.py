@@ -0,0 +1,503 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from nuremberg.core.tests.acceptance_helpers import PyQuery, client
+from nuremberg.transcripts import hits
+from nuremberg.transcripts.models import Transcript, TranscriptPage
+from .helpers import make_transcript, page_xml
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def cached_client(settings, request):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': request.node.name,
+        }
+    }
+    # skip the site-wide cache middleware, test only view level caches
+    settings.CACHE_MIDDLEWARE_SECONDS = 0
+    return Client()
+
+
+def show_url(transcript, **params):
+    url = reverse(
+        'transcripts:show',
+        kwargs={'transcript_id': transcript.id, 'slug': transcript.slug()},
+    )
+    query = '&'.join(f'{k}={v}' for k, v in params.items())
+    return f'{url}?{query}' if query else url
+
+
+def get_without_parsing_pages(test_client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = test_client.get(url)
+    assert not [q['sql'] for q in queries if '"xml"' in q['sql']]
+    return response
+
+
+def test_joined_pages():
+    transcript = make_transcript(pages=30)
+
+    joined = transcript.joined_pages(11, 21)
+
+    assert joined['from_seq'] == 12
+    assert joined['to_seq'] == 20
+    assert [row['page'].seq_number for row in joined['html_pages']] == list(
+        range(12, 21)
+    )
+    assert (
+        'Page 12 starts here and it goes on the previous page ends here.'
+        in (joined['html_pages'][0]['html'])
+    )
+    assert joined['html_pages'][0]['page'].image_url.endswith(
+        'transcripts/12.jpg'
+    )
+
+
+def test_partial_pages_cached(cached_client):
+    transcript = make_transcript(pages=30)
+    url = show_url(transcript, seq=15, from_seq=11, to_seq=21, partial=1)
+
+    expected = cached_client.get(url).json()
+    assert expected['from_seq'] == 12
+    assert expected['to_seq'] == 20
+    assert 'Page 15 starts here' in expected['html']
+
+    response = get_without_parsing_pages(cached_client, url)
+
+    assert response.json() == expected
+
+
+def test_full_page_cached(cached_client):
+    transcript = make_transcript(pages=30)
+    url = show_url(transcript, seq=15)
+
+    expected = cached_client.get(url).content.decode('utf-8')
+    page = PyQuery(expected)
+    assert page('.transcript-text').attr('data-from-seq') == '1'
+    assert page('.transcript-text').attr('data-to-seq') == '20'
+    assert len(page('.page-handle')) == 20
+    assert page('input[name=page]').val() == '15'
+    assert page('.transcript-export a').eq(1).attr('href') == (
+        f'/transcripts/{transcript.id}/export?format=jsonl'
+    )
+
+    response = get_without_parsing_pages(cached_client, url)
+
+    assert response.content.decode('utf-8') == expected
+
+
+def test_partial_and_full_pages_share_cache(cached_client):
+    transcript = make_transcript(pages=30)
+    cached_client.get(show_url(transcript, seq=15))
+
+    # the initial page load for seq 15 covers pages 1 to 21
+    response = get_without_parsing_pages(
+        cached_client,
+        show_url(transcript, seq=15, from_seq=1, to_seq=21, partial=1),
+    )
+
+    assert response.json()['to_seq'] == 20
+
+
+def test_joined_pages_cache_updated_with_pages(cached_client):
+    transcript = make_transcript(pages=30)
+    # explicit ranges are publicly cacheable, so the site wide cache would
+    # keep them as well; use the initial range for seq 15 instead
+    url = show_url(transcript, seq=15, partial=1)
+    cached_client.get(url)
+
+    page = TranscriptPage.objects.get(transcript=transcript, seq_number=15)
+    page.xml = page_xml(15, 'the previous page ends here. Updated text')
+    page.save()
+
+    html = cached_client.get(url).json()['html']
+
+    assert 'Updated text' in html
+    assert 'Page 15 starts here' not in html
+
+
+@pytest.mark.parametrize(
+    'from_seq, to_seq', [(1, 21), (11, 21), (20, 30), (1, 30), (5, 6)]
+)
+def test_joined_pages_pre_rendered(from_seq, to_seq):
+    transcript = make_transcript(pages=30)
+    expected = transcript.joined_pages(from_seq, to_seq)
+    call_command(
+        'render_transcripts', '--ids', transcript.id, stdout=StringIO()
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        joined = transcript.joined_pages(from_seq, to_seq)
+
+    assert joined == expected
+    assert len(queries) == 1
+
+
+def test_joined_pages_pre_rendered_outdated():
+    transcript = make_transcript(pages=30)
+    call_command(
+        'render_transcripts', '--ids', transcript.id, stdout=StringIO()
+    )
+
+    page = TranscriptPage.objects.get(transcript=transcript, seq_number=15)
+    page.xml = page_xml(15, 'the previous page ends here. Updated text')
+    page.save()
+
+    joined = transcript.joined_pages(11, 21)
+
+    assert 'Updated text' in joined['html_pages'][3]['html']
+
+
+def test_partial_pages_pre_rendered():
+    transcript = make_transcript(pages=30)
+    call_command(
+        'render_transcripts', '--ids', transcript.id, stdout=StringIO()
+    )
+
+    response = get_without_parsing_pages(
+        client, show_url(transcript, seq=15, from_seq=11, to_seq=21, partial=1)
+    )
+
+    assert response.json()['from_seq'] == 12
+    assert 'Page 15 starts here' in response.json()['html']
+
+
+def export_url(transcript_id, **params):
+    url = reverse(
+        'transcripts:export', kwargs={'transcript_id': transcript_id}
+    )
+    query = '&'.join(f'{k}={v}' for k, v in params.items())
+    return f'{url}?{query}' if query else url
+
+
+@pytest.fixture
+def export_cache_dir(settings, tmp_path):
+    settings.TRANSCRIPTS_EXPORT_CACHE_DIR = str(tmp_path / 'exports')
+    return tmp_path / 'exports'
+
+
+@pytest.fixture
+def export_transcript():
+    transcript = make_transcript(pages=3)
+    page = TranscriptPage.objects.get(transcript=transcript, seq_number=2)
+    page.xml = page_xml(
+        2,
+        '<spkr>THE PRESIDENT:</spkr> The Tribunal will \n  recess.</p>'
+        '<p>Court No. 1',
+    )
+    page.page_label = '2a'
+    page.date = None
+    page.save()
+    return transcript
+
+
+def test_export_txt(export_cache_dir, export_transcript):
+    response = client.get(export_url(export_transcript.id))
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/plain; charset=utf-8'
+    assert response['Content-Disposition'] == (
+        'attachment; '
+        f'filename="HLSL Nuremberg Transcript #{export_transcript.id}.txt"'
+    )
+    content = b''.join(response.streaming_content).decode('utf-8')
+    assert content.startswith(
+        '=== HLSL Seq. No. 1 | Page 1 | 10 December 1946 ===\n\n'
+        'the previous page ends here. Page 1 starts here and it goes on\n\n'
+        '=== HLSL Seq. No. 2 | Page 2a | Undated ===\n\n'
+        'THE PRESIDENT: The Tribunal will recess.\n\n'
+        '=== HLSL Seq. No. 3 | Page 3 | 10 December 1946 ===\n\n'
+    )
+
+
+def test_export_jsonl(export_cache_dir, export_transcript):
+    response = client.get(export_url(export_transcript.id, format='jsonl'))
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/x-ndjson'
+    content = b''.join(response.streaming_content).decode('utf-8')
+    rows = [json.loads(line) for line in content.splitlines()]
+    assert [row['seq'] for row in rows] == [1, 2, 3]
+    assert rows[1] == {
+        'seq': 2,
+        'page': '2a',
+        'date': None,
+        'text': 'THE PRESIDENT: The Tribunal will recess.',
+    }
+    assert rows[2]['date'] == '1946-12-10'
+
+
+def test_export_not_analyzed(
+    export_cache_dir, export_transcript, django_assert_num_queries
+):
+    url = export_url(export_transcript.id)
+    expected = b''.join(client.get(url).streaming_content)
+    for path in export_cache_dir.iterdir():
+        path.unlink()
+    TranscriptPage.objects.filter(transcript=export_transcript).update(
+        xml_analysis=None
+    )
+
+    # the transcript, the version of its pages and the pages with their XML
+    with django_assert_num_queries(3):
+        content = b''.join(client.get(url).streaming_content)
+
+    assert content == expected
+
+
+def test_export_invalid_format(export_cache_dir, export_transcript):
+    response = client.get(export_url(export_transcript.id, format='pdf'))
+
+    assert response.status_code == 400
+
+
+def test_export_not_found(export_cache_dir):
+    response = client.get(export_url(123456))
+
+    assert response.status_code == 404
+
+
+def test_export_cached(
+    export_cache_dir, export_transcript, django_assert_num_queries
+):
+    url = export_url(export_transcript.id, format='jsonl')
+    expected = b''.join(client.get(url).streaming_content)
+    assert len(list(export_cache_dir.iterdir())) == 1
+
+    # the transcript and the version of its pages, but no pages
+    with django_assert_num_queries(2):
+        response = client.get(url)
+    assert b''.join(response.streaming_content) == expected
+
+    page = TranscriptPage.objects.get(
+        transcript=export_transcript, seq_number=3
+    )
+    page.xml = page_xml(3, 'New text')
+    page.save()
+
+    other = export_cache_dir / f'{export_transcript.id + 1}-0.0.jsonl'
+    other.write_bytes(b'')
+
+    content = b''.join(client.get(url).streaming_content)
+    assert b'New text' in content
+    # the export of the previous version is removed, other transcripts stay
+    version = Transcript.objects.get(id=export_transcript.id).pages_version
+    assert sorted(path.name for path in export_cache_dir.iterdir()) == [
+        f'{version}.jsonl',
+        other.name,
+    ]
+
+
+def test_partial_pages_validators():
+    transcript = make_transcript(pages=30)
+    url = show_url(transcript, seq=15, from_seq=10, to_seq=21, partial=1)
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response['ETag']
+    assert response['Last-Modified']
+    assert response['Cache-Control'] == 'public, max-age=3600'
+
+
+def test_partial_pages_not_modified(monkeypatch):
+    transcript = make_transcript(pages=30)
+    url = show_url(transcript, seq=15, from_seq=10, to_seq=21, partial=1)
+    etag = client.get(url)['ETag']
+
+    def fail(*args, **kwargs):
+        raise AssertionError('pages should not be joined')
+
+    monkeypatch.setattr(Transcript, 'joined_pages', fail)
+    response = get_without_parsing_pages(
+        client.__class__(HTTP_IF_NONE_MATCH=etag), url
+    )
+
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    assert response['Cache-Control'] == 'public, max-age=3600'
+
+
+def test_partial_pages_modified():
+    transcript = make_transcript(pages=30)
+    url = show_url(transcript, seq=15, from_seq=11, to_seq=21, partial=1)
+    response = client.get(url)
+    etag = response['ETag']
+    last_modified = response['Last-Modified']
+
+    page = TranscriptPage.objects.get(transcript=transcript, seq_number=15)
+    page.xml = page_xml(15, 'the previous page ends here. Updated text')
+    page.save()
+
+    response = client.get(
+        url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=last_modified
+    )
+
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert 'Updated text' in response.json()['html']
+
+
+def test_partial_pages_not_modified_since():
+    transcript = make_transcript(pages=30)
+    url = show_url(transcript, seq=15, from_seq=11, to_seq=21, partial=1)
+    last_modified = client.get(url)['Last-Modified']
+
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize(
+    'params',
+    [
+        # not aligned to the page batches
+        {'from_seq': 11, 'to_seq': 21},
+        {'from_seq': 10, 'to_seq': 20},
+        # too many pages
+        {'from_seq': 20, 'to_seq': 61, 'seq': 25},
+        {'from_seq': 10, 'to_seq': 51, 'seq': 15},
+        # the seq is outside the range
+        {'from_seq': 10, 'to_seq': 21, 'seq': 5},
+    ],
+)
+def test_partial_pages_unaligned_range_not_public(params):
+    transcript = make_transcript(pages=60)
+    params.setdefault('seq', 15)
+
+    response = client.get(show_url(transcript, partial=1, **params))
+
+    assert response.status_code == 200
+    assert response['ETag']
+    assert 'public' not in response.get('Cache-Control', '')
+
+
+@pytest.mark.parametrize(
+    'params',
+    [
+        {'from_seq': 20, 'to_seq': 31},
+        {'from_seq': 20, 'to_seq': 51},
+        {'from_seq': 1, 'to_seq': 11},
+        # clamped to the first and last pages
+        {'from_seq': 0, 'to_seq': 11},
+        {'from_seq': 50, 'to_seq': 71},
+    ],
+)
+def test_partial_pages_aligned_range_public(params):
+    transcript = make_transcript(pages=60)
+
+    response = client.get(
+        show_url(transcript, partial=1, seq=params['from_seq'] + 1, **params)
+    )
+
+    assert response.status_code == 200
+    assert response['Cache-Control'] == 'public, max-age=3600'
+
+
+def test_partial_pages_derived_range_not_public():
+    transcript = make_transcript(pages=30)
+
+    response = client.get(show_url(transcript, page=15, partial=1))
+
+    assert response.status_code == 200
+    assert response['ETag']
+    assert 'public' not in response.get('Cache-Control', '')
+
+
+def hits_url(transcript_id, **params):
+    url = reverse('transcripts:hits', kwargs={'transcript_id': transcript_id})
+    query = '&'.join(f'{k}={v}' for k, v in params.items())
+    return f'{url}?{query}' if query else url
+
+
+@pytest.fixture
+def hits_transcript(monkeypatch):
+    transcript = make_transcript(pages=10)
+    for seq, text in [
+        (3, 'Exhibit 12 and exhibit 14, then EXHIBIT 15.'),
+        (7, 'the previous page ends here. Exhibits follow.'),
+        (9, 'the previous page ends here. Nothing else.'),
+    ]:
+        page = TranscriptPage.objects.get(
+            transcript=transcript, seq_number=seq
+        )
+        page.xml = page_xml(seq, text)
+        page.save()
+
+    # Solr is not involved in these tests, matching pages are given
+    searches = []
+
+    def matching_seq_numbers(transcript, query):
+        searches.append(query)
+        return [3, 7, 9]
+
+    monkeypatch.setattr(hits, 'matching_seq_numbers', matching_seq_numbers)
+    transcript.searches = searches
+    return transcript
+
+
+def test_hits(hits_transcript):
+    response = client.get(hits_url(hits_transcript.id, q='exhibit'))
+
+    assert response.status_code == 200
+    assert response['Cache-Control'] == 'public, max-age=3600'
+    assert response.json() == {
+        'query': 'exhibit',
+        'pages': 3,
+        'hits': 5,
+        'results': [
+            {'seq': 3, 'page': '3', 'count': 3},
+            {'seq': 7, 'page': '7', 'count': 1},
+            # matched by Solr (e.g. stemming), but no literal hit
+            {'seq': 9, 'page': '9', 'count': 1},
+        ],
+    }
+
+
+def test_hits_not_analyzed(hits_transcript):
+    expected = hits.search_hits(hits_transcript, 'exhibit')
+    TranscriptPage.objects.filter(transcript=hits_transcript).update(
+        xml_analysis=None
+    )
+
+    assert hits.search_hits(hits_transcript, 'exhibit') == expected
+    assert expected['hits'] == 5
+
+
+def test_hits_cached(cached_client, hits_transcript):
+    first = hits.search_hits(hits_transcript, 'exhibit')
+    second = hits.search_hits(hits_transcript, ' exhibit ')
+
+    assert first == second
+    assert hits_transcript.searches == ['exhibit']
+
+    page = TranscriptPage.objects.get(transcript=hits_transcript, seq_number=7)
+    page.xml = page_xml(7, 'Exhibit A, exhibit B.')
+    page.save()
+    transcript = Transcript.objects.get(id=hits_transcript.id)
+
+    assert hits.search_hits(transcript, 'exhibit')['hits'] == 6
+    assert hits_transcript.searches == ['exhibit', 'exhibit']
+
+
+def test_hits_missing_query():
+    transcript = make_transcript(pages=1)
+
+    assert client.get(hits_url(transcript.id)).status_code == 400
+    assert client.get(hits_url(transcript.id, q=' ')).status_code == 400
+
+
+def test_hits_not_found():
+    assert client.get(hits_url(0, q='exhibit')).status_code == 404
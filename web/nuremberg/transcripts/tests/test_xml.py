@@ -0,0 +1,116 @@
+import itertools
+import os
+
+import pytest
+
+from nuremberg.transcripts.xml import TranscriptPageJoiner, XmlPage
+from .helpers import FullHtmlJoiner
+
+
+ENDINGS = [
+    'the end of a sentence.',
+    'a sentence that goes on',
+    'a title by Mr.',
+    'written by Dr.',
+    'as stated by the M.D.',
+    'the exhibit OKL.',
+    'on page 23.',
+    'a pause...',
+    'a question?',
+    'a quote."',
+    'a list:',
+    'a split word—',
+    'trailing spaces.   \n  ',
+    'and/.',
+    '',
+]
+PARAGRAPHS = [
+    '<p>{text} {end}</p>',
+    '<p><spkr>MR. MCHANEY:</spkr> {text} {end}</p>',
+    '<p><spkr>AFTERNOON SESSION</spkr></p>',
+    '<p>({text})</p>',
+    '<p>Court No. 1</p>',
+    '<p><runningHead>10 Dec</runningHead></p>',
+    '<p>1) {text} {end}</p>',
+    '<p>{text} <evidenceFileDoc n="NO-417">NO-417</evidenceFileDoc> {end}</p>',
+    '<p>{text} <exhibitDocPros n="22">22</exhibitDocPros>{end}</p>',
+    '<p>{text} <exhibitDocDef def="Rose" n="8">8</exhibitDocDef> {end}</p>',
+]
+
+
+def synthetic_pages(count, paragraphs):
+    endings = itertools.cycle(ENDINGS)
+    kinds = itertools.cycle(PARAGRAPHS)
+    pages = []
+    for seq in range(1, count + 1):
+        body = ''.join(
+            next(kinds).format(
+                text=f'Some text of paragraph {i} of page {seq}',
+                end=next(endings),
+            )
+            for i in range(paragraphs)
+        )
+        pages.append(
+            XmlPage(
+                seq,
+                f'<transcriptBody><seqNo>{seq}</seqNo>{body}'
+                f'<pageNum n="{seq}">{seq}</pageNum></transcriptBody>',
+            )
+        )
+    return pages
+
+
+def join(joiner_class, pages, **kwargs):
+    joiner = joiner_class(pages, **kwargs)
+    joiner.audit = True
+    joiner.build_html()
+    return (
+        [(row['page'].seq_number, row['html']) for row in joiner.html_pages],
+        joiner.joins,
+        joiner.from_seq,
+        joiner.to_seq,
+    )
+
+
+@pytest.mark.parametrize('include_first', [True, False])
+@pytest.mark.parametrize('include_last', [True, False])
+@pytest.mark.parametrize('paragraphs', [1, 4, 7, 60])
+def test_joiner_matches_full_html(paragraphs, include_first, include_last):
+    pages = synthetic_pages(6, paragraphs)
+    kwargs = {'include_first': include_first, 'include_last': include_last}
+
+    result = join(TranscriptPageJoiner, pages, **kwargs)
+
+    assert result[0]
+    assert result == join(FullHtmlJoiner, pages, **kwargs)
+
+
+def test_joiner_matches_full_html_xml_files():
+    abspath = os.path.dirname(os.path.abspath(__file__))
+    pages = []
+    for seq, folder in enumerate(['good', 'bad', 'good'], start=1):
+        path = os.path.join(abspath, folder, 'NRMB-NMT01-01_00136_0.xml')
+        with open(path) as f:
+            pages.append(XmlPage(seq, f.read()))
+
+    kwargs = {'include_first': True, 'include_last': True}
+
+    result = join(TranscriptPageJoiner, pages, **kwargs)
+
+    assert result[0]
+    assert result == join(FullHtmlJoiner, pages, **kwargs)
+
+
+def test_joiner_tail_is_bounded():
+    joiner = TranscriptPageJoiner([])
+    joiner.seq = 1
+    joiner.open_page()
+
+    for i in range(1000):
+        joiner.put(f'Sentence number {i}. ')
+    joiner.put('  \n ')
+
+    # the tail keeps `tail_size` characters before the trailing whitespace
+    html = ''.join(joiner.page_parts)
+    assert joiner.tail.endswith('999.   \n ')
+    assert joiner.tail == html[len(html.rstrip()) - joiner.tail_size :]
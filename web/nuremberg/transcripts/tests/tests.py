@@ -6,11 +6,14 @@ from django.core.management import call_command
 from django.urls import reverse
 
 from nuremberg.core.tests.acceptance_helpers import (
+    client,
     follow_link,
     go_to,
 )
 from nuremberg.search.templatetags.search_url import url_with_query
 from nuremberg.transcripts.models import Transcript, TranscriptPage
+from nuremberg.transcripts.xml import TranscriptPageJoiner
+from .helpers import FullHtmlJoiner
 
 
 pytestmark = pytest.mark.django_db
@@ -143,6 +146,26 @@ def test_seq_alignment(seq):
     )
 
 
+@pytest.mark.parametrize('from_seq', [1, 120, 480, 2000, 6200])
+def test_joiner_matches_full_html(from_seq):
+    pages = Transcript.objects.get(id=1).pages.filter(
+        seq_number__gte=from_seq, seq_number__lte=from_seq + 60
+    )
+    results = []
+    for joiner_class in (TranscriptPageJoiner, FullHtmlJoiner):
+        joiner = joiner_class(pages.order_by('seq_number'))
+        joiner.build_html()
+        results.append(
+            [
+                (row['page'].seq_number, row['html'])
+                for row in joiner.html_pages
+            ]
+        )
+
+    assert len(results[0]) > 50
+    assert results[0] == results[1]
+
+
 def test_go_to_date(seq):
     page = seq(100)
 
@@ -279,3 +302,19 @@ def test_xml_import():
     )
     assert transcript_page.extract_evidence_codes() == ['NO-416', 'NO-417']
     assert transcript_page.extract_exhibit_codes() == ['Prosecution 22']
+
+
+def test_transcript_search_hits():
+    response = client.get(
+        reverse('transcripts:hits', kwargs={'transcript_id': 1}),
+        {'q': 'exhibit'},
+    )
+    assert response.status_code == 200
+
+    hits = response.json()
+    seqs = [result['seq'] for result in hits['results']]
+    # the same pages as the paginated search results
+    assert hits['pages'] == 2333
+    assert seqs == sorted(seqs)
+    assert all(result['count'] >= 1 for result in hits['results'])
+    assert hits['hits'] >= hits['pages']
@@ -1,8 +1,10 @@
-from django.urls import re_path
+from django.urls import path, re_path
 from . import views
 
 app_name = 'transcripts'
 urlpatterns = [
+    path('<int:transcript_id>/export', views.export, name='export'),
+    path('<int:transcript_id>/hits', views.hits, name='hits'),
     re_path(
         r'^(?P<transcript_id>\d+)-(?P<slug>[\-\w]+)?/search$',
         views.Search.as_view(),
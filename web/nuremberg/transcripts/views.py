@@ -1,11 +1,30 @@
+import os
+
+from django.core.exceptions import BadRequest
+from django.http import FileResponse, StreamingHttpResponse
 from django.http.response import JsonResponse
 from django.template.loader import render_to_string
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.views.generic import View
 
+from nuremberg.core.storages import save_while_streaming
 from nuremberg.search.views import Search as GenericSearchView
+from .export import (
+    EXPORT_FORMATS,
+    cached_export_path,
+    export_pages,
+    remove_outdated_exports,
+)
+from .hits import search_hits
 from .models import Transcript
-from .xml import TranscriptPageJoiner
+
+
+# Browsers and proxies can reuse explicitly requested page ranges for a while
+RANGE_CACHE_SECONDS = 60 * 60
+# transcripts.js requests up to this many batches of pages at once
+RANGE_CACHE_BATCHES = 3
 
 
 class Search(GenericSearchView):
@@ -57,38 +76,23 @@ class Show(View):
         from_seq = transcript.clamp_seq(from_seq)
         to_seq = transcript.clamp_seq(to_seq)
 
-        pages = transcript.pages.filter(
-            seq_number__gte=from_seq, seq_number__lte=to_seq
-        ).all()
-        joiner = TranscriptPageJoiner(
-            pages,
-            include_first=from_seq == 1,
-            include_last=to_seq == total_pages,
-        )
-        joiner.build_html()
-
         if request.GET.get('partial'):
-            return JsonResponse(
-                {
-                    'html': render_to_string(
-                        'transcripts/joined_pages.html',
-                        {'pages': joiner.html_pages},
-                    ),
-                    'from_seq': joiner.from_seq,
-                    'to_seq': joiner.to_seq,
-                    'seq': seq_number,
-                }
+            return self.partial_response(
+                request, transcript, seq_number, from_seq, to_seq
             )
 
-        current_page = next(
-            page for page in pages if page.seq_number == seq_number
+        joined = transcript.joined_pages(from_seq, to_seq)
+        current_page = (
+            transcript.pages.only('date', 'page_number')
+            .filter(seq_number=seq_number)
+            .first()
         )
         return render(
             request,
             self.template_name,
             {
                 'transcript': transcript,
-                'joiner': joiner,
+                'joined': joined,
                 'seq': seq_number,
                 'total_pages': total_pages,
                 'dates': transcript.dates(),
@@ -99,6 +103,79 @@ class Show(View):
             },
         )
 
+    def partial_response(
+        self, request, transcript, seq_number, from_seq, to_seq
+    ):
+        """Return the joined pages for a range, supporting conditional GETs.
+
+        Validators are derived from the latest update of the pages in the
+        range, so unchanged ranges get a 304 without joining any pages.
+
+        """
+        updated_at = transcript.range_updated_at(from_seq, to_seq)
+        etag = last_modified = response = None
+        if updated_at is not None:
+            etag = quote_etag(
+                f'{transcript.id}-{from_seq}-{to_seq}-{seq_number}-'
+                f'{transcript.total_pages}-{updated_at.timestamp()}'
+            )
+            last_modified = int(updated_at.timestamp())
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+
+        if response is None:
+            joined = transcript.joined_pages(from_seq, to_seq)
+            response = JsonResponse(
+                {
+                    'html': render_to_string(
+                        'transcripts/joined_pages.html',
+                        {'pages': joined['html_pages']},
+                    ),
+                    'from_seq': joined['from_seq'],
+                    'to_seq': joined['to_seq'],
+                    'seq': seq_number,
+                }
+            )
+
+        if etag:
+            response.headers['ETag'] = etag
+            response.headers['Last-Modified'] = http_date(last_modified)
+        # ranges requested explicitly (as transcripts.js does) always have the
+        # same content for the same URL, until the pages are updated
+        if (
+            'from_seq' in request.GET
+            and 'to_seq' in request.GET
+            and not request.GET.get('page')
+            and not request.GET.get('date')
+            and from_seq <= seq_number <= to_seq
+            and self.is_aligned_range(transcript, from_seq, to_seq)
+        ):
+            patch_cache_control(
+                response, public=True, max_age=RANGE_CACHE_SECONDS
+            )
+        return response
+
+    def is_aligned_range(self, transcript, from_seq, to_seq):
+        """Return whether the range is one that transcripts.js requests.
+
+        Only those ranges are cached publicly. They start at a multiple of
+        `page_alignment` (or the first page), span up to `RANGE_CACHE_BATCHES`
+        batches and end one page after a multiple of `page_alignment` (or at
+        the last page). This bounds the amount of ranges shared caches may
+        store.
+
+        """
+        if not (from_seq == 1 or from_seq % self.page_alignment == 0):
+            return False
+        if not (
+            to_seq == transcript.total_pages
+            or (to_seq - 1) % self.page_alignment == 0
+        ):
+            return False
+        max_span = RANGE_CACHE_BATCHES * self.page_alignment + 1
+        return to_seq - from_seq <= max_span
+
     def get_request_seq_range(self, request, seq_number):
         # so that page ranges are generally cacheable, we align initial page loads to 10-page strides, plus 1
         # e.g. requesting seq=10, 13, or 19 will get you pages 1 - 30 inclusive,
@@ -120,3 +197,41 @@ class Show(View):
         )
 
         return (from_seq, to_seq)
+
+
+def export(request, transcript_id):
+    """Stream the full text of a transcript, as `txt` or `jsonl`."""
+    transcript = get_object_or_404(Transcript, id=transcript_id)
+    export_format = request.GET.get('format', 'txt')
+    if export_format not in EXPORT_FORMATS:
+        raise BadRequest('Invalid export format')
+    content_type = EXPORT_FORMATS[export_format]
+    filename = f'HLSL Nuremberg Transcript #{transcript.id}.{export_format}'
+
+    path = cached_export_path(transcript, export_format)
+    if path and os.path.exists(path):
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=filename,
+            content_type=content_type,
+        )
+
+    content = export_pages(transcript, export_format)
+    if path:
+        remove_outdated_exports(transcript)
+        content = save_while_streaming(content, path)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def hits(request, transcript_id):
+    """Return every matching page of a transcript search, with hit counts."""
+    transcript = get_object_or_404(Transcript, id=transcript_id)
+    query = request.GET.get('q', '').strip()
+    if not query:
+        raise BadRequest('Missing search query')
+    response = JsonResponse(search_hits(transcript, query))
+    patch_cache_control(response, public=True, max_age=RANGE_CACHE_SECONDS)
+    return response
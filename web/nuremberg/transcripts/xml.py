@@ -1,4 +1,7 @@
+import hashlib
 import re
+from datetime import datetime
+
 from lxml import etree
 
 
@@ -146,6 +149,12 @@ class TranscriptPageJoiner:
     # matches tags that should always begin a paragraph
     sentence_beginning = re.compile(r'[\da-zA-Z][ \.]?\)')
 
+    # Sentence ends are searched for in the last `tail_size` characters of
+    # the page HTML (plus its trailing whitespace) instead of the whole page,
+    # which would make joining long pages quadratic. It must fit the longest
+    # `sentence_end` match (11 characters) and the 25 character audit logs.
+    tail_size = 32
+
     # enables hinting to figure out why joining isn't working
     debug = False
     audit = False
@@ -197,19 +206,25 @@ class TranscriptPageJoiner:
                     self.ignore_join = True
 
     def open_page(self):
-        self.page_html = ''
+        self.page_parts = []
+        self.tail = ''
         self.log('<span>[opened seq {}]</span>'.format(self.seq))
         self.output_page = self.input_page
 
     def close_page(self):
         self.log('<span>[closed]</span>')
-        if self.page_html and self.output_page:
+        if self.page_parts and self.output_page:
             self.html_pages.append(
-                {'page': self.output_page, 'html': self.page_html}
+                {'page': self.output_page, 'html': ''.join(self.page_parts)}
             )
 
     def put(self, text):
-        self.page_html += text
+        if not text:
+            return
+        self.page_parts.append(text)
+        tail = self.tail + text
+        start = len(tail.rstrip()) - self.tail_size
+        self.tail = tail[start:] if start > 0 else tail
 
     def open_p(self):
         self.put('<p>\n')
@@ -219,7 +234,7 @@ class TranscriptPageJoiner:
 
     def log(self, text):  # pragma: no cover
         if self.debug:
-            self.page_html += text
+            self.put(text)
 
     def join_text(self, joined_text):
         if joined_text:
@@ -317,7 +332,7 @@ class TranscriptPageJoiner:
                         continue
 
                     # decide whether to output a </p> tag
-                    end = self.sentence_end.search(self.page_html)
+                    end = self.sentence_end.search(self.tail)
                     if not end or self.reject_sentence_end.search(
                         end.group(0)
                     ):
@@ -325,23 +340,21 @@ class TranscriptPageJoiner:
                         # BUG: No good way to tell if this is the middle of a word.
                         # It's usually not...
                         # For the future, use &mdash; to mark words that should be joined?
-                        if self.page_html[-1] != '—':
+                        if self.tail[-1] != '—':
                             self.put(' ')
 
                         self.log('[IGNORING END]')
                         if self.audit:
                             self.joins.append(
                                 'IGNORED: ...{: >30} [x] ({})'.format(
-                                    self.page_html[-25:].replace('\n', '\\n'),
+                                    self.tail[-25:].replace('\n', '\\n'),
                                     self.seq,
                                 )
                             )
                             if end:
                                 self.joins.append(
                                     'REJECTED: ...{: >30} [x] ({})'.format(
-                                        self.page_html[-25:].replace(
-                                            '\n', '\\n'
-                                        ),
+                                        self.tail[-25:].replace('\n', '\\n'),
                                         self.seq,
                                     )
                                 )
@@ -349,7 +362,7 @@ class TranscriptPageJoiner:
                         if self.audit:
                             self.joins.append(
                                 'ALLOWED: ...{: >30} [x] ({})'.format(
-                                    self.page_html[-25:].replace('\n', '\\n'),
+                                    self.tail[-25:].replace('\n', '\\n'),
                                     self.seq,
                                 )
                             )
@@ -424,3 +437,127 @@ class TranscriptPageJoiner:
         if not (self.joining or self.last_page):
             self.log('<span>[closing on put]</span>')
             self.close_page()
+
+
+class XmlPage:
+    """A transcript page built from its seq number and XML only.
+
+    The joiner needs nothing else, so pages can be joined without using the
+    database (e.g. in worker processes).
+
+    """
+
+    def __init__(self, seq_number, xml):
+        self.seq_number = seq_number
+        self.xml = xml
+
+    def xml_tree(self):
+        return etree.fromstring(self.xml.encode('utf8'))
+
+
+def join_transcript(pages):
+    """Join the `(seq number, xml)` pages of a whole transcript.
+
+    Return a dict mapping every seq number to the HTML for its page, with all
+    the joins resolved (pages that end up with no text map to '').
+
+    """
+    pages = [XmlPage(seq_number, xml) for seq_number, xml in pages]
+    joiner = TranscriptPageJoiner(pages, include_first=True, include_last=True)
+    joiner.build_html()
+    result = dict.fromkeys((page.seq_number for page in pages), '')
+    for row in joiner.html_pages:
+        result[row['page'].seq_number] = row['html']
+    return result
+
+
+def hash_xml(xml):
+    """Return a hex digest of the content of a page XML."""
+    return hashlib.sha256(xml.encode('utf8')).hexdigest()
+
+
+def analyze_page(xml):
+    """Extract everything needed about a transcript page in one XML pass.
+
+    Return a JSON serializable dict with:
+
+    - `text`: the plain text of the page (keeping speaker spans), for search
+    - `evidence_codes` and `exhibit_codes`: codes referenced by the page
+    - `speakers`: the distinct speaker labels, in order of appearance
+    - `metadata`: `seq_number`, `date` (as 'YYYY-MM-DD', None if invalid),
+      `page_label` and `page_number`, only for the tags found in the page
+
+    """
+    text = []
+    evidence_codes = []
+    exhibit_codes = []
+    speakers = []
+    metadata = {}
+
+    tree = etree.fromstring(xml.encode('utf8'))
+    for event, element in etree.iterwalk(tree, events=('start', 'end')):
+        tag = element.tag
+        if tag == 'p':
+            if len(element) and element[0].tag == 'runningHead':
+                continue
+            if event == 'start':
+                if element.text:
+                    if len(
+                        element.text
+                    ) < 20 and TranscriptPageJoiner.ignore_p.match(
+                        element.text
+                    ):
+                        continue
+                    text.append(element.text)
+            else:
+                text.append('\n\n')
+        elif event != 'end':
+            continue
+        elif tag == 'spkr':
+            if element.text:
+                text.append(
+                    '<span class="speaker">{}</span> '.format(element.text)
+                )
+                speaker = element.text.strip()
+                if speaker and speaker not in speakers:
+                    speakers.append(speaker)
+            if element.tail:
+                text.append(element.tail)
+        elif tag in ('evidenceFileDoc', 'exhibitDocDef', 'exhibitDocPros'):
+            if element.text:
+                text.append(element.text)
+            if element.tail:
+                text.append(element.tail)
+            if tag == 'evidenceFileDoc':
+                evidence_codes.append(element.get('n'))
+            elif tag == 'exhibitDocPros':
+                exhibit_codes.append('Prosecution {}'.format(element.get('n')))
+            else:
+                exhibit_codes.append(
+                    '{} {}'.format(
+                        element.get('def') or 'Unknown Defendant',
+                        element.get('n'),
+                    )
+                )
+        elif tag == 'seqNo':
+            metadata['seq_number'] = int(element.text)
+        elif tag == 'sessionDate':
+            try:
+                date = datetime.strptime(element.get('n'), '%Y-%m-%d')
+            except (TypeError, ValueError):
+                metadata['date'] = None
+            else:
+                metadata['date'] = date.strftime('%Y-%m-%d')
+        elif tag == 'pageNum':
+            page_label = element.get('n')
+            page_int = re.sub(r'[^\d]', '', page_label)
+            metadata['page_label'] = page_label
+            metadata['page_number'] = int(page_int) if page_int else None
+
+    return {
+        'text': ''.join(text),
+        'evidence_codes': evidence_codes,
+        'exhibit_codes': exhibit_codes,
+        'speakers': speakers,
+        'metadata': metadata,
+    }